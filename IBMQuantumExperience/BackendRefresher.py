@@ -0,0 +1,155 @@
+"""
+    Background refresh of the status and calibration of backends
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+
+log = logging.getLogger(__name__)
+_clock = getattr(time, 'monotonic', time.time)
+
+KINDS = ('status', 'calibration', 'parameters')
+DEFAULT_INTERVALS = {'status': 10.0, 'calibration': 300.0,
+                     'parameters': 300.0}
+
+
+class Snapshot(namedtuple('Snapshot', ['value', 'timestamp'])):
+    """
+    Last value fetched of the status, calibration or parameters of a backend,
+    with the time (since the epoch) it was fetched at
+    """
+    __slots__ = ()
+
+    @property
+    def age(self):
+        """
+        Seconds since the value was fetched
+        """
+        return time.time() - self.timestamp
+
+
+class BackendRefresher(object):
+    """
+    Thread that keeps the status, calibration and parameters of some
+    backends in memory, fetching them periodically.
+
+    While it runs, ``backend_status``, ``backend_calibration`` and
+    ``backend_parameters`` return the last snapshot of the refreshed
+    backends without blocking on the network.
+    """
+    def __init__(self, api, backends, intervals=None,
+                 on_calibration_change=None, on_change=None):
+        """
+        Args:
+            api (IBMQuantumExperience): connection used to fetch the values.
+            backends (list): names of the backends to refresh.
+            intervals (dict): seconds between refreshes of each kind of value
+                ('status', 'calibration' and 'parameters'). A kind with an
+                interval of None is not refreshed.
+            on_calibration_change (callable): function called as
+                ``on_calibration_change(backend, old, new)`` when a new
+                calibration of a backend is fetched.
+            on_change (callable): function called as
+                ``on_change(backend, kind, old, new)`` when a new value of
+                any kind is fetched.
+        """
+        self.api = api
+        self.backends = list(backends)
+        self.intervals = dict(DEFAULT_INTERVALS)
+        self.intervals.update(intervals or {})
+        self.on_calibration_change = on_calibration_change
+        self.on_change = on_change
+        self._snapshots = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._due = dict(((backend, kind), 0)
+                         for backend in self.backends for kind in KINDS
+                         if self.intervals.get(kind) is not None)
+
+    @property
+    def running(self):
+        """
+        Whether the refresher thread is running
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """
+        Start refreshing the values in a background thread
+        """
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run,
+                                        name='BackendRefresher')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Stop refreshing the values
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def snapshot(self, backend, kind):
+        """Get the last value fetched of a backend.
+
+        Args:
+            backend (str): name of the backend.
+            kind (str): 'status', 'calibration' or 'parameters'.
+
+        Returns:
+            Snapshot: the last value fetched, or None if not fetched yet.
+        """
+        with self._lock:
+            return self._snapshots.get((backend, kind))
+
+    def refresh(self, backend, kind):
+        """
+        Fetch a value of a backend now
+        """
+        if kind == 'status':
+            value = self.api.backend_status(backend, refresh=True)
+        elif kind == 'calibration':
+            value = self.api.backend_calibration(backend, refresh=True)
+        else:
+            value = self.api.backend_parameters(backend, refresh=True)
+        with self._lock:
+            previous = self._snapshots.get((backend, kind))
+            self._snapshots[(backend, kind)] = Snapshot(value, time.time())
+        if previous is None or previous.value != value:
+            old = previous.value if previous else None
+            if kind == 'calibration' and self.on_calibration_change:
+                self._call_hook(self.on_calibration_change, backend, old,
+                                value)
+            if self.on_change:
+                self._call_hook(self.on_change, backend, kind, old, value)
+        return value
+
+    @staticmethod
+    def _call_hook(hook, backend, *args):
+        try:
+            hook(backend, *args)
+        except Exception:  # pylint: disable=broad-except
+            log.exception('Error in the change hook of %s', backend)
+
+    def _refresh_due(self, item):
+        backend, kind = item
+        try:
+            self.refresh(backend, kind)
+        except Exception as ex:  # pylint: disable=broad-except
+            log.warning('Could not refresh the %s of %s: %s',
+                        kind, backend, ex)
+        self._due[item] = _clock() + self.intervals[kind]
+
+    def _run(self):
+        while self._due and not self._stop.is_set():
+            now = _clock()
+            due = [item for item, at in self._due.items() if at <= now]
+            self.api._map(self._refresh_due, due)
+            self._stop.wait(max(0, min(self._due.values()) - _clock()))
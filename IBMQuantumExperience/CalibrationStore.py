@@ -0,0 +1,388 @@
+"""
+    History of the calibrations of the backends, with per-qubit queries
+"""
+import calendar
+import hashlib
+import heapq
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .BackendRefresher import BackendRefresher
+from .SharedCache import replace_file
+
+# One sample of a metric: its time (seconds since the epoch), backend and
+# metric (indices in the names of the store), qubit (and second qubit of the
+# gates of two qubits, or -1) and value.
+SAMPLE_FIELDS = [('time', '<f8'), ('backend', '<i4'), ('metric', '<i4'),
+                 ('qubit', '<i4'), ('qubit2', '<i4'), ('value', '<f8')]
+_DATE_FORMATS = ('%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S')
+
+
+def _timestamp(date):
+    """
+    Convert an ISO date (in UTC) to seconds since the epoch, or None
+    """
+    if isinstance(date, (int, float)):
+        return float(date)
+    if not date:
+        return None
+    date = date.rstrip('Z')[:26]
+    for date_format in _DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(date, date_format)
+        except ValueError:
+            continue
+        return calendar.timegm(parsed.timetuple()) + \
+            parsed.microsecond / 1e6
+    return None
+
+
+def _value(metric):
+    if isinstance(metric, dict):
+        metric = metric.get('value')
+    if isinstance(metric, (int, float)) and not isinstance(metric, bool):
+        return float(metric)
+    return None
+
+
+def calibration_metrics(document):
+    """Get the metrics of a calibration or parameters document.
+
+    Both the ``qubits``/``multiQubitGates`` layout of the QX Platform and
+    the ``qubits``/``gates`` layout of the backend properties are
+    supported.
+
+    Args:
+        document (dict): result of ``backend_calibration`` or
+            ``backend_parameters``.
+
+    Returns:
+        list: tuples ``(metric, qubit, qubit2, value)``, qubit2 being -1
+            for the metrics of a single qubit.
+    """
+    metrics = []
+    for qubit, properties in enumerate(document.get('qubits') or []):
+        if isinstance(properties, list):
+            properties = dict((item.get('name'), item)
+                              for item in properties)
+        for name, metric in properties.items():
+            value = _value(metric)
+            if value is not None:
+                metrics.append((name, qubit, -1, value))
+    for gate in document.get('multiQubitGates') or []:
+        qubits = gate.get('qubits') or []
+        value = _value(gate.get('gateError'))
+        if len(qubits) == 2 and value is not None:
+            metrics.append(('gateError', qubits[0], qubits[1], value))
+    for gate in document.get('gates') or []:
+        qubits = list(gate.get('qubits') or []) + [-1]
+        for parameter in gate.get('parameters') or []:
+            value = _value(parameter)
+            if parameter.get('name') == 'gate_error' and value is not None:
+                metrics.append(('gateError', qubits[0], qubits[1], value))
+    return metrics
+
+
+class CalibrationStore(object):
+    """
+    Append-only history of the calibration metrics of backends (T1, T2,
+    frequency, gate and readout errors...), kept in a numpy array of
+    samples for vectorized queries.
+
+    Documents identical to the last one recorded for the same backend are
+    skipped. With a directory, the samples are appended to a binary file
+    there (and the names to a JSON file), so that the history survives the
+    process. Requires numpy.
+    """
+    def __init__(self, path=None):
+        """
+        Args:
+            path (str): directory of the store, or None to keep it in
+                memory.
+        """
+        if np is None:
+            raise ImportError('numpy is required by the calibration store')
+        self.path = path
+        self.dtype = np.dtype(SAMPLE_FIELDS)
+        self.backends = []
+        self.metrics = []
+        self._hashes = {}
+        self._samples = np.zeros(1024, dtype=self.dtype)
+        self._length = 0
+        self._lock = threading.RLock()
+        if path is not None:
+            if not os.path.isdir(path):
+                os.makedirs(path)
+            self._load()
+
+    def _load(self):
+        meta_path = os.path.join(self.path, 'meta.json')
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path) as meta_file:
+            meta = json.load(meta_file)
+        self.backends = meta['backends']
+        self.metrics = meta['metrics']
+        self._hashes = meta['hashes']
+        samples_path = os.path.join(self.path, 'samples.bin')
+        samples = np.fromfile(samples_path, dtype=self.dtype)
+        # Drop the samples of a record interrupted before its metadata.
+        samples = samples[:meta['length']]
+        with open(samples_path, 'r+b') as data:
+            data.truncate(samples.nbytes)
+        self._grow(samples.shape[0])
+        self._samples[:samples.shape[0]] = samples
+        self._length = samples.shape[0]
+
+    def _save(self, samples):
+        with open(os.path.join(self.path, 'samples.bin'), 'ab') as data:
+            data.write(samples.tobytes())
+        meta = {'backends': self.backends, 'metrics': self.metrics,
+                'hashes': self._hashes, 'length': self._length}
+        handle, temp_name = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(handle, 'w') as meta_file:
+            json.dump(meta, meta_file)
+        replace_file(temp_name, os.path.join(self.path, 'meta.json'))
+
+    def _grow(self, extra):
+        needed = self._length + extra
+        if needed > self._samples.shape[0]:
+            samples = np.zeros(max(needed, 2 * self._samples.shape[0]),
+                               dtype=self.dtype)
+            samples[:self._length] = self._samples[:self._length]
+            self._samples = samples
+
+    def _index(self, names, name):
+        if name not in names:
+            names.append(name)
+        return names.index(name)
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def samples(self):
+        """
+        Array of all the samples recorded (a view, not to be modified)
+        """
+        with self._lock:
+            return self._samples[:self._length]
+
+    def record(self, document, kind=None, timestamp=None):
+        """Record the metrics of a calibration or parameters document.
+
+        Args:
+            document (dict): result of ``backend_calibration`` or
+                ``backend_parameters`` (with its 'backend').
+            kind (str): 'calibration' or 'parameters'. By default,
+                guessed from the metrics.
+            timestamp (float): time of the metrics, in seconds since the
+                epoch. By default, the 'lastUpdateDate' of the document, or
+                else the current time.
+
+        Returns:
+            bool: whether the document was recorded (False if it did not
+                change since the last one of its backend).
+        """
+        if not document or not document.get('backend'):
+            return False
+        metrics = calibration_metrics(document)
+        if kind is None:
+            kind = 'parameters' if any(
+                metric[0] in ('T1', 'T2') for metric in metrics) else \
+                'calibration'
+        digest = hashlib.sha256(json.dumps(
+            document, sort_keys=True).encode('utf-8')).hexdigest()
+        if timestamp is None:
+            timestamp = _timestamp(document.get('lastUpdateDate') or
+                                   document.get('last_update_date'))
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            key = '{}:{}'.format(document['backend'], kind)
+            if self._hashes.get(key) == digest:
+                return False
+            self._hashes[key] = digest
+            backend = self._index(self.backends, document['backend'])
+            samples = np.array(
+                [(timestamp, backend, self._index(self.metrics, name),
+                  qubit, qubit2, value)
+                 for name, qubit, qubit2, value in metrics],
+                dtype=self.dtype)
+            self._grow(samples.shape[0])
+            self._samples[self._length:self._length + samples.shape[0]] = \
+                samples
+            self._length += samples.shape[0]
+            if self.path is not None:
+                self._save(samples)
+            return True
+
+    def _select(self, backend, metric, since=None, until=None):
+        """
+        Get the samples of a metric of a backend, sorted by time
+        """
+        with self._lock:
+            if backend not in self.backends or metric not in self.metrics:
+                return self._samples[:0]
+            samples = self._samples[:self._length]
+            mask = (samples['backend'] == self.backends.index(backend)) & \
+                (samples['metric'] == self.metrics.index(metric))
+            if since is not None:
+                mask &= samples['time'] >= since
+            if until is not None:
+                mask &= samples['time'] <= until
+            selected = samples[mask]
+        return selected[np.argsort(selected['time'], kind='mergesort')]
+
+    def series(self, backend, metric, qubit, qubit2=-1, since=None,
+               until=None):
+        """Get the history of a metric of a qubit (or of a pair of qubits).
+
+        Args:
+            backend (str): name of the backend.
+            metric (str): name of the metric (eg. 'T1' or 'gateError').
+            qubit (int): the qubit.
+            qubit2 (int): the second qubit, for the gates of two qubits.
+            since (float): start of the period, in seconds since the epoch.
+            until (float): end of the period, in seconds since the epoch.
+
+        Returns:
+            tuple: the arrays of the times and of the values.
+        """
+        samples = self._select(backend, metric, since, until)
+        samples = samples[(samples['qubit'] == qubit) &
+                          (samples['qubit2'] == qubit2)]
+        return samples['time'], samples['value']
+
+    def latest(self, backend, metric, at=None):
+        """Get the last value of a metric of every qubit (or pair of
+        qubits).
+
+        Args:
+            backend (str): name of the backend.
+            metric (str): name of the metric.
+            at (float): time of the values, in seconds since the epoch
+                (by default, now).
+
+        Returns:
+            dict: the value of each qubit, or of each pair of qubits (as a
+                tuple) for the gates of two qubits.
+        """
+        samples = self._select(backend, metric, until=at)[::-1]
+        keys = samples['qubit'].astype(np.int64) * 65536 + \
+            samples['qubit2'] + 1
+        # The first of each key, in reverse order of time, is the last one.
+        _, first = np.unique(keys, return_index=True)
+        latest = {}
+        for sample in samples[first]:
+            qubit, qubit2 = int(sample['qubit']), int(sample['qubit2'])
+            latest[qubit if qubit2 < 0 else (qubit, qubit2)] = \
+                float(sample['value'])
+        return latest
+
+    def best_subset(self, backend, size, metric='gateError', at=None,
+                    beam_width=1000):
+        """Find the connected qubits with the lowest mean error of the gates
+        of two qubits between them.
+
+        The subsets are grown from the pairs one neighbour at a time,
+        keeping the beam_width best ones at each size: the search is exact
+        while there are fewer connected subsets than that.
+
+        Args:
+            backend (str): name of the backend.
+            size (int): number of qubits, at least 2.
+            metric (str): metric of the gates of two qubits to minimize.
+            at (float): time of the values, in seconds since the epoch
+                (by default, now).
+            beam_width (int): number of subsets kept at each size.
+
+        Returns:
+            tuple: the qubits (sorted) and their mean error, or None if no
+                connected subset of that size exists.
+
+        Raises:
+            ValueError: if size is lower than 2.
+        """
+        if size < 2:
+            raise ValueError('a subset needs at least 2 qubits')
+        errors = {}
+        for key, value in self.latest(backend, metric, at).items():
+            if isinstance(key, tuple):
+                errors[frozenset(key)] = min(value, errors.get(
+                    frozenset(key), value))
+        neighbours = {}
+        for pair in errors:
+            for qubit in pair:
+                neighbours.setdefault(qubit, set()).update(pair - {qubit})
+
+        def score(item):
+            subset, (total, count) = item
+            return total / count, tuple(sorted(subset))
+
+        # The sum and the number of errors between the qubits of a subset.
+        subsets = dict((pair, (value, 1)) for pair, value in errors.items())
+        for _ in range(size - 2):
+            grown = {}
+            for subset, (total, count) in subsets.items():
+                for neighbour in set().union(
+                        *(neighbours[qubit] for qubit in subset)) - subset:
+                    links = [errors[frozenset((neighbour, qubit))]
+                             for qubit in neighbours[neighbour] & subset]
+                    grown[subset | {neighbour}] = (total + sum(links),
+                                                   count + len(links))
+            subsets = dict(heapq.nsmallest(beam_width, grown.items(),
+                                           key=score))
+        if not subsets:
+            return None
+        subset, (total, count) = min(subsets.items(), key=score)
+        return tuple(sorted(subset)), total / count
+
+
+class CalibrationRecorder(object):
+    """
+    Records the calibration and parameters of some backends in a
+    CalibrationStore periodically, with a BackendRefresher.
+    """
+    def __init__(self, api, store, backends, interval=300.0):
+        """
+        Args:
+            api (IBMQuantumExperience): connection used to fetch the
+                documents.
+            store (CalibrationStore): store of the metrics.
+            backends (list): names of the backends.
+            interval (float): seconds between the fetches.
+        """
+        self.store = store
+        self.refresher = BackendRefresher(
+            api, backends, intervals={'status': None,
+                                      'calibration': interval,
+                                      'parameters': interval},
+            on_change=self._record)
+
+    def _record(self, backend, kind, old, new):
+        self.store.record(new, kind)
+
+    def start(self):
+        """
+        Start recording, in a background thread
+        """
+        self.refresher.start()
+
+    def stop(self, timeout=None):
+        """
+        Stop recording
+        """
+        self.refresher.stop(timeout)
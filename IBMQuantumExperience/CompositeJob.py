@@ -0,0 +1,269 @@
+"""
+    Jobs submitted to the QX Platform as several jobs
+"""
+import copy
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+
+def split_job_data(data, max_payload_size=None, max_experiments=None):
+    """Split the data of a job into smaller jobs.
+
+    The experiments (the ``qasms`` of a list of qasms, or the
+    ``experiments`` of a qObject) are split in consecutive chunks, so that
+    each chunk has at most ``max_experiments`` experiments and its
+    serialized size does not exceed ``max_payload_size`` bytes (a single
+    experiment bigger than the limit gets a chunk on its own).
+
+    Args:
+        data (dict): data of the job, as sent to the API.
+        max_payload_size (int or None): maximum size of each job, in bytes.
+        max_experiments (int or None): maximum experiments of each job.
+
+    Returns:
+        list: tuples ``(data, indices)`` with the data of each job and the
+            indices of its experiments in the original job.
+    """
+    experiments = _get_experiments(data)
+    base_size = len(json.dumps(_with_experiments(data, [])))
+    chunks = []
+    chunk = []
+    chunk_size = base_size
+    for index, experiment in enumerate(experiments):
+        # Count the ', ' separator of the list too.
+        size = len(json.dumps(experiment)) + 2
+        if chunk and ((max_experiments and len(chunk) >= max_experiments) or
+                      (max_payload_size and
+                       chunk_size + size > max_payload_size)):
+            chunks.append(chunk)
+            chunk = []
+            chunk_size = base_size
+        chunk.append(index)
+        chunk_size += size
+    if chunk:
+        chunks.append(chunk)
+
+    return [(_with_experiments(data, [experiments[i] for i in indices]),
+             indices)
+            for indices in chunks]
+
+
+def split_job_shots(data, shots_per_job=None, backends=None, seed=None):
+    """Split the shots of a job into several jobs.
+
+    The shots are spread evenly over the jobs: as many jobs as needed to have
+    at most ``shots_per_job`` shots each, or else one job per backend. The
+    jobs are assigned to the backends in turn. If the job has a seed, each
+    job gets a different one (``seed + i``), so that their shots differ.
+
+    Args:
+        data (dict): data of the job, as sent to the API.
+        shots_per_job (int or None): maximum shots of each job.
+        backends (list or None): names of the backends to spread the jobs
+            over. By default, the backend of the job.
+        seed (int or None): seed of the job, if any.
+
+    Returns:
+        list: the data of each job.
+    """
+    if 'qObject' in data:
+        config = data['qObject'].get('config', {})
+        shots = config.get('shots', 1)
+        seed = config.get('seed', seed)
+    else:
+        shots = data.get('shots', 1)
+    backends = backends or [data['backend']['name']]
+    if shots_per_job:
+        count = max(1, -(-shots // shots_per_job))
+    else:
+        count = len(backends)
+    count = min(count, shots)
+
+    jobs = []
+    for i in range(count):
+        job_shots = shots // count + (1 if i < shots % count else 0)
+        job = dict(data, backend=dict(data['backend'],
+                                      name=backends[i % len(backends)]))
+        if 'qObject' in data:
+            config = dict(data['qObject'].get('config', {}), shots=job_shots)
+            if seed is not None:
+                config['seed'] = seed + i
+            job['qObject'] = dict(data['qObject'], config=config)
+        else:
+            job['shots'] = job_shots
+            if seed is not None:
+                job['seed'] = seed + i
+        jobs.append(job)
+    return jobs
+
+
+def _get_experiments(data):
+    if 'qObject' in data:
+        return data['qObject']['experiments']
+    return data['qasms']
+
+
+def _with_experiments(data, experiments):
+    """
+    Copy of the data of a job with other experiments
+    """
+    data = dict(data)
+    if 'qObject' in data:
+        data['qObject'] = dict(data['qObject'], experiments=experiments)
+    else:
+        data['qasms'] = experiments
+    return data
+
+
+def _merge_experiment(merged, experiment):
+    """
+    Add the results of an experiment run by another job to merged: the
+    counts are added up and the memory of the shots is concatenated
+    """
+    if 'status' in merged and 'status' in experiment:
+        merged['status'] = _combine_status([merged['status'],
+                                            experiment['status']])
+    if isinstance(merged.get('shots'), int) and \
+            isinstance(experiment.get('shots'), int):
+        merged['shots'] += experiment['shots']
+    data = merged.get('data')
+    other = experiment.get('data')
+    if not isinstance(data, dict) or not isinstance(other, dict):
+        return
+    if 'counts' in data and 'counts' in other:
+        counts = data['counts']
+        for key, value in other['counts'].items():
+            counts[key] = counts.get(key, 0) + value
+    if 'memory' in data and 'memory' in other:
+        data['memory'] = data['memory'] + other['memory']
+
+
+def _combine_status(statuses):
+    """
+    Status of a composite job from the status of its jobs
+    """
+    for status in statuses:
+        if status.startswith('ERROR'):
+            return status
+    if 'CANCELLED' in statuses:
+        return 'CANCELLED'
+    # The experiments that succeeded are 'DONE', and the jobs 'COMPLETED'.
+    if all(status == 'DONE' for status in statuses):
+        return 'DONE'
+    if all(status in ('COMPLETED', 'DONE') for status in statuses):
+        return 'COMPLETED'
+    return 'RUNNING'
+
+
+class CompositeJob(object):
+    """
+    Handle of a job that has been submitted as several jobs.
+
+    The results of the jobs are merged back into the order of the
+    experiments of the original job, as if it was a single job. When an
+    experiment has been run by several jobs (splitting its shots), its
+    counts are added up and its memory is concatenated in the order of the
+    jobs.
+    """
+    def __init__(self, api, jobs, parts, hub=None, group=None, project=None):
+        """
+        Args:
+            api (IBMQuantumExperience): connection used to submit the jobs.
+            jobs (list): responses of the submission of each job.
+            parts (list): for each job, the indices of its experiments in
+                the original job.
+            hub (str): hub of the jobs, if any.
+            group (str): group of the jobs, if any.
+            project (str): project of the jobs, if any.
+        """
+        self.api = api
+        self.jobs = jobs
+        self.parts = parts
+        self.hub = hub
+        self.group = group
+        self.project = project
+
+    @property
+    def ids(self):
+        """
+        The ids of the jobs
+        """
+        return [job.get('id') for job in self.jobs]
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def get_status(self):
+        """
+        Get the combined status of the jobs
+        """
+        statuses = self.api._map(
+            lambda id_job: self.api.get_status_job(
+                id_job, hub=self.hub, group=self.group,
+                project=self.project),
+            self.ids)
+        return {'status': _combine_status([status.get('status', 'ERROR')
+                                           for status in statuses]),
+                'jobs': statuses}
+
+    def get_job(self):
+        """
+        Get the information about the jobs, merged as a single job
+        """
+        jobs = self.api._map(
+            lambda id_job: self.api.get_job(
+                id_job, hub=self.hub, group=self.group,
+                project=self.project),
+            self.ids)
+        return self.merge(jobs)
+
+    def merge(self, jobs):
+        """Merge the information about the jobs as a single job.
+
+        Args:
+            jobs (list): the information of each job, as returned by
+                ``get_job``, in the order of ``self.jobs``.
+
+        Returns:
+            dict: the information of the composite job, with the ``qasms``
+                (or the ``qObjectResult`` results) in the original order,
+                the ``id`` and ``backend`` of its first job, the ``ids`` of
+                all of them and the ``shots`` of each experiment.
+        """
+        merged = {'id': jobs[0].get('id'),
+                  'ids': [job.get('id') for job in jobs],
+                  'status': _combine_status([job.get('status', 'ERROR')
+                                             for job in jobs])}
+        if 'backend' in jobs[0]:
+            merged['backend'] = copy.deepcopy(jobs[0]['backend'])
+        # The shots of the jobs that ran the first experiment add up.
+        shots = [job.get('shots') for job, indices in zip(jobs, self.parts)
+                 if 0 in indices]
+        if shots and all(isinstance(value, int) for value in shots):
+            merged['shots'] = sum(shots)
+        if 'qasms' in jobs[0]:
+            merged['qasms'] = self._merge_experiments(
+                [job.get('qasms', []) for job in jobs])
+        elif 'qObjectResult' in jobs[0]:
+            merged['qObjectResult'] = copy.deepcopy(jobs[0]['qObjectResult'])
+            merged['qObjectResult']['results'] = self._merge_experiments(
+                [job.get('qObjectResult', {}).get('results', [])
+                 for job in jobs])
+        return merged
+
+    def _merge_experiments(self, experiments):
+        """
+        Put the experiments of every job back in their original position
+        """
+        size = max(max(indices) for indices in self.parts) + 1
+        merged = [None] * size
+        for indices, job_experiments in zip(self.parts, experiments):
+            for index, experiment in zip(indices, job_experiments):
+                if merged[index] is None:
+                    merged[index] = copy.deepcopy(experiment)
+                else:
+                    _merge_experiment(merged[index], experiment)
+        # Skip the experiments of the jobs that returned none.
+        return [experiment for experiment in merged if experiment is not None]
@@ -0,0 +1,231 @@
+"""
+    Aggregation of the counts of many experiments
+"""
+import re
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_CREG_LABEL_RE = re.compile(r'(\w+)\[(\d+)\]')
+
+
+def parse_creg_labels(creg_labels):
+    """Parse the classical registers of an experiment.
+
+    Args:
+        creg_labels (str or list): the ``creg_labels`` of a qasm result
+            (eg. ``'c[3] f[2]'``) or the ``creg_sizes`` of a qObject
+            header (eg. ``[['c', 3], ['f', 2]]``).
+
+    Returns:
+        list: tuples ``(name, size)`` in declaration order.
+    """
+    if not creg_labels:
+        return []
+    if isinstance(creg_labels, (list, tuple)):
+        return [(name, int(size)) for name, size in creg_labels]
+    return [(name, int(size))
+            for name, size in _CREG_LABEL_RE.findall(creg_labels)]
+
+
+def experiment_counts(jobs):
+    """Get the counts of every experiment of some jobs.
+
+    Both the ``qasms[].data`` layout returned by ``get_job`` and the
+    ``qObjectResult`` of qObject jobs are supported. The hexadecimal keys
+    of the qObject counts are converted to bitstrings.
+
+    Args:
+        jobs (list): the jobs, as returned by ``get_job``.
+
+    Returns:
+        list: tuples ``(counts, registers)`` for each experiment, with the
+            registers as returned by ``parse_creg_labels``.
+    """
+    experiments = []
+    for job in jobs:
+        for qasm in job.get('qasms', []):
+            data = qasm.get('data') or {}
+            if 'counts' in data:
+                experiments.append((data['counts'], parse_creg_labels(
+                    data.get('creg_labels') or data.get('cregLabels'))))
+        for result in (job.get('qObjectResult') or {}).get('results', []):
+            data = result.get('data') or {}
+            if 'counts' not in data:
+                continue
+            header = result.get('header') or {}
+            registers = parse_creg_labels(header.get('creg_sizes'))
+            width = (header.get('memory_slots') or
+                     sum(size for _, size in registers))
+            counts = dict((_hex_to_bitstring(key, width), value)
+                          for key, value in data['counts'].items())
+            experiments.append((counts, registers))
+    return experiments
+
+
+def _hex_to_bitstring(key, width):
+    if not key.startswith('0x'):
+        return key
+    return bin(int(key, 16))[2:].zfill(width or 1)
+
+
+class CountsAggregator(object):
+    """
+    Counts of many experiments as a matrix, with a column per bitstring.
+
+    The bitstrings of every experiment are indexed together, so that the
+    counts of all the experiments are merged, marginalized and averaged as
+    array operations. Bitstrings follow the QASM convention: the last
+    register is the leftmost one and the bit 0 of each register is its
+    rightmost bit; spaces between registers are ignored. Bitstrings can
+    have at most 64 bits.
+
+    Requires numpy.
+    """
+    def __init__(self, counts, registers=None):
+        """
+        Args:
+            counts (list): the counts (dicts of bitstring to count) of each
+                experiment.
+            registers (list): tuples ``(name, size)`` of the classical
+                registers, in declaration order, shared by the experiments.
+        """
+        if np is None:
+            raise ImportError('numpy is required to aggregate counts')
+        self.registers = list(registers or [])
+        index = {}
+        rows = []
+        columns = []
+        values = []
+        width = 0
+        for row, experiment in enumerate(counts):
+            for key, value in experiment.items():
+                key = key.replace(' ', '')
+                width = max(width, len(key))
+                column = index.setdefault(int(key, 2), len(index))
+                rows.append(row)
+                columns.append(column)
+                values.append(value)
+        matrix = np.zeros((len(counts), len(index)), dtype=np.int64)
+        np.add.at(matrix, (np.array(rows, dtype=np.intp),
+                           np.array(columns, dtype=np.intp)),
+                  np.array(values, dtype=np.int64))
+        bitstring_values = np.zeros(len(index), dtype=np.uint64)
+        for value, column in index.items():
+            bitstring_values[column] = value
+        self._set_matrix(matrix, bitstring_values, width)
+
+    @classmethod
+    def from_jobs(cls, jobs):
+        """
+        Aggregate the counts of every experiment of some jobs (as returned
+        by ``get_job``), with the registers of the first experiment
+        """
+        experiments = experiment_counts(jobs)
+        registers = experiments[0][1] if experiments else []
+        return cls([counts for counts, _ in experiments], registers)
+
+    @classmethod
+    def _from_matrix(cls, counts, values, width, registers):
+        aggregator = cls.__new__(cls)
+        aggregator.registers = registers
+        aggregator._set_matrix(counts, values, width)
+        return aggregator
+
+    def _set_matrix(self, counts, values, width):
+        self.width = width
+        self.counts = counts
+        self.values = values
+        self.bitstrings = [bin(int(value))[2:].zfill(width)
+                           for value in values]
+
+    def __len__(self):
+        return self.counts.shape[0]
+
+    def total(self):
+        """
+        Get the counts of all the experiments added up, as a dict
+        """
+        return self._to_dict(self.counts.sum(axis=0))
+
+    def to_dicts(self):
+        """
+        Get the counts of each experiment, as dicts
+        """
+        return [self._to_dict(row) for row in self.counts]
+
+    def _to_dict(self, row):
+        return dict((self.bitstrings[column], int(row[column]))
+                    for column in np.flatnonzero(row))
+
+    def probabilities(self):
+        """
+        Get the probability of each bitstring (column) in each experiment
+        (row)
+        """
+        shots = self.counts.sum(axis=1, keepdims=True)
+        return self.counts / np.maximum(shots, 1).astype(np.float64)
+
+    def weighted_average(self, weights=None):
+        """Get the weighted average of the probabilities of the experiments.
+
+        Args:
+            weights (list or None): weight of each experiment. By default,
+                the number of shots of each experiment.
+
+        Returns:
+            dict: the average probability of each bitstring.
+        """
+        if weights is None:
+            weights = self.counts.sum(axis=1)
+        weights = np.asarray(weights, dtype=np.float64)
+        average = weights.dot(self.probabilities()) / weights.sum()
+        return dict(zip(self.bitstrings, average.tolist()))
+
+    def statistics(self):
+        """
+        Get the mean, standard deviation, minimum and maximum of the
+        probability of each bitstring over the experiments
+        """
+        probabilities = self.probabilities()
+        stats = zip(probabilities.mean(axis=0), probabilities.std(axis=0),
+                    probabilities.min(axis=0), probabilities.max(axis=0))
+        return dict((bitstring, {'mean': float(mean), 'std': float(std),
+                                 'min': float(low), 'max': float(high)})
+                    for bitstring, (mean, std, low, high)
+                    in zip(self.bitstrings, stats))
+
+    def marginal(self, registers=None, bits=None):
+        """Marginalize the counts over some registers or bits.
+
+        Args:
+            registers (list or None): names of the registers to keep.
+            bits (list or None): positions of the bits to keep, 0 being the
+                rightmost bit. Ignored if registers are given.
+
+        Returns:
+            CountsAggregator: the counts of the kept bits, in the same
+                order (the rightmost bit is the lowest one kept).
+        """
+        kept_registers = []
+        if registers is not None:
+            bits = []
+            offset = 0
+            for name, size in self.registers:
+                if name in registers:
+                    bits.extend(range(offset, offset + size))
+                    kept_registers.append((name, size))
+                offset += size
+        bits = sorted(bits or [])
+
+        marginal = np.zeros(self.values.shape, dtype=np.uint64)
+        for position, bit in enumerate(bits):
+            marginal |= ((self.values >> np.uint64(bit)) & np.uint64(1)) << \
+                np.uint64(position)
+        values, inverse = np.unique(marginal, return_inverse=True)
+        counts = np.zeros((values.shape[0], self.counts.shape[0]),
+                          dtype=np.int64)
+        np.add.at(counts, inverse.reshape(-1), self.counts.T)
+        return self._from_matrix(counts.T, values, len(bits), kept_registers)
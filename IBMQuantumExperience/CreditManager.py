@@ -0,0 +1,247 @@
+"""
+    Local admission of the jobs by the credits they cost
+"""
+import logging
+import math
+import threading
+import time
+
+from .IBMQuantumExperience import ApiError, InsufficientCreditsError
+from .IBMQuantumExperience import JOB_FINAL_STATES, _remaining_time
+
+log = logging.getLogger(__name__)
+_clock = getattr(time, 'monotonic', time.time)
+
+_SCOPE = ('hub', 'group', 'project')
+
+
+def _job_size(data):
+    """
+    Get the number of experiments, shots and maximum credits of a job, as
+    sent to the API
+    """
+    if 'qObject' in data:
+        config = data['qObject'].get('config') or {}
+        return (len(data['qObject'].get('experiments', [])),
+                config.get('shots', 1),
+                data.get('maxCredits') or config.get('max_credits'))
+    return (len(data.get('qasms', [])), data.get('shots', 1),
+            data.get('maxCredits'))
+
+
+class CreditManager(object):
+    """
+    Cached credit balance of the user, used to admit the jobs before they
+    are sent.
+
+    The cost of each job is estimated from its experiments, shots and
+    backend (at most its max_credits), and reserved while the job runs: a
+    job is admitted only if the balance minus the credits reserved covers
+    it. Otherwise, it is held until enough credits are released, for at
+    most ``wait`` seconds, and then rejected with InsufficientCreditsError.
+
+    The balance is fetched with ``get_my_credits`` at most every
+    ``refresh_interval`` seconds. The reservations of the jobs that have
+    finished are then released, as their cost is in the new balance. If
+    the balance is unknown (for users without credits), every job is
+    admitted.
+    """
+    def __init__(self, api, refresh_interval=60.0, rates=None,
+                 default_rate=1.0, wait=0):
+        """
+        Args:
+            api (IBMQuantumExperience): connection used to fetch the
+                balance.
+            refresh_interval (float): seconds between the fetches of the
+                balance.
+            rates (dict): credits per experiment of 1024 shots, by backend.
+            default_rate (float): credits per experiment of 1024 shots of
+                the other devices (the simulators are free).
+            wait (float): seconds to hold a job that cannot be afforded
+                before rejecting it (None to wait without limit).
+        """
+        self.api = api
+        self.refresh_interval = refresh_interval
+        self.rates = dict(rates or {})
+        self.default_rate = default_rate
+        self.wait = wait
+        self._balance = None
+        self._refreshed = None
+        self._reservations = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def balance(self):
+        """
+        The last balance fetched, or None if unknown
+        """
+        if self._stale():
+            self.refresh()
+        return self._balance
+
+    @property
+    def reserved(self):
+        """
+        The credits reserved by the jobs submitted and not finished yet
+        """
+        with self._lock:
+            return sum(reservation['cost']
+                       for reservation in self._reservations.values())
+
+    def available(self):
+        """
+        Get the credits that can be spent by new jobs, or None if unknown
+        """
+        balance = self.balance
+        if balance is None:
+            return None
+        return balance - self.reserved
+
+    def estimate(self, data, simulator=False):
+        """Estimate the credits a job costs.
+
+        Args:
+            data (dict): the job, as sent to the API.
+            simulator (bool): whether the backend of the job is a simulator.
+
+        Returns:
+            int: the credits.
+        """
+        if simulator:
+            return 0
+        experiments, shots, max_credits = _job_size(data)
+        rate = self.rates.get(data['backend']['name'], self.default_rate)
+        cost = int(math.ceil(rate * max(experiments, 1) * shots / 1024.0))
+        if max_credits:
+            # The platform never charges more than the maximum.
+            cost = min(cost, max_credits)
+        return cost
+
+    def acquire(self, key, cost, timeout=None):
+        """Reserve the credits of a job about to be submitted.
+
+        Args:
+            key (str): key of the reservation (the idempotency key of the
+                job).
+            cost (int): credits of the job.
+            timeout (float): seconds to wait for the credits (by default,
+                ``wait``), never past the deadline of the current call.
+
+        Raises:
+            InsufficientCreditsError: if the credits are still not available
+                after the timeout.
+            ApiTimeoutError: if the deadline of the call is exceeded first.
+        """
+        if timeout is None:
+            timeout = self.wait
+        end = None if timeout is None else _clock() + timeout
+        while True:
+            if self._stale():
+                self.refresh()
+            with self._lock:
+                if self._reservations.get(key):
+                    # Submitted again: keep the reservation.
+                    return
+                available = None
+                if self._balance is not None:
+                    available = self._balance - sum(
+                        reservation['cost']
+                        for reservation in self._reservations.values())
+                if not cost or available is None or cost <= available:
+                    self._reservations[key] = {'cost': cost, 'ids': None,
+                                               'scope': None}
+                    return
+                remaining = None if end is None else end - _clock()
+                if remaining is not None and remaining <= 0:
+                    raise InsufficientCreditsError(cost, available)
+                # Woken up when credits are released, or to fetch the
+                # balance again, or at the deadline of the call.
+                self._changed.wait(min(
+                    value for value in (remaining, _remaining_time(),
+                                        self.refresh_interval)
+                    if value is not None))
+
+    def assign(self, key, ids, hub=None, group=None, project=None):
+        """
+        Record the ids of the jobs submitted for a reservation (the
+        reservation is released if there are none)
+        """
+        with self._lock:
+            reservation = self._reservations.get(key)
+            if reservation is None:
+                return
+            ids = set(id_job for id_job in ids if id_job)
+            if not ids:
+                del self._reservations[key]
+                self._changed.notify_all()
+                return
+            reservation['ids'] = ids
+            reservation['scope'] = (hub, group, project)
+
+    def release(self, key):
+        """
+        Release a reservation, after its job was not submitted
+        """
+        with self._lock:
+            if self._reservations.pop(key, None) is not None:
+                self._changed.notify_all()
+
+    def release_jobs(self, ids):
+        """
+        Release the credits of jobs that have finished
+        """
+        ids = set(ids)
+        with self._lock:
+            for key, reservation in list(self._reservations.items()):
+                if reservation['ids'] and reservation['ids'] & ids:
+                    reservation['ids'] -= ids
+                    if not reservation['ids']:
+                        del self._reservations[key]
+                        # The balance has to be fetched again to include
+                        # the cost of the job.
+                        self._refreshed = None
+            self._changed.notify_all()
+
+    def refresh(self):
+        """
+        Release the reservations of the jobs that have finished, and fetch
+        the balance
+        """
+        with self._refresh_lock:
+            self._reconcile()
+            try:
+                credit = self.api.get_my_credits()
+            except ApiError as ex:
+                log.warning('Could not get the credits: %s', ex)
+                credit = None
+            with self._lock:
+                self._refreshed = _clock()
+                if isinstance(credit, dict):
+                    self._balance = credit.get('remaining')
+                self._changed.notify_all()
+
+    def _stale(self):
+        refreshed = self._refreshed
+        return (refreshed is None or
+                _clock() - refreshed >= self.refresh_interval)
+
+    def _reconcile(self):
+        scopes = {}
+        with self._lock:
+            for reservation in self._reservations.values():
+                if reservation['ids']:
+                    scopes.setdefault(reservation['scope'], set()).update(
+                        reservation['ids'])
+        for scope, ids in scopes.items():
+            try:
+                jobs = self.api.get_jobs_by_id(
+                    sorted(ids), fields=['id', 'status'],
+                    **dict(zip(_SCOPE, scope)))
+            except ApiError as ex:
+                log.warning('Could not get the status of the jobs: %s', ex)
+                continue
+            if isinstance(jobs, list):
+                self.release_jobs(job['id'] for job in jobs
+                                  if job.get('status') in JOB_FINAL_STATES)
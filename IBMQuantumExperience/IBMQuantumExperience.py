@@ -5,18 +5,54 @@ try:
     import simplejson as json
 except ImportError:
     import json
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 import time
 import logging
+import base64
+import binascii
+import os
+import random
+import threading
+import collections
+import contextlib
+import copy
+import functools
+import hashlib
+import uuid
 from datetime import datetime
 import sys
 import traceback
 import requests
+from requests.compat import quote, urlparse
 import re
+from concurrent.futures import FIRST_COMPLETED, Future
+from concurrent.futures import wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from requests_ntlm import HttpNtlmAuth
-# from .HTTPProxyDigestAuth import HTTPProxyDigestAuth
+from .BackendRefresher import BackendRefresher
+from .CompositeJob import CompositeJob, split_job_data, split_job_shots
+from .SharedCache import SharedCache, replace_file
+from .SubmissionJournal import SubmissionJournal
+from .Transport import get_transport
+from .HTTPProxyDigestAuth import HTTPProxyDigestAuth
+from .JobValidator import JobValidator, REGISTER_SIZE
 
 log = logging.getLogger(__name__)
 CLIENT_APPLICATION = 'qiskit-api-py'
+_ID_SEGMENT_RE = re.compile(r'^([0-9a-fA-F]{16,}|\d+)$')
+_SECRET_RE = re.compile(r'((?:access_token|apiToken)=)[^&#]*')
+_clock = getattr(time, 'monotonic', time.time)
+_DEFAULT_TIMEOUT = {'connect': 10.0, 'read': 60.0}
+_DEFAULT_CACHE_TTL = {'backends': 60.0, 'backend_status': 5.0,
+                      'codes': 3600.0}
+_DEFAULT_LOGIN_TTL = 3600.0
+# Statuses of the jobs that do not change anymore.
+JOB_FINAL_STATES = frozenset(['COMPLETED', 'CANCELLED', 'ERROR_CREATING_JOB',
+                              'ERROR_VALIDATING_JOB', 'ERROR_RUNNING_JOB'])
+_deadline_local = threading.local()
 
 
 def get_job_url(config, hub, group, project):
@@ -58,6 +94,78 @@ def get_backend_url(config, hub, group, project):
         return '/Network/{}/Groups/{}/Projects/{}/devices'.format(hub, group, project)
     return '/Backends'
 
+
+@contextlib.contextmanager
+def _deadline(seconds):
+    """
+    Context manager that limits the time spent by the API calls made inside
+    it (in the current thread). Nested deadlines never extend the outer one.
+    """
+    previous = getattr(_deadline_local, 'at', None)
+    if seconds is not None:
+        at = _clock() + seconds
+        if previous is None or at < previous:
+            _deadline_local.at = at
+    try:
+        yield
+    finally:
+        _deadline_local.at = previous
+
+
+def _remaining_time():
+    """
+    Util method to get the seconds left before the current deadline
+
+    Returns:
+        float or None: the remaining seconds, or None if there is no deadline.
+
+    Raises:
+        ApiTimeoutError: if the deadline has been exceeded.
+    """
+    at = getattr(_deadline_local, 'at', None)
+    if at is None:
+        return None
+    remaining = at - _clock()
+    if remaining <= 0:
+        raise ApiTimeoutError('deadline exceeded')
+    return remaining
+
+
+def _request_timeout(timeout):
+    """
+    Util method to get the (connect, read) timeout of a request, capped by
+    the current deadline
+    """
+    remaining = _remaining_time()
+    if remaining is None:
+        return timeout
+    return tuple(min(value, remaining) for value in timeout)
+
+
+def _sleep(seconds):
+    """
+    Util method to sleep between retries, without overrunning the deadline
+    """
+    remaining = _remaining_time()
+    if remaining is not None and remaining <= seconds:
+        raise ApiTimeoutError('deadline exceeded')
+    time.sleep(seconds)
+
+
+def _with_deadline(func):
+    """
+    Decorator that lets an API method accept a ``deadline`` keyword argument:
+    the maximum number of seconds the whole call may take, including
+    retries, sleeps between retries and token refreshes. An
+    ``ApiTimeoutError`` is raised when it is exceeded.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _deadline(kwargs.pop('deadline', None)):
+            return func(*args, **kwargs)
+    return wrapper
+
+
 class _Credentials(object):
     """
     The Credential class to manage the tokens
@@ -65,9 +173,14 @@ class _Credentials(object):
     config_base = {'url': 'https://quantumexperience.ng.bluemix.net/api'}
 
     def __init__(self, token, config=None, verify=True, proxy_urls=None,
-                 ntlm_credentials=None):
+                 ntlm_credentials=None, timeout=None, shared_cache=None,
+                 transport=None, proxy_auth=None):
         self.token_unique = token
         self.verify = verify
+        self.shared_cache = shared_cache
+        self.transport = transport or get_transport()
+        self.timeout = timeout or (_DEFAULT_TIMEOUT['connect'],
+                                   _DEFAULT_TIMEOUT['read'])
         self.config = config
         self.proxy_urls = proxy_urls
         self.ntlm_credentials = ntlm_credentials
@@ -76,7 +189,9 @@ class _Credentials(object):
         self.extra_args = {}
         if self.proxy_urls:
             self.extra_args['proxies'] = self.proxy_urls
-        if self.ntlm_credentials:
+        if proxy_auth:
+            self.extra_args['auth'] = proxy_auth
+        elif self.ntlm_credentials:
             self.extra_args['auth'] = HttpNtlmAuth(
                 self.ntlm_credentials['username'],
                 self.ntlm_credentials['password'])
@@ -107,11 +222,42 @@ class _Credentials(object):
     def obtain_token(self, config=None):
         """Obtain the token to access to QX Platform.
 
+        With a shared cache, the token obtained by a process is used by the
+        other processes too, until it expires or is rejected.
+
         Raises:
             CredentialsError: when token is invalid or the user has not
                 accepted the license.
             ApiError: when the response from the server couldn't be parsed.
         """
+        if self.shared_cache is None:
+            self._login(config)
+            return
+
+        if self.token_unique:
+            identity = self.token_unique
+        else:
+            identity = '{}:{}'.format((config or {}).get('email'),
+                                      (config or {}).get('password'))
+        key = 'login:{}:{}'.format(
+            self.config.get('url'),
+            hashlib.sha256(identity.encode('utf-8')).hexdigest())
+        rejected_token = self.get_token()
+
+        def login():
+            self._login(config)
+            return self.data_credentials
+
+        self.data_credentials = dict(self.shared_cache.get_or_refresh(
+            key, login,
+            ttl=lambda data: min(data.get('ttl') or _DEFAULT_LOGIN_TTL,
+                                 _DEFAULT_LOGIN_TTL),
+            is_stale=lambda data: data.get('id') == rejected_token))
+
+    def _login(self, config=None):
+        """
+        Log in the QX Platform, with the API token or the email and password
+        """
         client_application = CLIENT_APPLICATION
         if self.config and ("client_application" in self.config):
             client_application += ':' + self.config["client_application"]
@@ -119,12 +265,16 @@ class _Credentials(object):
 
         if self.token_unique:
             try:
-                response = requests.post(str(self.config.get('url') +
-                                             "/users/loginWithToken"),
-                                         data={'apiToken': self.token_unique},
-                                         verify=self.verify,
-                                         headers=headers,
-                                         **self.extra_args)
+                response = self.transport.request(
+                    'post', str(self.config.get('url') +
+                                "/users/loginWithToken"),
+                    data={'apiToken': self.token_unique},
+                    verify=self.verify,
+                    headers=headers,
+                    timeout=_request_timeout(self.timeout),
+                    **self.extra_args)
+            except requests.Timeout as e:
+                raise ApiTimeoutError('timeout during login: %s' % str(e))
             except requests.RequestException as e:
                 raise ApiError('error during login: %s' % str(e))
         elif config and ("email" in config) and ("password" in config):
@@ -135,12 +285,15 @@ class _Credentials(object):
                 'password': password
             }
             try:
-                response = requests.post(str(self.config.get('url') +
-                                             "/users/login"),
-                                         data=credentials,
-                                         verify=self.verify,
-                                         headers=headers,
-                                         **self.extra_args)
+                response = self.transport.request(
+                    'post', str(self.config.get('url') + "/users/login"),
+                    data=credentials,
+                    verify=self.verify,
+                    headers=headers,
+                    timeout=_request_timeout(self.timeout),
+                    **self.extra_args)
+            except requests.Timeout as e:
+                raise ApiTimeoutError('timeout during login: %s' % str(e))
             except requests.RequestException as e:
                 raise ApiError('error during login: %s' % str(e))
         else:
@@ -199,6 +352,492 @@ class _Credentials(object):
         self.data_credentials['userId'] = user_id
 
 
+def _flatten_qasm_results(job):
+    """
+    Move the data of the results of the qasms of a job to qasms[].data
+    """
+    if 'qasms' in job:
+        for qasm in job['qasms']:
+            if ('result' in qasm) and ('data' in qasm['result']):
+                qasm['data'] = qasm['result']['data']
+                del qasm['result']['data']
+                for key in qasm['result']:
+                    qasm['data'][key] = qasm['result'][key]
+                del qasm['result']
+    return job
+
+
+def _fields_filter(fields):
+    """
+    Build the LoopBack fields filter of a list of field names (or of a
+    dict of field names to booleans)
+    """
+    if fields is None:
+        return None
+    if isinstance(fields, dict):
+        return dict(fields)
+    return dict((field, True) for field in fields)
+
+
+def _idempotent_name(name, key):
+    """
+    Tag a name with an idempotency key, to find the submission by its name
+    """
+    if key is None:
+        return name
+    if name:
+        return '{} [{}]'.format(name, key)
+    return '[{}]'.format(key)
+
+
+def _chunk_key(key, number):
+    """
+    Idempotency key of a chunk of a job, or None without a key
+    """
+    if key is None:
+        return None
+    return '{}-{}'.format(key, number)
+
+
+def _redact(url):
+    """
+    Util method to hide the access token of a url
+    """
+    return _SECRET_RE.sub(r'\1***', url or '')
+
+
+def _endpoint_key(path):
+    """
+    Util method to get the endpoint of a path, replacing ids by a placeholder
+    """
+    return '/'.join('{id}' if _ID_SEGMENT_RE.match(segment) else segment
+                    for segment in path.split('/'))
+
+
+class _CircuitBreaker(object):
+    """
+    Circuit breaker that guards the requests to a single API endpoint.
+
+    The circuit is ``closed`` while the endpoint is healthy. It opens when
+    ``failure_threshold`` consecutive requests fail, or when the failure
+    rate of the last ``window_size`` requests reaches
+    ``error_rate_threshold`` (once at least ``min_calls`` were made).
+    While ``open`` every request fails immediately with a
+    ``CircuitOpenError``. After ``recovery_timeout`` seconds the circuit is
+    ``half_open``: up to ``half_open_max_calls`` probe requests are let
+    through, and the first probe closes or reopens the circuit.
+
+    A request fails when it raises a connection error or the server
+    answers with a 5xx code.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, endpoint, failure_threshold=5, error_rate_threshold=0.5,
+                 window_size=20, min_calls=10, recovery_timeout=30.0,
+                 half_open_max_calls=1):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.min_calls = min_calls
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = self.CLOSED
+        self._outcomes = collections.deque(maxlen=window_size)
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """Check if a request can be sent to the endpoint.
+
+        Returns:
+            bool: True if the request is a half-open probe.
+
+        Raises:
+            CircuitOpenError: if the circuit does not allow the request.
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                elapsed = _clock() - self._opened_at
+                if elapsed < self.recovery_timeout:
+                    raise CircuitOpenError(self.endpoint,
+                                           self.recovery_timeout - elapsed)
+                self.state = self.HALF_OPEN
+                self._probes = 0
+            if self.state == self.HALF_OPEN:
+                if self._probes >= self.half_open_max_calls:
+                    raise CircuitOpenError(self.endpoint)
+                self._probes += 1
+                return True
+            return False
+
+    def after_request(self, success, probe=False):
+        """Record the outcome of a request sent to the endpoint.
+
+        Args:
+            success (bool): whether the request succeeded.
+            probe (bool): whether the request was a half-open probe.
+        """
+        with self._lock:
+            if probe:
+                self._probes -= 1
+                if self.state != self.HALF_OPEN:
+                    return
+                if success:
+                    self._close()
+                else:
+                    self._open()
+                return
+            if self.state != self.CLOSED:
+                return
+            self._outcomes.append(success)
+            if success:
+                self._consecutive_failures = 0
+                return
+            self._consecutive_failures += 1
+            failures = self._outcomes.count(False)
+            if (self._consecutive_failures >= self.failure_threshold or
+                    (len(self._outcomes) >= self.min_calls and
+                     failures >= self.error_rate_threshold *
+                     len(self._outcomes))):
+                self._open()
+
+    def _open(self):
+        log.warning('Circuit breaker opened for endpoint %s', self.endpoint)
+        self.state = self.OPEN
+        self._opened_at = _clock()
+
+    def _close(self):
+        log.info('Circuit breaker closed for endpoint %s', self.endpoint)
+        self.state = self.CLOSED
+        self._outcomes.clear()
+        self._consecutive_failures = 0
+
+
+class _CircuitBreakerRegistry(object):
+    """
+    The circuit breakers of the API endpoints, created on first use
+    """
+    def __init__(self, **options):
+        self.options = options
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """
+        Get the circuit breaker of the endpoint of a path
+        """
+        endpoint = _endpoint_key(path)
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = _CircuitBreaker(endpoint, **self.options)
+                self._breakers[endpoint] = breaker
+            return breaker
+
+    def states(self):
+        """
+        Get the state of the circuit of every endpoint used so far
+        """
+        with self._lock:
+            return dict((endpoint, breaker.state)
+                        for endpoint, breaker in self._breakers.items())
+
+
+class _WorkerPool(object):
+    """
+    Pool of threads that are kept between the calls, so that they keep
+    their connections (the transports keep a session per thread). The
+    thread idle the most recently is reused first, and a thread is started
+    when none is idle: a call only waits for a worker when max_workers
+    threads are busy. Threads idle for idle_timeout seconds exit.
+    """
+    def __init__(self, max_workers=128, idle_timeout=60.0):
+        self.max_workers = max_workers
+        self.idle_timeout = idle_timeout
+        self._idle = []
+        self._workers = 0
+        self._backlog = collections.deque()
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def submit(self, func, *args):
+        """Call a function from a thread of the pool.
+
+        Returns:
+            Future: the future of the result of the function.
+        """
+        future = Future()
+        task = (future, func, args)
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('The pool of workers is shut down')
+            if self._idle:
+                self._idle.pop().put(task)
+                return future
+            if self._workers >= self.max_workers:
+                self._backlog.append(task)
+                return future
+            self._workers += 1
+        thread = threading.Thread(target=self._work, args=(task,),
+                                  name='QXWorker')
+        thread.daemon = True
+        thread.start()
+        return future
+
+    def shutdown(self):
+        """
+        Stop the idle threads, and the others once their task is done
+        """
+        with self._lock:
+            self._shutdown = True
+            for slot in self._idle:
+                slot.put(None)
+            self._idle = []
+            backlog, self._backlog = self._backlog, collections.deque()
+        for future, _, _ in backlog:
+            future.cancel()
+
+    def _next(self, slot):
+        """
+        Wait for the next task of a worker, or None if it has to exit
+        """
+        with self._lock:
+            if self._backlog:
+                return self._backlog.popleft()
+            if self._shutdown:
+                return None
+            self._idle.append(slot)
+        try:
+            return slot.get(timeout=self.idle_timeout)
+        except queue.Empty:
+            with self._lock:
+                if slot in self._idle:
+                    self._idle.remove(slot)
+                    return None
+            # A task was given to the worker meanwhile.
+            return slot.get()
+
+    def _work(self, task):
+        slot = queue.Queue()
+        while task is not None:
+            future, func, args = task
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(func(*args))
+                except BaseException as ex:  # pylint: disable=broad-except
+                    future.set_exception(ex)
+            # Not kept while idle.
+            task = future = func = args = None
+            task = self._next(slot)
+        with self._lock:
+            self._workers -= 1
+
+
+class _Hedger(object):
+    """
+    Sends hedged requests: if a request has not been answered after a delay,
+    a duplicate is sent and the first answer wins.
+
+    The delay of an endpoint is a percentile of its latest latencies (or a
+    fixed delay, if set). A token bucket caps the hedges to max_rate times
+    the requests. Only idempotent requests must be hedged. The requests and
+    their hedges are sent from the threads of a _WorkerPool, which keep
+    their connections between the requests.
+    """
+    def __init__(self, pool=None, percentile=95, delay=None,
+                 initial_delay=0.1, min_samples=20, window_size=100,
+                 max_rate=0.05, burst=10):
+        self.pool = pool if pool is not None else _WorkerPool()
+        self.percentile = percentile
+        self.delay = delay
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.window_size = window_size
+        self.max_rate = max_rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._latencies = {}
+        self._lock = threading.Lock()
+        self.hedged = 0
+
+    def _delay(self, endpoint):
+        if self.delay is not None:
+            return self.delay
+        with self._lock:
+            latencies = sorted(self._latencies.get(endpoint, ()))
+        if len(latencies) < self.min_samples:
+            return self.initial_delay
+        index = int(round(self.percentile / 100.0 * (len(latencies) - 1)))
+        return latencies[index]
+
+    def _record(self, endpoint, latency):
+        with self._lock:
+            latencies = self._latencies.get(endpoint)
+            if latencies is None:
+                latencies = collections.deque(maxlen=self.window_size)
+                self._latencies[endpoint] = latencies
+            latencies.append(latency)
+            self._tokens = min(self.burst, self._tokens + self.max_rate)
+
+    def _take_token(self):
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            self.hedged += 1
+            return True
+
+    def send(self, endpoint, call):
+        """Call a function that sends a request, hedging it if it is slow.
+
+        Args:
+            endpoint (str): endpoint of the request.
+            call (callable): function that sends the request.
+
+        Returns:
+            object: the result of the first call that succeeds.
+        """
+        start = _clock()
+        future = self.pool.submit(call)
+        try:
+            result = future.result(timeout=self._delay(endpoint))
+        except FutureTimeoutError:
+            if not self._take_token():
+                result = future.result()
+            else:
+                log.debug('Hedging request to %s', endpoint)
+                hedge = self.pool.submit(call)
+                done, pending = wait([future, hedge],
+                                     return_when=FIRST_COMPLETED)
+                first = done.pop()
+                if first.exception() is not None:
+                    # Use the other answer, if the first one failed.
+                    first = (done or pending).pop()
+                result = first.result()
+        self._record(endpoint, _clock() - start)
+        return result
+
+
+class _TTLCache(object):
+    """
+    Thread-safe cache whose entries expire after ttl seconds, holding at
+    most max_size entries (the oldest are removed first)
+    """
+    def __init__(self, ttl, max_size=None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Get the value of a key, or None if it is missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or _clock() - entry[1] >= self.ttl:
+                return None
+            return entry[0]
+
+    def set(self, key, value):
+        """
+        Set the value of a key
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, _clock())
+            if self.max_size is not None:
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove all the entries
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+class _Body(object):
+    """
+    Body of a response in a log record, decoded and cut to max_length
+    characters only if the record is formatted
+    """
+    def __init__(self, respond, max_length):
+        self.respond = respond
+        self.max_length = max_length
+
+    def __str__(self):
+        content = self.respond.content or b''
+        text = content[:self.max_length].decode('utf-8', 'replace')
+        if len(content) > self.max_length:
+            text += '... ({} bytes)'.format(len(content))
+        return text
+
+
+class _ErrorLog(object):
+    """
+    Logs the error responses of the API as structured records: the
+    ``status_code``, ``url`` (without the access token) and ``endpoint`` of
+    the response are attributes of the record, and its body is cut to
+    max_body characters.
+
+    Only sample_rate of the errors are logged. An error identical to one
+    logged less than dedup_interval seconds ago (same code, endpoint and
+    body) is only counted, and the count is logged with the next one.
+    Nothing is formatted when the level of the records is disabled.
+    """
+    def __init__(self, sample_rate=1.0, max_body=512, dedup_interval=60.0,
+                 max_errors=1024):
+        self.sample_rate = sample_rate
+        self.max_body = max_body
+        self.dedup_interval = dedup_interval
+        self.max_errors = max_errors
+        self._logged = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def response(self, respond, message, level=logging.WARNING):
+        """Log an error response.
+
+        Args:
+            respond (Response): the response.
+            message (str): message of the record, with placeholders for the
+                code, url and body of the response.
+            level (int): level of the record.
+        """
+        if not log.isEnabledFor(level):
+            return
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+        url = _redact(respond.url)
+        endpoint = _endpoint_key(urlparse(url).path)
+        key = (respond.status_code, endpoint,
+               hash((respond.content or b'')[:self.max_body]))
+        now = _clock()
+        with self._lock:
+            logged = self._logged.pop(key, None)
+            if logged is not None and \
+                    now - logged[0] < self.dedup_interval:
+                logged[1] += 1
+                self._logged[key] = logged
+                return
+            repeated = logged[1] if logged is not None else 0
+            self._logged[key] = [now, 0]
+            while len(self._logged) > self.max_errors:
+                self._logged.popitem(last=False)
+        args = (respond.status_code, url, _Body(respond, self.max_body))
+        if repeated:
+            message += ' (repeated %s times)'
+            args += (repeated,)
+        log.log(level, message, *args, extra={
+            'status_code': respond.status_code, 'url': url,
+            'endpoint': endpoint, 'repeated': repeated})
+
+
 class _Request(object):
     """
     The Request class to manage the methods
@@ -222,45 +861,160 @@ class _Request(object):
         #         # If using 'ntlm', assume NTLM authentication.
         #         'username_ntlm': 'domain\\username',
         #         'password_ntlm': 'password'
+        #         # If using 'digest', assume digest authentication.
+        #         'username_digest': 'username',
+        #         'password_digest': 'password'
         #     }
         # }
+        # The proxy authentication needs the 'requests' transport, which
+        # keeps the authenticated connections open for the next requests
+        # (NTLM authenticates the connection itself: the threads of the
+        # worker pool keep theirs). Digest authentication only works for
+        # http urls, forwarded by the proxy without a CONNECT tunnel.
 
         # Set the basic proxy settings, if present.
         self.proxy_urls = None
         self.ntlm_credentials = None
+        self.proxy_auth = None
         if config and 'proxies' in config:
-            if 'urls' in config['proxies']:
-                self.proxy_urls = self.config['proxies']['urls']
-            if 'username_ntlm' and 'password_ntlm' in config['proxies']:
+            proxies = config['proxies']
+            if 'urls' in proxies:
+                self.proxy_urls = proxies['urls']
+            if 'username_ntlm' in proxies and 'password_ntlm' in proxies:
                 self.ntlm_credentials = {
-                    'username': self.config['proxies']['username_ntlm'],
-                    'password': self.config['proxies']['password_ntlm']
+                    'username': proxies['username_ntlm'],
+                    'password': proxies['password_ntlm']
                 }
+                self.proxy_auth = HttpNtlmAuth(
+                    self.ntlm_credentials['username'],
+                    self.ntlm_credentials['password'])
+            elif 'username_digest' in proxies and 'password_digest' in proxies:
+                # The digest authentication can't answer the proxy for the
+                # CONNECT tunnels of HTTPS.
+                url = (self.config or {}).get(
+                    'url', _Credentials.config_base['url'])
+                if url.lower().startswith('https:'):
+                    raise ApiError(
+                        'digest proxy authentication needs an http url',
+                        'the CONNECT tunnel of {} can not be authenticated '
+                        'with digest'.format(url))
+                self.proxy_auth = HTTPProxyDigestAuth(
+                    proxies['username_digest'], proxies['password_digest'])
 
         # Set the extra arguments to requests (proxy and auth).
         self.extra_args = {}
         if self.proxy_urls:
             self.extra_args['proxies'] = self.proxy_urls
-        if self.ntlm_credentials:
-            self.extra_args['auth'] = HttpNtlmAuth(
-                self.ntlm_credentials['username'],
-                self.ntlm_credentials['password'])
+        if self.proxy_auth:
+            self.extra_args['auth'] = self.proxy_auth
+
+        # Set the network timeouts (in seconds), if present, with the
+        # following format:
+        # config = {
+        #     'timeout': {
+        #         'connect': 10.0,
+        #         'read': 60.0
+        #     }
+        # }
+        timeout = dict(_DEFAULT_TIMEOUT)
+        if self.config and 'timeout' in self.config:
+            timeout.update(self.config['timeout'])
+        self.timeout = (timeout['connect'], timeout['read'])
 
         if self.config and ("client_application" in self.config):
             self.client_application += ':' + self.config["client_application"]
+        # Set the cache shared by the processes of the host, if present,
+        # either as a SharedCache or as the path of its directory:
+        # config = {
+        #     'shared_cache': '/var/cache/qiskit-api-py'
+        # }
+        self.shared_cache = None
+        if self.config and self.config.get('shared_cache'):
+            self.shared_cache = self.config['shared_cache']
+            if not isinstance(self.shared_cache, SharedCache):
+                self.shared_cache = SharedCache(self.shared_cache)
+
+        # Set the transport of the requests, if present, either as a
+        # Transport or as the name of one ('requests', 'urllib3' or
+        # 'http2'):
+        # config = {
+        #     'transport': 'urllib3'
+        # }
+        self.transport = get_transport(
+            self.config.get('transport') if self.config else None)
+
         self.credential = _Credentials(token, self.config, verify,
                                        proxy_urls=self.proxy_urls,
-                                       ntlm_credentials=self.ntlm_credentials)
+                                       ntlm_credentials=self.ntlm_credentials,
+                                       timeout=self.timeout,
+                                       shared_cache=self.shared_cache,
+                                       transport=self.transport,
+                                       proxy_auth=self.proxy_auth)
 
         if not isinstance(retries, int):
             raise TypeError('post retries must be positive integer')
         self.retries = retries
         self.timeout_interval = timeout_interval
+
+        # Set the circuit breakers of the endpoints, if configured, with
+        # the following format (all the keys are optional):
+        # config = {
+        #     'circuit_breaker': {
+        #         'failure_threshold': 5,
+        #         'error_rate_threshold': 0.5,
+        #         'window_size': 20,
+        #         'min_calls': 10,
+        #         'recovery_timeout': 30.0,
+        #         'half_open_max_calls': 1
+        #     }
+        # }
+        self.breakers = None
+        if self.config and 'circuit_breaker' in self.config:
+            self.breakers = _CircuitBreakerRegistry(
+                **self.config['circuit_breaker'])
+        # Set the hedging of the GET requests, if configured, with the
+        # following format (all the keys are optional):
+        # config = {
+        #     'hedging': {
+        #         'percentile': 95,
+        #         'delay': None,
+        #         'max_rate': 0.05
+        #     }
+        # }
+        # The threads of the hedged requests and of the concurrent calls,
+        # kept with their connections.
+        self.workers = _WorkerPool()
+        self.hedger = None
+        if self.config and 'hedging' in self.config:
+            self.hedger = _Hedger(self.workers, **self.config['hedging'])
+        # Set the logging of the error responses, if present, with the
+        # following format (all the keys are optional):
+        # config = {
+        #     'error_log': {
+        #         'sample_rate': 1.0,
+        #         'max_body': 512,
+        #         'dedup_interval': 60.0
+        #     }
+        # }
+        self.error_log = _ErrorLog(
+            **((self.config or {}).get('error_log') or {}))
+        self._local = threading.local()
         self.result = None
         self._max_qubit_error_re = re.compile(
             r".*registers exceed the number of qubits, "
             r"it can\'t be greater than (\d+).*")
 
+    @property
+    def result(self):
+        """
+        Result of the last request made by the current thread
+        """
+        return getattr(self._local, 'result', None)
+
+    @result.setter
+    def result(self, value):
+        self._local.result = value
+
     def check_token(self, respond):
         """
         Check is the user's token is valid
@@ -270,9 +1024,13 @@ class _Request(object):
             return False
         return True
 
-    def post(self, path, params='', data=None):
+    def post(self, path, params='', data=None, recover=None):
         """
         POST Method Wrapper of the REST API
+
+        If recover is given, it is called before sending the request again
+        after a failed attempt; if it returns something (eg. the job created
+        by the failed attempt), it is returned instead of sending again.
         """
         self.result = None
         data = data or {}
@@ -280,29 +1038,8 @@ class _Request(object):
                    'x-qx-client-application': self.client_application}
         url = str(self.credential.config['url'] + path + '?access_token=' +
                   self.credential.get_token() + params)
-        retries = self.retries
-        while retries > 0:
-            respond = requests.post(url, data=data, headers=headers,
-                                    verify=self.verify, **self.extra_args)
-            if not self.check_token(respond):
-                respond = requests.post(url, data=data, headers=headers,
-                                        verify=self.verify,
-                                        **self.extra_args)
-
-            if self._response_good(respond):
-                if self.result:
-                    return self.result
-                elif retries < 2:
-                    return respond.json()
-                else:
-                    retries -= 1
-            else:
-                retries -= 1
-                time.sleep(self.timeout_interval)
-
-        # timed out
-        raise ApiError(usr_msg='Failed to get proper ' +
-                       'response from backend.')
+        return self._send('post', path, url, recover=recover, data=data,
+                          headers=headers)
 
     def put(self, path, params='', data=None):
         """
@@ -314,27 +1051,7 @@ class _Request(object):
                    'x-qx-client-application': self.client_application}
         url = str(self.credential.config['url'] + path + '?access_token=' +
                   self.credential.get_token() + params)
-        retries = self.retries
-        while retries > 0:
-            respond = requests.put(url, data=data, headers=headers,
-                                   verify=self.verify, **self.extra_args)
-            if not self.check_token(respond):
-                respond = requests.put(url, data=data, headers=headers,
-                                       verify=self.verify,
-                                       **self.extra_args)
-            if self._response_good(respond):
-                if self.result:
-                    return self.result
-                elif retries < 2:
-                    return respond.json()
-                else:
-                    retries -= 1
-            else:
-                retries -= 1
-                time.sleep(self.timeout_interval)
-        # timed out
-        raise ApiError(usr_msg='Failed to get proper ' +
-                       'response from backend.')
+        return self._send('put', path, url, data=data, headers=headers)
 
     def get(self, path, params='', with_token=True):
         """
@@ -347,15 +1064,231 @@ class _Request(object):
             if access_token:
                 access_token = '?access_token=' + str(access_token)
         url = self.credential.config['url'] + path + access_token + params
-        retries = self.retries
         headers = {'x-qx-client-application': self.client_application}
+        return self._send('get', path, url, headers=headers)
+
+    def download(self, path, destination, params='', url=None,
+                 checksum=None, chunk_size=65536):
+        """Stream the response of a GET request to a file, a chunk at a time.
+
+        When the download is interrupted, it is resumed from the last byte
+        received with a range request, if the body has a validator (ETag or
+        Last-Modified date): the range is sent with If-Range, so that a body
+        that changed meanwhile is started again. The body is requested
+        without encoding. The SHA-256 digest of the body is computed while
+        it is written, and checked against the checksum given or the one
+        announced by the server (with a Digest or Content-MD5 header).
+
+        Args:
+            path (str): path of the API endpoint.
+            destination (str or file): path of the file, or binary file-like
+                object, to write the body to. A file is first written to
+                ``destination + '.part'`` (with its validator in
+                ``destination + '.part.json'``), which is resumed by the
+                next download if this one fails.
+            params (str): extra query parameters.
+            url (str): full url to download instead of the endpoint (sent
+                without the access token).
+            checksum (str): expected SHA-256 digest of the body, in hex.
+            chunk_size (int): bytes read at a time.
+
+        Returns:
+            dict: the 'size' of the body, its 'sha256' digest and its
+                'content_type'.
+
+        Raises:
+            ApiError: if the body could not be downloaded after the retries.
+            ChecksumError: if the body does not match its checksum.
+            ApiTimeoutError: if the deadline timed out.
+            CircuitOpenError: if the circuit of the endpoint is open.
+        """
+        self.result = None
+        to_file = not hasattr(destination, 'write')
+        state_path = None
+        if to_file:
+            part_path = destination + '.part'
+            state_path = part_path + '.json'
+            output = open(part_path, 'ab+')
+            start = 0
+        else:
+            output = destination
+            try:
+                start = output.tell()
+            except (AttributeError, IOError, ValueError):
+                start = None
+        try:
+            download = _Download(output, start, resume=to_file,
+                                 state_path=state_path)
+            content_type = self._download(path, params, url, download,
+                                          chunk_size)
+        except Exception:
+            if to_file:
+                output.close()
+            raise
+        sha256 = download.digest.hexdigest()
+        expected = checksum or download.announced
+        if to_file:
+            output.close()
+        if to_file:
+            download.clear()
+        if expected is not None and \
+                expected.lower() != download.hexdigest(expected):
+            if to_file:
+                os.remove(part_path)
+            raise ChecksumError(
+                usr_msg='The download of {} does not match its '
+                'checksum'.format(path),
+                dev_msg='Expected {}, got {}'.format(
+                    expected, download.hexdigest(expected)))
+        if to_file:
+            replace_file(part_path, destination)
+        return {'size': download.size, 'sha256': sha256,
+                'content_type': content_type}
+
+    def _download(self, path, params, url, download, chunk_size):
+        """
+        Send the requests of a download until the whole body is written,
+        and return its content type
+        """
+        breaker = None
+        if self.breakers is not None:
+            breaker = self.breakers.get(path)
+        # The ranges are offsets in the body as sent.
+        headers = {'x-qx-client-application': self.client_application,
+                   'Accept-Encoding': 'identity'}
+        retries = self.retries
+        while True:
+            headers.pop('Range', None)
+            headers.pop('If-Range', None)
+            if download.size and not download.resumable:
+                download.restart()
+            if download.size:
+                headers['Range'] = 'bytes={}-'.format(download.size)
+                headers['If-Range'] = download.validator
+            request_url = url
+            if request_url is None:
+                request_url = (self.credential.config['url'] + path +
+                               '?access_token=' +
+                               (self.credential.get_token() or '') + params)
+            timeout = _request_timeout(self.timeout)
+            probe = breaker.before_request() if breaker else False
+            success = False
+            respond = None
+            error = None
+            try:
+                respond = self.transport.request(
+                    'get', request_url, headers=headers, verify=self.verify,
+                    timeout=timeout, stream=True, **self.extra_args)
+                success = respond.status_code < 500
+                if respond.status_code == 416 and download.size:
+                    # The range is past the end: download it all again.
+                    download.restart()
+                    error = 'Range not satisfiable'
+                elif respond.status_code == 206 and \
+                        download.range_start(respond) != download.size:
+                    download.restart()
+                    error = 'Got the range {} instead of {}-'.format(
+                        respond.headers.get('content-range'), download.size)
+                elif respond.status_code in (200, 206):
+                    if respond.status_code == 200 and download.size:
+                        # The server ignored the range, or the body changed.
+                        download.restart()
+                    download.announce(respond)
+                    for chunk in respond.iter_content(chunk_size):
+                        download.write(chunk)
+                    if download.complete(respond):
+                        return respond.headers.get('content-type')
+                    error = 'Incomplete body'
+                elif self.check_token(respond) and \
+                        respond.status_code < 500:
+                    raise ApiError(
+                        usr_msg='Got a {} code response to {}: {}'.format(
+                            respond.status_code, path, respond.text))
+                else:
+                    error = 'Got a {} code response'.format(
+                        respond.status_code)
+            except requests.RequestException as e:
+                success = False
+                error = str(e)
+            finally:
+                if respond is not None:
+                    respond.close()
+                if breaker:
+                    breaker.after_request(success, probe)
+            retries -= 1
+            if retries <= 0:
+                raise ApiError(usr_msg='Failed to download {} from '
+                               'backend.'.format(path), dev_msg=error)
+            log.info('Download of %s interrupted at %s bytes, resuming: %s',
+                     path, download.size, error)
+            _sleep(self.timeout_interval)
+
+    def _send(self, method, path, url, recover=None, **kwargs):
+        """Send a request, retrying until a proper response is obtained.
+
+        Args:
+            method (str): HTTP method ('get', 'post' or 'put').
+            path (str): path of the API endpoint, used to select the
+                circuit breaker.
+            url (str): full url of the request.
+            recover (callable): function called before each retry, whose
+                result (if not None) is returned instead of retrying.
+            **kwargs: extra arguments passed to the transport.
+
+        Returns:
+            dict or list or str: the response of the server.
+
+        Raises:
+            ApiError: if no proper response is obtained after the retries.
+            ApiTimeoutError: if the request or the deadline timed out.
+            CircuitOpenError: if the circuit of the endpoint is open.
+        """
+        send = functools.partial(self.transport.request, method)
+        kwargs.update(self.extra_args)
+        breaker = None
+        if self.breakers is not None:
+            breaker = self.breakers.get(path)
+        retries = self.retries
         while retries > 0:  # Repeat until no error
-            respond = requests.get(url, verify=self.verify, headers=headers,
-                                   **self.extra_args)
-            if not self.check_token(respond):
-                respond = requests.get(url, verify=self.verify,
-                                       headers=headers, **self.extra_args)
-            if self._response_good(respond):
+            if recover is not None and retries < self.retries:
+                recovered = recover()
+                if recovered is not None:
+                    return recovered
+            timeout = _request_timeout(self.timeout)
+            probe = breaker.before_request() if breaker else False
+            success = False
+            respond = None
+            try:
+                if self.hedger is not None and method == 'get':
+                    respond = self.hedger.send(
+                        _endpoint_key(path),
+                        lambda: send(url, verify=self.verify,
+                                     timeout=timeout, **kwargs))
+                else:
+                    respond = send(url, verify=self.verify, timeout=timeout,
+                                   **kwargs)
+                if not self.check_token(respond):
+                    respond = send(url, verify=self.verify,
+                                   timeout=_request_timeout(self.timeout),
+                                   **kwargs)
+                success = respond.status_code < 500
+            except requests.Timeout as e:
+                # Without a deadline, the timeout of the request is the limit
+                # of the call. Within a deadline, the request is sent again
+                # while there is time left, unless it is a POST that could
+                # then be submitted twice.
+                if (retries < 2 or _remaining_time() is None or
+                        (method != 'get' and recover is None)):
+                    raise ApiTimeoutError(usr_msg='Timeout waiting for '
+                                          'response from backend.',
+                                          dev_msg=str(e))
+            finally:
+                if breaker:
+                    breaker.after_request(success, probe)
+            if respond is None:
+                retries -= 1
+                _sleep(self.timeout_interval)
+            elif self._response_good(respond):
                 if self.result:
                     return self.result
                 elif retries < 2:
@@ -364,7 +1297,7 @@ class _Request(object):
                     retries -= 1
             else:
                 retries -= 1
-                time.sleep(self.timeout_interval)
+                _sleep(self.timeout_interval)
         # timed out
         raise ApiError(usr_msg='Failed to get proper ' +
                        'response from backend.')
@@ -382,14 +1315,18 @@ class _Request(object):
             ApiError: response isn't formatted properly.
         """
         if respond.status_code != requests.codes.ok:
-            log.warning('Got a {} code response to {}: {}'.format(
-                respond.status_code,
-                respond.url,
-                respond.text))
+            self.error_log.response(respond,
+                                    'Got a %s code response to %s: %s')
+            if respond.status_code == 413:
+              raise PayloadTooLargeError(
+                usr_msg='Got a {} code response to {}: {}'.format(
+                  respond.status_code,
+                  _redact(respond.url),
+                  respond.text))
             if respond.status_code in self.errorsNotRetry:
               raise ApiError(usr_msg='Got a {} code response to {}: {}'.format(
                 respond.status_code,
-                respond.url,
+                _redact(respond.url),
                 respond.text))
             else:
               return self._parse_response(respond)
@@ -407,7 +1344,7 @@ class _Request(object):
             msg = ('JSON not a list or dict: url: {0},'
                    'status: {1}, reason: {2}, text: {3}')
             raise ApiError(
-                usr_msg=msg.format(respond.url,
+                usr_msg=msg.format(_redact(respond.url),
                                    respond.status_code,
                                    respond.reason, respond.text))
         if ('error' not in self.result or
@@ -415,7 +1352,8 @@ class _Request(object):
                  self.result['error']['status'] != 400)):
             return True
         else:
-            log.warning("Got a 400 code JSON response to %s", respond.url)
+            self.error_log.response(
+                respond, 'Got a %s code JSON response to %s: %s')
             return False
 
     def _parse_response(self, respond):
@@ -443,14 +1381,171 @@ class _Request(object):
         return True
 
 
+class _Download(object):
+    """
+    Progress of a download to a file-like object, with the digest of the
+    bytes written.
+
+    The download is only resumed with a range request if the response had
+    a validator (a strong ETag, or else its Last-Modified date), sent with
+    If-Range so that the server sends the whole body again if it changed,
+    and if the body was not encoded.
+    """
+    def __init__(self, output, start, resume=False, state_path=None):
+        """
+        Args:
+            output (file): file-like object the body is written to.
+            start (int): position of the body in the output, or None if the
+                output cannot be rewound.
+            resume (bool): whether to resume the download after the bytes
+                already in the output (read back for the digest).
+            state_path (str): file keeping the validator of the body, to
+                resume it in another download.
+        """
+        self.output = output
+        self.start = start
+        self.state_path = state_path
+        self.digest = hashlib.sha256()
+        self.announced = None
+        self.validator = None
+        self.encoded = False
+        self._md5 = None
+        self.size = 0
+        if resume:
+            output.seek(start)
+            for chunk in iter(lambda: output.read(65536), b''):
+                self.digest.update(chunk)
+            self.size = output.tell() - start
+            self.validator = self._load_validator()
+            if self.size and self.validator is None:
+                # The bytes cannot be checked against the current body.
+                self.restart()
+
+    @property
+    def resumable(self):
+        """
+        Whether the download can go on from the bytes written
+        """
+        return self.validator is not None and not self.encoded
+
+    def _load_validator(self):
+        if self.state_path is None:
+            return None
+        try:
+            with open(self.state_path) as state_file:
+                return json.load(state_file).get('validator')
+        except (IOError, OSError, ValueError):
+            return None
+
+    def _save_validator(self):
+        if self.state_path is None:
+            return
+        with open(self.state_path, 'w') as state_file:
+            json.dump({'validator': self.validator}, state_file)
+
+    def clear(self):
+        """
+        Remove the validator kept for another download
+        """
+        if self.state_path is not None and os.path.exists(self.state_path):
+            os.remove(self.state_path)
+
+    def write(self, chunk):
+        self.output.write(chunk)
+        self.digest.update(chunk)
+        if self._md5 is not None:
+            self._md5.update(chunk)
+        self.size += len(chunk)
+
+    def restart(self):
+        try:
+            self.output.seek(self.start)
+            self.output.truncate()
+        except (AttributeError, IOError, TypeError, ValueError):
+            raise ApiError(usr_msg='The download cannot be resumed, and the '
+                           'output cannot be rewound')
+        self.digest = hashlib.sha256()
+        if self._md5 is not None:
+            self._md5 = hashlib.md5()
+        self.size = 0
+
+    def range_start(self, respond):
+        """
+        Get the first byte of the body of a 206 response, or None
+        """
+        content_range = respond.headers.get('content-range') or ''
+        match = re.match(r'bytes (\d+)-', content_range)
+        return int(match.group(1)) if match else None
+
+    def announce(self, respond):
+        """
+        Take the validator, encoding and checksum announced in the headers
+        of a response, if any
+        """
+        headers = respond.headers
+        self.encoded = (headers.get('content-encoding') or
+                        'identity').lower() != 'identity'
+        if respond.status_code == 200:
+            # A new body: its validator replaces the one kept.
+            etag = headers.get('etag')
+            if etag and not etag.startswith('W/'):
+                self.validator = etag
+            else:
+                self.validator = headers.get('last-modified')
+            self._save_validator()
+        for part in (headers.get('digest') or '').split(','):
+            algorithm, _, value = part.strip().partition('=')
+            if algorithm.lower() == 'sha-256' and value:
+                self.announced = binascii.hexlify(
+                    base64.b64decode(value)).decode('ascii')
+        if self.announced is None and headers.get('content-md5') and \
+                self.size == 0:
+            self.announced = binascii.hexlify(
+                base64.b64decode(headers['content-md5'])).decode('ascii')
+            self._md5 = hashlib.md5()
+
+    def hexdigest(self, expected):
+        """
+        Get the digest of the body with the algorithm of the checksum
+        expected (MD5 has 32 hex digits)
+        """
+        if len(expected) == 32 and self._md5 is not None:
+            return self._md5.hexdigest()
+        return self.digest.hexdigest()
+
+    def complete(self, respond):
+        """
+        Check if the whole body has been received
+        """
+        if respond.headers.get('content-encoding'):
+            # The length is the one of the encoded body.
+            return True
+        content_range = respond.headers.get('content-range') or ''
+        if respond.status_code == 206 and '/' in content_range:
+            total = content_range.rsplit('/', 1)[1]
+            return not total.isdigit() or self.size >= int(total)
+        length = respond.headers.get('content-length')
+        if respond.status_code == 200 and length and length.isdigit():
+            return self.size >= int(length)
+        return True
+
+
 class IBMQuantumExperience(object):
     """
     The Connector Class to do request to QX Platform
+
+    Every public method accepts a ``deadline`` keyword argument: the maximum
+    number of seconds the call may take, including retries and token
+    refreshes. ``ApiTimeoutError`` is raised when it is exceeded.
     """
     __names_backend_ibmqxv2 = ['ibmqx5qv2', 'ibmqx2', 'qx5qv2', 'qx5q', 'real']
     __names_backend_ibmqxv3 = ['ibmqx3']
     __names_backend_simulator = ['simulator', 'sim_trivial_2',
                                  'ibmqx_qasm_simulator', 'ibmq_qasm_simulator']
+    max_workers = 8
+    max_url_length = 2000
+    poll_interval = 2.0
+    max_poll_interval = 30.0
 
     def __init__(self, token=None, config=None, verify=True):
         """ If verify is set to false, ignore SSL certificate errors """
@@ -477,6 +1572,112 @@ class IBMQuantumExperience(object):
 
         self.req = _Request(token, config=config, verify=verify)
 
+        # Set the time to live (in seconds) of the backend list used to
+        # check the backends, of the backend statuses used to rank them and
+        # of the code documents, if present, with the following format:
+        # config = {
+        #     'cache_ttl': {
+        #         'backends': 60.0,
+        #         'backend_status': 5.0,
+        #         'codes': 3600.0
+        #     }
+        # }
+        cache_ttl = dict(_DEFAULT_CACHE_TTL)
+        if self.config and 'cache_ttl' in self.config:
+            cache_ttl.update(self.config['cache_ttl'])
+        self._backends_cache = _TTLCache(cache_ttl['backends'])
+        self._status_cache = _TTLCache(cache_ttl['backend_status'])
+        self._codes_cache = _TTLCache(cache_ttl['codes'], max_size=1024)
+        self._validators = {}
+        self.refresher = None
+        self._poller = None
+        self._poller_lock = threading.Lock()
+
+        # Set the journal of the submissions, used to never submit a job
+        # twice, if present, either as a SubmissionJournal or as the path
+        # of its file (by default, it is kept in memory):
+        # config = {
+        #     'journal': '/var/lib/qiskit-api-py/journal.json'
+        # }
+        self.journal = None
+        if self.config and self.config.get('journal'):
+            self.journal = self.config['journal']
+            if not isinstance(self.journal, SubmissionJournal):
+                self.journal = SubmissionJournal(self.journal)
+        if self.journal is None:
+            self.journal = SubmissionJournal()
+
+        # Set the admission of the jobs by their cost in credits, if
+        # present, either as a CreditManager or as its options (by default,
+        # the jobs are sent whatever their cost):
+        # config = {
+        #     'credits': {
+        #         'refresh_interval': 60.0,
+        #         'rates': {'ibmqx5': 2.0},
+        #         'wait': 300.0
+        #     }
+        # }
+        self.credits = None
+        if self.config and self.config.get('credits'):
+            # Imported here, as the module of the credits imports this one.
+            from .CreditManager import CreditManager
+            self.credits = self.config['credits']
+            if not isinstance(self.credits, CreditManager):
+                self.credits = CreditManager(self, **self.credits)
+
+    def close(self):
+        """
+        Stop the threads of the client and release its connections
+        """
+        self.stop_refresher()
+        if self._poller is not None:
+            self._poller.stop()
+        self.req.workers.shutdown()
+        self.req.transport.close()
+
+    def _map(self, func, items, max_workers=None):
+        """
+        Call func on every item from the pool of threads of the client
+        (at most max_workers at a time), within the deadline of the caller,
+        and return the results in the order of the items
+
+        The caller works on the items too, so that the calls made from the
+        threads of the pool never wait for a free one.
+        """
+        items = list(items)
+        if not items:
+            return []
+        remaining = _remaining_time()
+        pending = iter(enumerate(items))
+        results = [None] * len(items)
+        errors = []
+        lock = threading.Lock()
+
+        def work():
+            with _deadline(remaining):
+                while True:
+                    with lock:
+                        index, item = next(pending, (None, None))
+                        if index is None or errors:
+                            return
+                    try:
+                        results[index] = func(item)
+                    except Exception as ex:  # pylint: disable=broad-except
+                        with lock:
+                            errors.append((index, ex))
+
+        max_workers = min(max_workers or self.max_workers, len(items))
+        helpers = [self.req.workers.submit(work)
+                   for _ in range(max_workers - 1)]
+        work()
+        for helper in helpers:
+            # The helpers not started yet have nothing left to do.
+            if not helper.cancel():
+                helper.result()
+        if errors:
+            raise min(errors, key=lambda error: error[0])[1]
+        return results
+
     def _check_backend(self, backend, endpoint):
         """
         Check if the name of a backend is valid to run in QX Platform
@@ -493,22 +1694,71 @@ class IBMQuantumExperience(object):
                 return 'sim_trivial_2'
 
         # Check for new-style backends
-        backends = self.available_backends()
+        backends = self._cached_backends()
         for backend in backends:
             if backend['name'] == original_backend:
               return original_backend
         # backend unrecognized
         return None
 
+    def _validate_job(self, backend_type, data):
+        """
+        Check a job against the cached configuration of its backend, without
+        sending it. Backends without a configuration are not checked.
+        """
+        validator = None
+        for backend in self._cached_backends():
+            if backend['name'] == backend_type:
+                cached = self._validators.get(backend_type)
+                if cached is not None and cached[0] is backend:
+                    validator = cached[1]
+                else:
+                    # The backend list was refreshed: check the new limits.
+                    validator = JobValidator(backend)
+                    self._validators[backend_type] = (backend, validator)
+                break
+        if validator is None:
+            return
+        problem = validator.validate(data)
+        if problem is not None:
+            kind, message = problem
+            if kind == REGISTER_SIZE:
+                raise RegisterSizeError(message)
+            raise JobValidationError(message)
+
+    def _cached_backends(self, hub=None, group=None, project=None):
+        """
+        Get the backends available, from the cache if it is fresh (or from
+        the cache shared with the other processes, if any)
+        """
+        url = get_backend_url(self.config, hub, group, project)
+        backends = self._backends_cache.get(url)
+        if backends is None and self.req.shared_cache is not None:
+            backends = self.req.shared_cache.get_or_refresh(
+                'backends:' + self.req.credential.config['url'] + url,
+                lambda: self.available_backends(hub, group, project),
+                self._backends_cache.ttl)
+            self._backends_cache.set(url, backends)
+        elif backends is None:
+            backends = self.available_backends(hub, group, project)
+        return backends
+
+    @_with_deadline
     def check_credentials(self):
         """
         Check if the user has permission in QX platform
         """
         return bool(self.req.credential.get_token())
 
-    def get_execution(self, id_execution, access_token=None, user_id=None):
+    @_with_deadline
+    def get_execution(self, id_execution, access_token=None, user_id=None,
+                      include_code=True, include_executions=True):
         """
         Get a execution, by its id
+
+        Unless include_code is False, the code of the execution is embedded,
+        as returned by get_code (with its last executions, unless
+        include_executions is False).
         """
         if access_token:
             self.req.credential.set_token(access_token)
@@ -517,10 +1767,12 @@ class IBMQuantumExperience(object):
         if not self.check_credentials():
             raise CredentialsError('credentials invalid')
         execution = self.req.get('/Executions/' + id_execution)
-        if "codeId" in execution:
-            execution['code'] = self.get_code(execution["codeId"])
+        if include_code and "codeId" in execution:
+            execution['code'] = self.get_code(
+                execution["codeId"], include_executions=include_executions)
         return execution
 
+    @_with_deadline
     def get_result_from_execution(self, id_execution, access_token=None, user_id=None):
         """
         Get the result of a execution, by the execution id
@@ -550,9 +1802,15 @@ class IBMQuantumExperience(object):
 
         return result
 
-    def get_code(self, id_code, access_token=None, user_id=None):
+    @_with_deadline
+    def get_code(self, id_code, access_token=None, user_id=None,
+                 include_executions=True):
         """
         Get a code, by its id
+
+        Unless include_executions is False, its last executions are fetched
+        at the same time and embedded. Code documents are kept in memory
+        (see the 'codes' cache_ttl), as they do not change.
         """
         if access_token:
             self.req.credential.set_token(access_token)
@@ -560,13 +1818,34 @@ class IBMQuantumExperience(object):
             self.req.credential.set_user_id(user_id)
         if not self.check_credentials():
             raise CredentialsError('credentials invalid')
-        code = self.req.get('/Codes/' + id_code)
-        executions = self.req.get('/Codes/' + id_code + '/executions',
-                                  '&filter={"limit":3}')
-        if isinstance(executions, list):
-            code["executions"] = executions
+        fetches = [functools.partial(self._code_document, id_code)]
+        if include_executions:
+            fetches.append(functools.partial(
+                self.req.get, '/Codes/' + id_code + '/executions',
+                '&filter={"limit":3}'))
+        if len(fetches) > 1:
+            results = self._map(lambda fetch: fetch(), fetches)
+        else:
+            results = [fetches[0]()]
+        code = results[0]
+        if include_executions and isinstance(results[1], list):
+            code["executions"] = results[1]
         return code
 
+    def _code_document(self, id_code):
+        """
+        Get the document of a code, from the cache if it was fetched before
+        """
+        code = self._codes_cache.get(id_code)
+        if code is None:
+            code = self.req.get('/Codes/' + id_code)
+            if not isinstance(code, dict) or 'error' in code:
+                return code
+            self._codes_cache.set(id_code, code)
+        # Copy it, as the callers add the executions to it.
+        return copy.deepcopy(code)
+
+    @_with_deadline
     def get_image_code(self, id_code, access_token=None, user_id=None):
         """
         Get the image of a code, by its id
@@ -579,9 +1858,29 @@ class IBMQuantumExperience(object):
             raise CredentialsError('credentials invalid')
         return self.req.get('/Codes/' + id_code + '/export/png/url')
 
-    def get_last_codes(self, access_token=None, user_id=None):
+    @_with_deadline
+    def download_image_code(self, id_code, destination, access_token=None,
+                            user_id=None, checksum=None):
+        """
+        Download the image of a code to a file (a path or a binary
+        file-like object), streaming it as in download_job
+        """
+        image = self.get_image_code(id_code, access_token=access_token,
+                                    user_id=user_id)
+        if not isinstance(image, dict) or not image.get('url'):
+            raise ApiError(usr_msg='No image for the code ' + id_code,
+                           dev_msg=str(image))
+        return self.req.download('/Codes/' + id_code + '/export/png',
+                                 destination, url=image['url'],
+                                 checksum=checksum)
+
+    @_with_deadline
+    def get_last_codes(self, access_token=None, user_id=None, fields=None):
         """
         Get the last codes of the user
+
+        If fields (a list of field names) is given, only those fields of
+        the codes are returned.
         """
         if access_token:
             self.req.credential.set_token(access_token)
@@ -590,12 +1889,51 @@ class IBMQuantumExperience(object):
         if not self.check_credentials():
             raise CredentialsError('credentials invalid')
         last = '/users/' + self.req.credential.get_user_id() + '/codes/lastest'
-        return self.req.get(last, '&includeExecutions=true')['codes']
+        params = '&includeExecutions=true'
+        if fields is not None:
+            params += '&filter=' + json.dumps(
+                {'fields': _fields_filter(fields)})
+        return self.req.get(last, params)['codes']
+
+    @_with_deadline
+    def download_last_codes(self, destination, access_token=None,
+                            user_id=None, fields=None, checksum=None):
+        """
+        Download the last codes of the user to a file (a path or a binary
+        file-like object), streaming them as in download_job
 
+        The file holds the response of the server, the codes being in its
+        'codes' field.
+        """
+        if access_token:
+            self.req.credential.set_token(access_token)
+        if user_id:
+            self.req.credential.set_user_id(user_id)
+        if not self.check_credentials():
+            raise CredentialsError('credentials invalid')
+        last = '/users/' + self.req.credential.get_user_id() + '/codes/lastest'
+        params = '&includeExecutions=true'
+        if fields is not None:
+            params += '&filter=' + json.dumps(
+                {'fields': _fields_filter(fields)})
+        return self.req.download(last, destination, params,
+                                 checksum=checksum)
+
+    @_with_deadline
     def run_experiment(self, qasm, backend='simulator', shots=1, name=None,
-                       seed=None, timeout=60, access_token=None, user_id=None):
+                       seed=None, timeout=60, access_token=None, user_id=None,
+                       idempotency_key=None, validate=True):
         """
         Execute an experiment
+
+        Unless validate is False, the registers, shots and gates of the
+        experiment are first checked against the cached configuration of
+        the backend (raising RegisterSizeError or JobValidationError).
+
+        With an idempotency_key, the experiment is submitted at most once:
+        submitting it again with the same key, or retrying a submission
+        whose response was lost, returns the execution already created. The
+        key is then appended to the name, in brackets.
         """
         if access_token:
             self.req.credential.set_token(access_token)
@@ -613,19 +1951,34 @@ class IBMQuantumExperience(object):
                            ' non-simulator backend "{}"'.format(backend))
 
         name = name or 'Experiment #{:%Y%m%d%H%M%S}'.format(datetime.now())
+        name = _idempotent_name(name, idempotency_key)
         qasm = qasm.replace('IBMQASM 2.0;', '').replace('OPENQASM 2.0;', '')
+        if validate:
+            self._validate_job(backend_type, {'qasms': [{'qasm': qasm}],
+                                              'shots': shots})
         data = json.dumps({'qasm': qasm, 'codeType': 'QASM2', 'name': name})
 
         if seed and len(str(seed)) < 11 and str(seed).isdigit():
             params = '&shots={}&seed={}&deviceRunType={}'.format(shots, seed,
                                                                  backend_type)
-            execution = self.req.post('/codes/execute', params, data)
         elif seed:
             raise ApiError('invalid seed ({}), seeds can have'
                            ' a maximum length of 10 digits'.format(seed))
         else:
             params = '&shots={}&deviceRunType={}'.format(shots, backend_type)
+
+        def find():
+            return self._find_execution(name)
+
+        if idempotency_key is None:
             execution = self.req.post('/codes/execute', params, data)
+        else:
+            execution = self._submit_once(
+                idempotency_key,
+                lambda: self.req.post('/codes/execute', params, data,
+                                      recover=find),
+                find, lambda id_execution: self.req.get(
+                    '/Executions/' + id_execution))
         respond = {}
         try:
             status = execution["status"]["id"]
@@ -668,7 +2021,7 @@ class IBMQuantumExperience(object):
                             respond.pop('infoQueue', None)
                             return respond
                         else:
-                            time.sleep(2)
+                            _sleep(2)
                     return respond
                 else:
                     return respond
@@ -676,11 +2029,43 @@ class IBMQuantumExperience(object):
             respond["error"] = execution
             return respond
 
+    @_with_deadline
     def run_job(self, job, backend='simulator', shots=1,
                 max_credits=None, seed=None, hub=None, group=None,
-                project=None, hpc=None, access_token=None, user_id=None):
+                project=None, hpc=None, access_token=None, user_id=None,
+                max_payload_size=None, max_experiments=None,
+                shots_per_job=None, backends=None, idempotency_key=None,
+                validate=True):
         """
         Execute a job
+
+        Unless validate is False, the registers, shots and gates of the job
+        are first checked against the cached configuration of the backend
+        (raising RegisterSizeError or JobValidationError), so that invalid
+        jobs are not sent.
+
+        With an idempotency_key, the job is submitted at most once:
+        submitting it again with the same key, or retrying a submission
+        whose response was lost, returns the job already created. The key
+        is then sent as the name of the job, in brackets.
+
+        If max_payload_size (in bytes) or max_experiments are set, the job
+        is submitted as several jobs, each one within those limits (if
+        max_experiments is not set or 0, the limit advertised by the backend,
+        if any, is used). Chunks rejected by the server as too large (413)
+        are split again.
+
+        If shots_per_job or backends are set, the shots are split into jobs
+        of at most shots_per_job shots, spread over the given equivalent
+        backends (by default, one job per backend).
+
+        In both cases the jobs are submitted concurrently and a CompositeJob
+        is returned, that merges their results as a single job.
+
+        If the credits are managed (with the 'credits' option of the
+        config), the estimated cost of the jobs is reserved before they are
+        sent, and InsufficientCreditsError is raised if the credits left do
+        not cover it.
         """
         if access_token:
             self.req.credential.set_token(access_token)
@@ -726,15 +2111,242 @@ class IBMQuantumExperience(object):
           data['hpc'] = hpc
 
         url = get_job_url(self.config, hub, group, project)
-        
-        job = self.req.post(url, data=json.dumps(data))
+        key = idempotency_key or uuid.uuid4().hex
+
+        chunked = max_payload_size is not None or max_experiments is not None
+        split_shots = shots_per_job is not None or backends is not None
+        if chunked or split_shots:
+            jobs = [data]
+            if split_shots:
+                backend_types = []
+                for name in backends or [backend]:
+                    name_type = self._check_backend(name, 'job')
+                    if not name_type:
+                        raise BadBackendError(name)
+                    backend_types.append(name_type)
+                jobs = split_job_shots(data, shots_per_job, backend_types,
+                                       data.get('seed'))
+            if validate:
+                for job_data in jobs:
+                    self._validate_job(job_data['backend']['name'], job_data)
+            if chunked and not max_experiments:
+                max_experiments = self._backend_max_experiments(backend_type)
+            chunks = []
+            for job_data in jobs:
+                chunks.extend(split_job_data(job_data, max_payload_size,
+                                             max_experiments))
+            self._reserve_credits(key, jobs)
+            submitted = []
+            try:
+                for chunk in self._map(
+                        lambda chunk: self._run_job_chunk(
+                            url, chunk[1][0], chunk[1][1],
+                            _chunk_key(idempotency_key, chunk[0])),
+                        enumerate(chunks)):
+                    submitted.extend(chunk)
+            except Exception:
+                self._release_credits(key)
+                raise
+            composite = CompositeJob(self, [job for job, _ in submitted],
+                                     [indices for _, indices in submitted],
+                                     hub=hub, group=group, project=project)
+            self._assign_credits(key, composite.ids, hub, group, project)
+            return composite
+
+        if validate:
+            self._validate_job(backend_type, data)
+        self._reserve_credits(key, [data])
+        try:
+            job = self._post_job(url, data, idempotency_key)
+        except Exception:
+            self._release_credits(key)
+            raise
+        self._assign_credits(key, [job.get('id')], hub, group, project)
 
         return job
 
+    @_with_deadline
+    def submit_job(self, job, backend='simulator', shots=1, hub=None,
+                   group=None, project=None, **kwargs):
+        """Execute a job, and get a future of its final information.
+
+        The job is submitted with run_job (which accepts the other
+        arguments), and the future is returned as soon as the job is
+        accepted. It is resolved with the result of get_job once the job
+        finishes, by a JobPoller shared by all the futures of the instance:
+        thousands of jobs are polled by a single thread, in few requests.
+        Cancelling the future cancels the job. A job submitted as several
+        jobs is resolved with their information merged, as by CompositeJob.
+
+        Returns:
+            JobFuture: the future of the job.
+
+        Raises:
+            ApiError: if the job was not accepted.
+        """
+        submitted = self.run_job(job, backend=backend, shots=shots, hub=hub,
+                                 group=group, project=project, **kwargs)
+        if isinstance(submitted, CompositeJob):
+            future = self.poller.watch(submitted.ids, hub=hub, group=group,
+                                       project=project,
+                                       merge=submitted.merge)
+        elif not isinstance(submitted, dict) or not submitted.get('id'):
+            raise ApiError(usr_msg='The job was not accepted',
+                           dev_msg=str(submitted))
+        else:
+            future = self.poller.watch([submitted['id']], hub=hub,
+                                       group=group, project=project)
+        if self.credits is not None:
+            future.add_done_callback(
+                lambda future: self.credits.release_jobs(future.ids))
+        return future
+
+    @property
+    def poller(self):
+        """
+        The JobPoller that resolves the futures of submit_job
+        """
+        with self._poller_lock:
+            if self._poller is None:
+                # Imported here, as the module of the futures imports this
+                # one.
+                from .JobFuture import JobPoller
+                self._poller = JobPoller(self, self.poll_interval,
+                                         self.max_poll_interval)
+            return self._poller
+
+    def _reserve_credits(self, key, jobs):
+        """
+        Reserve the credits of the jobs of a submission, if the credits are
+        managed
+        """
+        if self.credits is not None:
+            self.credits.acquire(key, sum(
+                self.credits.estimate(
+                    data, self._is_simulator(data['backend']['name']))
+                for data in jobs))
+
+    def _assign_credits(self, key, ids, hub, group, project):
+        if self.credits is not None:
+            self.credits.assign(key, ids, hub, group, project)
+
+    def _release_credits(self, key):
+        if self.credits is not None:
+            self.credits.release(key)
+
+    def _is_simulator(self, backend_type):
+        """
+        Check if a backend is a simulator
+        """
+        if backend_type in self.__names_backend_simulator:
+            return True
+        for backend in self._cached_backends():
+            if backend['name'] == backend_type:
+                return bool(backend.get('simulator'))
+        return False
+
+    def _run_job_chunk(self, url, data, indices, key):
+        """
+        Submit a chunk of a job, splitting it in halves while it is too large
+        """
+        try:
+            return [(self._post_job(url, data, key), indices)]
+        except PayloadTooLargeError:
+            if len(indices) < 2:
+                raise
+        submitted = []
+        for number, (chunk_data, chunk_indices) in enumerate(split_job_data(
+                data, max_experiments=(len(indices) + 1) // 2)):
+            submitted.extend(self._run_job_chunk(
+                url, chunk_data, [indices[i] for i in chunk_indices],
+                _chunk_key(key, number)))
+        return submitted
+
+    def _post_job(self, url, data, key):
+        """
+        Submit a job, at most once if an idempotency key is given
+        """
+        if key is None:
+            return self.req.post(url, data=json.dumps(data))
+        data = dict(data, name=_idempotent_name(data.get('name'), key))
+
+        def find():
+            jobs = self.req.get(url, '&filter=' + json.dumps(
+                {'where': {'name': data['name']}, 'limit': 1}))
+            return jobs[0] if isinstance(jobs, list) and jobs else None
+
+        return self._submit_once(
+            key,
+            lambda: self.req.post(url, data=json.dumps(data), recover=find),
+            find, lambda id_job: self.req.get(url + '/' + id_job))
+
+    def _find_execution(self, name):
+        """
+        Find the last execution of the code with the given name, among the
+        last codes of the user
+        """
+        last = '/users/' + self.req.credential.get_user_id() + '/codes/lastest'
+        codes = self.req.get(last, '&includeExecutions=true').get('codes', [])
+        for code in codes:
+            if code.get('name') == name and code.get('executions'):
+                execution = dict(code['executions'][0])
+                execution.setdefault('codeId', code.get('id'))
+                return execution
+        return None
+
+    def _submit_once(self, key, submit, find, fetch):
+        """Submit something at most once for an idempotency key.
+
+        Args:
+            key (str): the idempotency key.
+            submit (callable): function that submits and returns the
+                response of the server.
+            find (callable): function that looks for the submission on the
+                server and returns it, or None.
+            fetch (callable): function that gets a submission by its id.
+
+        Returns:
+            dict: the submission created, by this call or a previous one.
+        """
+        entry = self.journal.get(key)
+        if entry and entry['id']:
+            return fetch(entry['id'])
+        # Another process, without this journal, may have submitted it.
+        found = find()
+        if found is not None:
+            self.journal.submitted(key, found['id'])
+            return found
+        self.journal.pending(key)
+        try:
+            result = submit()
+        except (PayloadTooLargeError, RegisterSizeError):
+            # The server rejected the submission: it can be sent again.
+            self.journal.forget(key)
+            raise
+        if isinstance(result, dict) and result.get('id'):
+            self.journal.submitted(key, result['id'])
+        elif isinstance(result, dict) and 'error' in result:
+            self.journal.forget(key)
+        return result
+
+    def _backend_max_experiments(self, backend_type):
+        """
+        Get the maximum number of experiments per job advertised by a backend
+        """
+        for backend in self._cached_backends():
+            if backend['name'] == backend_type:
+                return (backend.get('max_experiments') or
+                        backend.get('maxExperiments'))
+        return None
+
+    @_with_deadline
     def get_job(self, id_job, hub=None, group=None, project=None,
-                access_token=None, user_id=None):
+                access_token=None, user_id=None, fields=None):
         """
         Get the information about a job, by its id
+
+        If fields (a list of field names) is given, only those fields of
+        the job are returned.
         """
         if access_token:
             self.req.credential.set_token(access_token)
@@ -755,22 +2367,67 @@ class IBMQuantumExperience(object):
 
         url += '/' + id_job
 
-        job = self.req.get(url)
+        params = ''
+        if fields is not None:
+            params = '&filter=' + json.dumps(
+                {'fields': _fields_filter(fields)})
+        job = self.req.get(url, params)
 
-        if 'qasms' in job: 
-            for qasm in job['qasms']:
-                if ('result' in qasm) and ('data' in qasm['result']):
-                    qasm['data'] = qasm['result']['data']
-                    del qasm['result']['data']
-                    for key in qasm['result']:
-                        qasm['data'][key] = qasm['result'][key]
-                    del qasm['result']
+        return _flatten_qasm_results(job)
 
-        return job
+    @_with_deadline
+    def download_job(self, id_job, destination, hub=None, group=None,
+                     project=None, access_token=None, user_id=None,
+                     fields=None, checksum=None):
+        """Download the information about a job to a file, without holding
+        it in memory.
 
-    def get_jobs(self, limit=10, skip=0, backend=None, only_completed=False, filter=None, hub=None, group=None, project=None, access_token=None, user_id=None):
+        The response is streamed to the file a chunk at a time, resuming
+        it with range requests if it is interrupted, and checked against
+        its checksum. The file holds the job as sent by the server (the
+        results of the qasms are not moved to their 'data', as in get_job).
+
+        Args:
+            id_job (str): id of the job.
+            destination (str or file): path of the file, or binary file-like
+                object, to write the job to.
+            hub (str): hub of the job.
+            group (str): group of the job.
+            project (str): project of the job.
+            access_token (str): access token to use.
+            user_id (str): user id to use.
+            fields (list): names of the fields of the job to download.
+            checksum (str): expected SHA-256 digest of the response, in hex.
+
+        Returns:
+            dict: the 'size', 'sha256' digest and 'content_type' of the
+                response.
         """
-        Get the information about the user jobs
+        if access_token:
+            self.req.credential.set_token(access_token)
+        if user_id:
+            self.req.credential.set_user_id(user_id)
+        if not self.check_credentials():
+            raise CredentialsError('credentials invalid')
+        if not id_job:
+            raise ApiError(usr_msg='Job ID not specified')
+
+        url = get_job_url(self.config, hub, group, project) + '/' + id_job
+        params = ''
+        if fields is not None:
+            params = '&filter=' + json.dumps(
+                {'fields': _fields_filter(fields)})
+        return self.req.download(url, destination, params,
+                                 checksum=checksum)
+
+    @_with_deadline
+    def get_jobs(self, limit=10, skip=0, backend=None, only_completed=False, filter=None, hub=None, group=None, project=None, access_token=None, user_id=None, fields=None, order='creationDate DESC'):
+        """
+        Get the information about the user jobs, sorted by order (a field
+        followed by ASC or DESC)
+
+        If fields (a list of field names) is given, only those fields of
+        the jobs are returned.
         """
         if access_token:
             self.req.credential.set_token(access_token)
@@ -782,7 +2439,7 @@ class IBMQuantumExperience(object):
         url = get_job_url(self.config, hub, group, project)
         url_filter = '&filter='
         query = {
-          "order": "creationDate DESC",
+          "order": order,
           "limit": limit,
           "skip": skip,
           "where" : {}
@@ -794,11 +2451,104 @@ class IBMQuantumExperience(object):
             query['where']['backend.name'] = backend
           if only_completed:
             query['where']['status'] = 'COMPLETED'
+        if fields is not None:
+          query['fields'] = _fields_filter(fields)
   
         url_filter = url_filter + json.dumps(query)
         jobs = self.req.get(url, url_filter)
         return jobs
 
+    @_with_deadline
+    def get_jobs_by_id(self, ids, hub=None, group=None, project=None,
+                       access_token=None, user_id=None, fields=None):
+        """
+        Get the information about many jobs, by their ids, in the order of
+        the ids
+
+        The jobs are fetched with as few requests as possible, filtering
+        the list of jobs by id in chunks that fit in max_url_length. The
+        jobs missing from the filtered lists are fetched one by one,
+        concurrently. A job that cannot be fetched is returned as a dict
+        with an 'Error' status, as in get_job. If fields (a list of field
+        names) is given, only those fields (and the id) are returned.
+        """
+        if access_token:
+            self.req.credential.set_token(access_token)
+        if user_id:
+            self.req.credential.set_user_id(user_id)
+        if not self.check_credentials():
+            return {"error": "Not credentials valid"}
+
+        url = get_job_url(self.config, hub, group, project)
+        unique_ids = list(collections.OrderedDict.fromkeys(ids))
+        jobs = {}
+        if fields is not None:
+            # The id is needed to match the jobs listed with the ids.
+            fields = dict(_fields_filter(fields), id=True)
+
+        def fetch_chunk(chunk):
+            query = {'where': {'id': {'inq': chunk}}, 'limit': len(chunk)}
+            if fields is not None:
+                query['fields'] = fields
+            try:
+                return self.req.get(url, '&filter=' + json.dumps(query))
+            except ApiTimeoutError:
+                raise
+            except ApiError as ex:
+                log.info('Could not filter the jobs by id: %s', ex)
+                return []
+
+        for chunk_jobs in self._map(fetch_chunk,
+                                    self._id_chunks(url, unique_ids,
+                                                    fields)):
+            if isinstance(chunk_jobs, list):
+                for job in chunk_jobs:
+                    if isinstance(job, dict) and 'id' in job:
+                        jobs[job['id']] = _flatten_qasm_results(job)
+
+        def fetch_job(id_job):
+            try:
+                job = self.get_job(id_job, hub=hub, group=group,
+                                   project=project, fields=fields)
+            except ApiTimeoutError:
+                raise
+            except ApiError as ex:
+                return {'id': id_job, 'status': 'Error', 'error': str(ex)}
+            if isinstance(job, dict) and 'error' in job and 'id' not in job:
+                return {'id': id_job, 'status': 'Error',
+                        'error': job['error']}
+            return job
+
+        missing = [id_job for id_job in unique_ids if id_job not in jobs]
+        for id_job, job in zip(missing, self._map(fetch_job, missing)):
+            jobs[id_job] = job
+        return [jobs[id_job] for id_job in ids]
+
+    def _id_chunks(self, url, ids, fields=None):
+        """
+        Split ids in chunks whose filter by id fits in max_url_length
+        """
+        base = len(self.req.credential.config['url'] + url +
+                   '?access_token=' + (self.req.credential.get_token() or '') +
+                   '&filter=' + quote(json.dumps(
+                       {'where': {'id': {'inq': []}}, 'limit': 1000,
+                        'fields': fields})))
+        chunks = []
+        chunk = []
+        length = base
+        for id_job in ids:
+            id_length = len(quote(json.dumps(id_job) + ', '))
+            if chunk and length + id_length > self.max_url_length:
+                chunks.append(chunk)
+                chunk = []
+                length = base
+            chunk.append(id_job)
+            length += id_length
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    @_with_deadline
     def get_status_job(self, id_job, hub=None, group=None, project=None,
                        access_token=None, user_id=None):
         """
@@ -827,9 +2577,14 @@ class IBMQuantumExperience(object):
 
         return status
 
-    def get_status_jobs(self, limit=10, skip=0, backend=None, filter=None, hub=None, group=None, project=None, access_token=None, user_id=None):
+    @_with_deadline
+    def get_status_jobs(self, limit=10, skip=0, backend=None, filter=None, hub=None, group=None, project=None, access_token=None, user_id=None, fields=None, order='creationDate DESC'):
         """
-        Get the information about the user jobs
+        Get the information about the user jobs, sorted by order (a field
+        followed by ASC or DESC)
+
+        If fields (a list of field names) is given, only those fields of
+        the jobs are returned.
         """
         if access_token:
             self.req.credential.set_token(access_token)
@@ -841,7 +2596,7 @@ class IBMQuantumExperience(object):
         url = get_job_url(self.config, hub, group, project)
         url_filter = '&filter='
         query = {
-          "order": "creationDate DESC",
+          "order": order,
           "limit": limit,
           "skip": skip,
           "where" : {}
@@ -851,6 +2606,8 @@ class IBMQuantumExperience(object):
         else:
           if backend is not None:
             query['where']['backend.name'] = backend
+        if fields is not None:
+          query['fields'] = _fields_filter(fields)
   
         url += '/status'
 
@@ -860,6 +2617,7 @@ class IBMQuantumExperience(object):
 
         return jobs
 
+    @_with_deadline
     def cancel_job(self, id_job, hub=None, group=None, project=None,
                    access_token=None, user_id=None):
         """
@@ -888,10 +2646,77 @@ class IBMQuantumExperience(object):
 
         return res
 
-    def backend_status(self, backend='ibmqx4', access_token=None, user_id=None):
+    @_with_deadline
+    def cancel_jobs(self, ids=None, where=None, hub=None, group=None,
+                    project=None, access_token=None, user_id=None,
+                    max_workers=None, page_size=100):
+        """Cancel many jobs concurrently.
+
+        Args:
+            ids (list): ids of the jobs to cancel.
+            where (dict): filter of the jobs to cancel, as in
+                get_status_jobs (eg. ``{'status': 'RUNNING',
+                'backend.name': 'ibmqx4'}``). The jobs matching it are
+                listed before any is cancelled.
+            hub (str): hub of the jobs.
+            group (str): group of the jobs.
+            project (str): project of the jobs.
+            access_token (str): access token to use.
+            user_id (str): user id to use.
+            max_workers (int): number of jobs cancelled at the same time
+                (by default, max_workers of the instance).
+            page_size (int): number of jobs listed per request.
+
+        Returns:
+            OrderedDict: the response to the cancellation of each job, by
+                job id. A job that could not be cancelled gets a dict with
+                an 'Error' status.
+        """
+        if access_token:
+            self.req.credential.set_token(access_token)
+        if user_id:
+            self.req.credential.set_user_id(user_id)
+        if not self.check_credentials():
+            return {"error": "Not credentials valid"}
+
+        targets = list(ids or [])
+        if where is not None:
+            skip = 0
+            while True:
+                jobs = self.get_status_jobs(limit=page_size, skip=skip,
+                                            filter=where, hub=hub,
+                                            group=group, project=project,
+                                            fields=['id'])
+                if not isinstance(jobs, list):
+                    raise ApiError(usr_msg='Could not list the jobs to '
+                                   'cancel', dev_msg=str(jobs))
+                targets.extend(job['id'] for job in jobs)
+                if len(jobs) < page_size:
+                    break
+                skip += page_size
+        targets = list(collections.OrderedDict.fromkeys(targets))
+
+        def cancel(id_job):
+            try:
+                return self.cancel_job(id_job, hub=hub, group=group,
+                                       project=project)
+            except ApiError as ex:
+                return {'id': id_job, 'status': 'Error', 'error': str(ex)}
+
+        return collections.OrderedDict(zip(
+            targets, self._map(cancel, targets, max_workers)))
+
+    @_with_deadline
+    def backend_status(self, backend='ibmqx4', access_token=None, user_id=None,
+                       refresh=False):
         """
         Get the status of a chip
         """
+        snapshot = None
+        if not (refresh or access_token or user_id):
+            snapshot = self._refreshed(backend, 'status')
+        if snapshot is not None:
+            return snapshot
         if access_token:
             self.req.credential.set_token(access_token)
         if user_id:
@@ -900,6 +2725,12 @@ class IBMQuantumExperience(object):
         if not backend_type:
             raise BadBackendError(backend)
 
+        return self._backend_queue_status(backend_type)
+
+    def _backend_queue_status(self, backend_type):
+        """
+        Get the status of the queue of a backend, already checked
+        """
         status = self.req.get('/Backends/' + backend_type + '/queue/status',
                               with_token=False)
 
@@ -913,12 +2744,79 @@ class IBMQuantumExperience(object):
         
         ret['backend'] = backend_type
 
+        self._status_cache.set(backend_type, ret)
         return ret
 
-    def backend_calibration(self, backend='ibmqx4', hub=None, access_token=None, user_id=None):
+    @_with_deadline
+    def least_busy_backend(self, filters=None, hub=None, group=None,
+                           project=None, access_token=None, user_id=None):
+        """
+        Rank the backends available by how busy they are
+
+        The status of the queue of every candidate backend is probed
+        concurrently (or taken from the cache, if it is fresh), as is the
+        list of backends. The available
+        backends come first, the ones with fewer pending jobs before;
+        the unavailable backends, or the ones that could not be probed, come
+        last.
+
+        Args:
+            filters (dict or callable): the candidate backends; either the
+                values that the configuration of a backend must have (eg.
+                ``{'simulator': False}``), or a function that takes the
+                configuration of a backend and returns whether it is a
+                candidate.
+
+        Returns:
+            list: the status of each candidate backend (with the keys
+                'backend', 'available', 'busy' and 'pending_jobs'), the least
+                busy one first.
+        """
+        if access_token:
+            self.req.credential.set_token(access_token)
+        if user_id:
+            self.req.credential.set_user_id(user_id)
+
+        if filters is None:
+            match = lambda backend: True
+        elif callable(filters):
+            match = filters
+        else:
+            match = lambda backend: all(backend.get(key) == value
+                                        for key, value in filters.items())
+        names = [backend['name']
+                 for backend in self._cached_backends(hub, group, project)
+                 if match(backend)]
+
+        def probe(name):
+            status = self._status_cache.get(name)
+            if status is None:
+                try:
+                    status = self._backend_queue_status(name)
+                except ApiError as ex:
+                    log.warning('Could not get the status of %s: %s',
+                                name, ex)
+                    status = {'backend': name, 'available': False}
+            return dict(status)
+
+        statuses = self._map(probe, names)
+        statuses.sort(key=lambda status: (
+            not status.get('available', False),
+            status.get('pending_jobs', 0),
+            status.get('busy', False)))
+        return statuses
+
+    @_with_deadline
+    def backend_calibration(self, backend='ibmqx4', hub=None, access_token=None, user_id=None,
+                            refresh=False):
         """
         Get the calibration of a real chip
         """
+        snapshot = None
+        if not (refresh or access_token or user_id):
+            snapshot = self._refreshed(backend, 'calibration')
+        if snapshot is not None:
+            return snapshot
         if access_token:
             self.req.credential.set_token(access_token)
         if user_id:
@@ -944,10 +2842,17 @@ class IBMQuantumExperience(object):
           ret["backend"] = backend_type
         return ret
 
-    def backend_parameters(self, backend='ibmqx4', hub=None, access_token=None, user_id=None):
+    @_with_deadline
+    def backend_parameters(self, backend='ibmqx4', hub=None, access_token=None, user_id=None,
+                           refresh=False):
         """
         Get the parameters of calibration of a real chip
         """
+        snapshot = None
+        if not (refresh or access_token or user_id):
+            snapshot = self._refreshed(backend, 'parameters')
+        if snapshot is not None:
+            return snapshot
         if access_token:
             self.req.credential.set_token(access_token)
         if user_id:
@@ -973,6 +2878,61 @@ class IBMQuantumExperience(object):
           ret["backend"] = backend_type
         return ret
 
+    def _refreshed(self, backend, kind):
+        """
+        Get a copy of the last value of a backend fetched by the refresher,
+        if it is running, with its age in seconds as 'snapshot_age'
+        """
+        if self.refresher is None or not self.refresher.running:
+            return None
+        snapshot = self.refresher.snapshot(backend, kind)
+        if snapshot is None:
+            return None
+        value = copy.deepcopy(snapshot.value)
+        if isinstance(value, dict):
+            value['snapshot_age'] = snapshot.age
+        return value
+
+    def start_refresher(self, backends, intervals=None,
+                        on_calibration_change=None):
+        """
+        Start refreshing the status, calibration and parameters of some
+        backends in the background
+
+        While the refresher runs, backend_status, backend_calibration and
+        backend_parameters return the last values fetched for those backends
+        (unless called with refresh=True, or with an access_token or a
+        user_id), with the seconds since they were fetched as
+        'snapshot_age'. The refresher's snapshot() gives the values with the
+        time they were fetched.
+
+        Args:
+            backends (list): names of the backends to refresh.
+            intervals (dict): seconds between refreshes of the 'status',
+                'calibration' and 'parameters' (None to not refresh one).
+            on_calibration_change (callable): function called as
+                on_calibration_change(backend, old, new) when a new
+                calibration of a backend is fetched.
+
+        Returns:
+            BackendRefresher: the refresher.
+        """
+        self.stop_refresher()
+        self.refresher = BackendRefresher(
+            self, backends, intervals=intervals,
+            on_calibration_change=on_calibration_change)
+        self.refresher.start()
+        return self.refresher
+
+    def stop_refresher(self):
+        """
+        Stop refreshing the values of the backends in the background
+        """
+        if self.refresher is not None:
+            self.refresher.stop()
+            self.refresher = None
+
+    @_with_deadline
     def available_backends(self, hub=None, group=None, project=None, access_token=None, user_id=None):
         """
         Get the backends available to use in the QX Platform
@@ -990,9 +2950,12 @@ class IBMQuantumExperience(object):
             ret = self.req.get(url)
             if (ret is not None) and (isinstance(ret, dict)):
                 return []
-            return [backend for backend in ret
-                    if backend.get('status') == 'on']
+            backends = [backend for backend in ret
+                        if backend.get('status') == 'on']
+            self._backends_cache.set(url, backends)
+            return backends
 
+    @_with_deadline
     def available_backend_simulators(self, access_token=None, user_id=None):
         """
         Get the backend simulators available to use in the QX Platform
@@ -1011,6 +2974,7 @@ class IBMQuantumExperience(object):
                     if backend.get('status') == 'on' and
                     backend.get('simulator') is True]
 
+    @_with_deadline
     def get_my_credits(self, access_token=None, user_id=None):
         """
         Get the credits by user to use in the QX Platform
@@ -1032,6 +2996,7 @@ class IBMQuantumExperience(object):
                 return user_data["credit"]
             return {}
 
+    @_with_deadline
     def api_version(self):
         """
         Get the API Version of the QX Platform
@@ -1079,6 +3044,16 @@ class BadBackendError(ApiError):
                           dev_msg=dev_msg)
 
 
+class ApiTimeoutError(ApiError):
+    """Exception raised when a request or the deadline of a call times out."""
+    pass
+
+
+class PayloadTooLargeError(ApiError):
+    """Exception raised when the server rejects a request as too large."""
+    pass
+
+
 class CredentialsError(ApiError):
     """Exception associated with bad server credentials."""
     pass
@@ -1087,3 +3062,50 @@ class CredentialsError(ApiError):
 class RegisterSizeError(ApiError):
     """Exception due to exceeding the maximum number of allowed qubits."""
     pass
+
+
+class JobValidationError(ApiError):
+    """Exception raised when a job does not fit its backend."""
+    pass
+
+
+class InsufficientCreditsError(ApiError):
+    """
+    Exception raised when the credits left do not cover the cost of a job.
+    """
+    def __init__(self, cost, available):
+        """
+        Args:
+            cost (int): estimated credits of the job.
+            available (int): credits not reserved by the jobs running.
+        """
+        usr_msg = 'The job needs {0} credits, {1} are available'.format(
+            cost, available)
+        dev_msg = usr_msg + ' (the balance minus the credits reserved by ' \
+            'the jobs submitted that have not finished)'
+        ApiError.__init__(self, usr_msg=usr_msg, dev_msg=dev_msg)
+        self.cost = cost
+        self.available = available
+
+
+class ChecksumError(ApiError):
+    """Exception raised when a download does not match its checksum."""
+    pass
+
+
+class CircuitOpenError(ApiError):
+    """
+    Exception raised when the circuit breaker of an endpoint is open.
+    """
+    def __init__(self, endpoint, retry_after=None):
+        """
+        Args:
+            endpoint (str): endpoint guarded by the circuit breaker.
+            retry_after (float or None): seconds until the circuit lets
+                probe requests through, if known.
+        """
+        usr_msg = 'Circuit breaker open for endpoint "{0}"'.format(endpoint)
+        dev_msg = usr_msg + ': failing fast while the endpoint is unhealthy'
+        ApiError.__init__(self, usr_msg=usr_msg, dev_msg=dev_msg)
+        self.endpoint = endpoint
+        self.retry_after = retry_after
@@ -0,0 +1,336 @@
+"""
+    Futures of the results of jobs, resolved by a shared poller
+"""
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+from .CompositeJob import _combine_status
+from .IBMQuantumExperience import ApiError, JOB_FINAL_STATES
+
+log = logging.getLogger(__name__)
+_clock = getattr(time, 'monotonic', time.time)
+
+_SCOPE = ('hub', 'group', 'project')
+
+
+class JobFuture(Future):
+    """
+    Future of the final information of a job (as returned by ``get_job``),
+    resolved in the background by a JobPoller, whatever the final status
+    of the job. It fails with an ApiError if the job cannot be polled.
+
+    ``cancel()`` cancels the job on the platform. The callbacks added with
+    ``add_done_callback`` are called from the thread of the poller.
+    """
+    def __init__(self, poller, ids, scope=None, merge=None):
+        """
+        Args:
+            poller (JobPoller): poller of the job.
+            ids (list): ids of the jobs (several for a job submitted as a
+                CompositeJob).
+            scope (dict): hub, group and project of the jobs.
+            merge (callable): function that merges the information of the
+                jobs (in the order of the ids) as the result of the future.
+                By default, the result is the information of the only job.
+        """
+        super(JobFuture, self).__init__()
+        self.ids = list(ids)
+        self.scope = dict(scope or {})
+        self.statuses = {}
+        self._poller = poller
+        self._merge = merge
+        self._jobs = {}
+
+    def __repr__(self):
+        return '<JobFuture {} {}>'.format(','.join(self.ids), self.status)
+
+    @property
+    def job_id(self):
+        """
+        The id of the job, or None for a job submitted as several jobs
+        """
+        return self.ids[0] if len(self.ids) == 1 else None
+
+    @property
+    def status(self):
+        """
+        The last status polled of the job (combined for several jobs), or
+        None if not polled yet
+        """
+        if len(set(self.ids)) == 1:
+            return self.statuses.get(self.ids[0])
+        if len(self.statuses) < len(set(self.ids)):
+            return None
+        return _combine_status([self.statuses[id_job]
+                                for id_job in self.ids])
+
+    def cancel(self):
+        """Cancel the job on the platform, and then the future.
+
+        Returns:
+            bool: whether the future was cancelled (False if the job had
+                already finished or could not be cancelled).
+        """
+        if self.done():
+            return False
+        try:
+            responses = self._poller.api.cancel_jobs(self.ids, **self.scope)
+        except ApiError as ex:
+            log.warning('Could not cancel the jobs %s: %s', self.ids, ex)
+            return False
+        if 'error' in responses:
+            log.warning('Could not cancel the jobs %s: %s', self.ids,
+                        responses['error'])
+            return False
+        for id_job, response in responses.items():
+            status = isinstance(response, dict) and response.get('status')
+            if not status or status == 'Error' or 'error' in response:
+                log.warning('Could not cancel the job %s: %s', id_job,
+                            response)
+                return False
+            if status != 'CANCELLED' and status in JOB_FINAL_STATES:
+                # The job finished first: its result will be set.
+                return False
+        return super(JobFuture, self).cancel()
+
+    def _update(self, id_job, status):
+        self.statuses[id_job] = status or ''
+
+    def _resolve(self, id_job, job=None, error=None):
+        """
+        Set the information of one of the jobs, or the error polling it
+        """
+        if self.done():
+            return
+        if error is None:
+            self.statuses[id_job] = job.get('status') or ''
+            self._jobs[id_job] = job
+            if len(self._jobs) < len(set(self.ids)):
+                return
+            try:
+                if self._merge is None:
+                    result = job
+                else:
+                    result = self._merge([self._jobs[id_job]
+                                          for id_job in self.ids])
+            except Exception as ex:  # pylint: disable=broad-except
+                error = ex
+        # False if the future has been cancelled meanwhile.
+        if self.set_running_or_notify_cancel():
+            if error is None:
+                self.set_result(result)
+            else:
+                self.set_exception(error)
+
+
+class _Watch(object):
+    """
+    Polling state of a job, shared by its futures
+    """
+    def __init__(self, due, delay):
+        self.futures = []
+        self.due = due
+        self.delay = delay
+        self.status = None
+        self.errors = 0
+
+
+class JobPoller(object):
+    """
+    Thread that polls the status of the jobs of many JobFutures together
+    and resolves the futures when their jobs finish.
+
+    The statuses of all the jobs due are fetched with ``get_jobs_by_id``
+    (in as few requests as possible), and then the information of the jobs
+    that finished. Each job is polled less often while its status does not
+    change, from ``interval`` up to ``max_interval`` seconds. The thread
+    only runs while there are jobs to poll.
+    """
+    backoff = 1.5
+
+    def __init__(self, api, interval=2.0, max_interval=30.0, max_errors=5):
+        """
+        Args:
+            api (IBMQuantumExperience): connection used to poll the jobs.
+            interval (float): seconds before the first poll of a job, and
+                between its first polls.
+            max_interval (float): maximum seconds between two polls of a job.
+            max_errors (int): number of failed polls in a row after which
+                the futures of a job fail.
+        """
+        self.api = api
+        self.interval = interval
+        self.max_interval = max_interval
+        self.max_errors = max_errors
+        self._watches = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._stopped = False
+        self._thread = None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._watches)
+
+    @property
+    def running(self):
+        """
+        Whether the poller thread is running
+        """
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    def watch(self, ids, hub=None, group=None, project=None, merge=None):
+        """Get a future of the final information of jobs already submitted.
+
+        Args:
+            ids (list): ids of the jobs.
+            hub (str): hub of the jobs.
+            group (str): group of the jobs.
+            project (str): project of the jobs.
+            merge (callable): function that merges the information of the
+                jobs as the result of the future (see JobFuture).
+
+        Returns:
+            JobFuture: the future.
+        """
+        scope = (hub, group, project)
+        future = JobFuture(self, ids, dict(zip(_SCOPE, scope)), merge)
+        with self._lock:
+            for id_job in future.ids:
+                watch = self._watches.get(scope + (id_job,))
+                if watch is None:
+                    watch = _Watch(_clock() + self.interval, self.interval)
+                    self._watches[scope + (id_job,)] = watch
+                watch.futures.append(future)
+            self._stopped = False
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                                                name='JobPoller')
+                self._thread.daemon = True
+                self._thread.start()
+            self._changed.notify()
+        return future
+
+    def stop(self, timeout=None):
+        """
+        Stop polling (the futures are not resolved until polling resumes
+        with another watch)
+        """
+        with self._lock:
+            self._stopped = True
+            self._changed.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def poll(self):
+        """Poll the jobs that are due once.
+
+        Returns:
+            int: the number of jobs still to poll.
+        """
+        now = _clock()
+        scopes = {}
+        with self._lock:
+            for key, watch in list(self._watches.items()):
+                watch.futures = [future for future in watch.futures
+                                 if not future.done()]
+                if not watch.futures:
+                    del self._watches[key]
+                elif watch.due <= now:
+                    scopes.setdefault(key[:3], []).append(key[3])
+        for scope, ids in scopes.items():
+            self._poll_scope(scope, ids)
+        return len(self)
+
+    def _poll_scope(self, scope, ids):
+        kwargs = dict(zip(_SCOPE, scope))
+        finished = []
+        for id_job, status in zip(ids, self._fetch(ids, ['id', 'status'],
+                                                   kwargs)):
+            if status.get('status') == 'Error':
+                self._failed(scope + (id_job,), status.get('error'))
+            elif status.get('status') in JOB_FINAL_STATES:
+                finished.append(id_job)
+            else:
+                self._pending(scope + (id_job,), status.get('status'))
+        if not finished:
+            return
+        for id_job, job in zip(finished, self._fetch(finished, None, kwargs)):
+            if job.get('status') == 'Error':
+                self._failed(scope + (id_job,), job.get('error'))
+            else:
+                self._finish(scope + (id_job,), job=job)
+
+    def _fetch(self, ids, fields, kwargs):
+        """
+        Get the jobs, or dicts with an 'Error' status if they cannot be
+        fetched
+        """
+        try:
+            jobs = self.api.get_jobs_by_id(ids, fields=fields, **kwargs)
+        except ApiError as ex:
+            jobs = str(ex)
+        if not isinstance(jobs, list):
+            return [{'id': id_job, 'status': 'Error', 'error': jobs}
+                    for id_job in ids]
+        return jobs
+
+    def _pending(self, key, status):
+        with self._lock:
+            watch = self._watches.get(key)
+            if watch is None:
+                return
+            if status == watch.status:
+                watch.delay = min(watch.delay * self.backoff,
+                                  self.max_interval)
+            else:
+                watch.delay = self.interval
+            watch.status = status
+            watch.errors = 0
+            watch.due = _clock() + watch.delay
+            futures = list(watch.futures)
+        for future in futures:
+            future._update(key[3], status)
+
+    def _failed(self, key, error):
+        with self._lock:
+            watch = self._watches.get(key)
+            if watch is None:
+                return
+            watch.errors += 1
+            if watch.errors < self.max_errors:
+                watch.delay = min(watch.delay * self.backoff,
+                                  self.max_interval)
+                watch.due = _clock() + watch.delay
+                return
+        log.warning('Could not poll the job %s: %s', key[3], error)
+        self._finish(key, error=ApiError(
+            usr_msg='Could not poll the job {}'.format(key[3]),
+            dev_msg=str(error)))
+
+    def _finish(self, key, job=None, error=None):
+        with self._lock:
+            watch = self._watches.pop(key, None)
+        for future in watch.futures if watch else []:
+            future._resolve(key[3], job, error)
+
+    def _run(self):
+        while True:
+            delay = 0
+            try:
+                self.poll()
+            except Exception:  # pylint: disable=broad-except
+                log.exception('Error polling the jobs')
+                delay = self.interval
+            with self._lock:
+                if not self._stopped and self._watches:
+                    due = min(watch.due for watch in self._watches.values())
+                    # Woken up early by new watches and by stop().
+                    self._changed.wait(max(delay, due - _clock()))
+                if self._stopped or not self._watches:
+                    self._thread = None
+                    return
@@ -0,0 +1,231 @@
+"""
+    Local index of the job history, synced incrementally
+"""
+import sqlite3
+import threading
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from .IBMQuantumExperience import ApiError, JOB_FINAL_STATES
+from .IBMQuantumExperience import _flatten_qasm_results
+
+# Fields of the jobs that can be filtered and sorted, and their columns.
+_COLUMNS = {'id': 'id', 'status': 'status', 'backend.name': 'backend',
+            'name': 'name', 'creationDate': 'creation_date'}
+_OPERATORS = {'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<=', 'neq': '!=',
+              'like': 'LIKE', 'nlike': 'NOT LIKE'}
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    creation_date TEXT,
+    status TEXT,
+    backend TEXT,
+    name TEXT,
+    document TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_creation_date ON jobs (creation_date);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, creation_date);
+CREATE INDEX IF NOT EXISTS jobs_backend ON jobs (backend, creation_date);
+CREATE INDEX IF NOT EXISTS jobs_name ON jobs (name);
+'''
+
+
+def _column(field):
+    if field not in _COLUMNS:
+        raise ValueError('the field {} is not indexed (indexed fields: '
+                         '{})'.format(field, ', '.join(sorted(_COLUMNS))))
+    return _COLUMNS[field]
+
+
+def _where_sql(where):
+    """
+    Translate a LoopBack-style where filter to SQL, with its parameters
+    """
+    clauses = []
+    params = []
+    for field, condition in (where or {}).items():
+        if field in ('and', 'or'):
+            parts = [_where_sql(part) for part in condition]
+            if parts:
+                clauses.append('(' + (' ' + field.upper() + ' ').join(
+                    sql for sql, _ in parts) + ')')
+                for _, part_params in parts:
+                    params.extend(part_params)
+            continue
+        column = _column(field)
+        if not isinstance(condition, dict):
+            condition = {'eq': condition}
+        for operator, operand in condition.items():
+            if operator == 'eq':
+                clauses.append(column + ' = ?')
+                params.append(operand)
+            elif operator in ('inq', 'nin'):
+                operand = list(operand)
+                if not operand:
+                    clauses.append('0' if operator == 'inq' else '1')
+                    continue
+                clauses.append('{} {}IN ({})'.format(
+                    column, 'NOT ' if operator == 'nin' else '',
+                    ', '.join('?' * len(operand))))
+                params.extend(operand)
+            elif operator == 'between':
+                clauses.append(column + ' BETWEEN ? AND ?')
+                params.extend(operand)
+            elif operator in _OPERATORS:
+                clauses.append('{} {} ?'.format(column, _OPERATORS[operator]))
+                params.append(operand)
+            else:
+                raise ValueError('unsupported operator: ' + operator)
+    return ' AND '.join(clauses) or '1', params
+
+
+def _order_sql(order):
+    parts = order.split()
+    direction = parts[1].upper() if len(parts) > 1 else 'ASC'
+    if direction not in ('ASC', 'DESC'):
+        raise ValueError('invalid order: ' + order)
+    return '{} {}, id {}'.format(_column(parts[0]), direction, direction)
+
+
+class JobIndex(object):
+    """
+    Local copy of the job history of a user, in a SQLite database.
+
+    Each ``sync`` only fetches the jobs created since the last sync (from
+    the latest creationDate known), and then the jobs that had not
+    finished yet. Queries run locally, with the parameters of
+    ``get_jobs``, on the id, status, backend, name and creation date of the
+    jobs.
+    """
+    def __init__(self, api, path=':memory:', hub=None, group=None,
+                 project=None):
+        """
+        Args:
+            api (IBMQuantumExperience): connection used to sync the jobs.
+            path (str): file of the database (by default, in memory).
+            hub (str): hub of the jobs.
+            group (str): group of the jobs.
+            project (str): project of the jobs.
+        """
+        self.api = api
+        self.path = path
+        self._scope = {'hub': hub, 'group': group, 'project': project}
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def close(self):
+        """
+        Close the database
+        """
+        with self._lock:
+            self._connection.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute(
+                'SELECT COUNT(*) FROM jobs').fetchone()[0]
+
+    def high_water(self):
+        """
+        Get the latest creationDate of the jobs indexed, or None
+        """
+        with self._lock:
+            return self._connection.execute(
+                'SELECT MAX(creation_date) FROM jobs').fetchone()[0]
+
+    def sync(self, page_size=100):
+        """Fetch the jobs created since the last sync, and the jobs that had
+        not finished then.
+
+        Args:
+            page_size (int): number of jobs fetched per request.
+
+        Returns:
+            dict: the number of jobs 'added' and 'updated'.
+        """
+        with self._lock:
+            high_water = self.high_water()
+            known = set(row[0] for row in self._connection.execute(
+                'SELECT id FROM jobs'))
+            pending = [row[0] for row in self._connection.execute(
+                'SELECT id FROM jobs WHERE status NOT IN ({})'.format(
+                    ', '.join('?' * len(JOB_FINAL_STATES))),
+                sorted(JOB_FINAL_STATES))]
+
+        # Jobs created at the same time as the latest one may be new too.
+        where = {'creationDate': {'gte': high_water}} if high_water else {}
+        fetched = set()
+        skip = 0
+        while True:
+            jobs = self.api.get_jobs(limit=page_size, skip=skip, filter=where,
+                                     order='creationDate ASC', **self._scope)
+            if not isinstance(jobs, list):
+                raise ApiError(usr_msg='Could not list the jobs to index',
+                               dev_msg=str(jobs))
+            self._store(jobs)
+            fetched.update(job['id'] for job in jobs)
+            if len(jobs) < page_size:
+                break
+            skip += page_size
+
+        pending = [id_job for id_job in pending if id_job not in fetched]
+        updated = [job for job in self.api.get_jobs_by_id(pending,
+                                                          **self._scope)
+                   if job.get('creationDate')]
+        self._store(updated)
+        return {'added': len(fetched - known), 'updated': len(updated)}
+
+    def _store(self, jobs):
+        # Keep the layout of get_job, whichever call fetched the jobs.
+        jobs = [_flatten_qasm_results(job) for job in jobs]
+        rows = [(job['id'], job.get('creationDate'), job.get('status'),
+                 (job.get('backend') or {}).get('name'), job.get('name'),
+                 json.dumps(job)) for job in jobs]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+    def get_jobs(self, limit=10, skip=0, backend=None, only_completed=False,
+                 filter=None, order='creationDate DESC', fields=None):
+        """Get the jobs indexed, as ``get_jobs`` of the API.
+
+        Args:
+            limit (int): maximum number of jobs (None for all).
+            skip (int): number of jobs skipped.
+            backend (str): name of the backend of the jobs.
+            only_completed (bool): whether to get only completed jobs.
+            filter (dict): LoopBack-style where filter, on the id, status,
+                backend.name, name and creationDate (with the operators
+                gt, gte, lt, lte, neq, inq, nin, between, like, nlike, and
+                and or). Replaces backend and only_completed.
+            order (str): field to sort by, followed by ASC or DESC.
+            fields (list): names of the fields to return.
+
+        Returns:
+            list: the jobs.
+        """
+        # pylint: disable=redefined-builtin
+        if filter is None:
+            filter = {}
+            if backend is not None:
+                filter['backend.name'] = backend
+            if only_completed:
+                filter['status'] = 'COMPLETED'
+        where, params = _where_sql(filter)
+        sql = 'SELECT document FROM jobs WHERE {} ORDER BY {}'.format(
+            where, _order_sql(order))
+        if limit is not None or skip:
+            sql += ' LIMIT ? OFFSET ?'
+            params = params + [-1 if limit is None else limit, skip]
+        with self._lock:
+            rows = self._connection.execute(sql, params).fetchall()
+        jobs = [json.loads(row[0]) for row in rows]
+        if fields is not None:
+            jobs = [dict((key, value) for key, value in job.items()
+                         if key in fields) for job in jobs]
+        return jobs
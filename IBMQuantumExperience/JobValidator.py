@@ -0,0 +1,187 @@
+"""
+    Local validation of jobs against the limits of a backend
+"""
+import re
+
+REGISTER_SIZE = 'register_size'
+SHOTS = 'shots'
+BASIS_GATES = 'basis_gates'
+
+# Gates of the standard library of OpenQASM 2.0 (qelib1.inc).
+QELIB1_GATES = frozenset([
+    'u3', 'u2', 'u1', 'cx', 'id', 'u0', 'x', 'y', 'z', 'h', 's', 'sdg', 't',
+    'tdg', 'rx', 'ry', 'rz', 'cz', 'cy', 'swap', 'ch', 'ccx', 'crz', 'cu1',
+    'cu3', 'rzz'])
+# Statements that are not gates, and the built-in gates of OpenQASM 2.0.
+_NOT_GATES = frozenset(['openqasm', 'include', 'measure', 'barrier',
+                        'reset', 'snapshot', 'u', 'cx'])
+
+_COMMENT_RE = re.compile(r'//[^\n]*')
+_GATE_DEF_RE = re.compile(r'\b(?:gate|opaque)\s+(\w+)[^{;]*(?:\{[^}]*\}|;)')
+_REGISTER_RE = re.compile(r'\b(qreg|creg)\s+(\w+)\s*\[\s*(\d+)\s*\]\s*;')
+_CONDITION_RE = re.compile(r'^if\s*\([^)]*\)\s*')
+_WORD_RE = re.compile(r'[A-Za-z_]\w*')
+_ARGUMENT_RE = re.compile(r'\b(\w+)\s*\[\s*(\d+)\s*\]')
+_QELIB1_RE = re.compile(r'include\s+"qelib1\.inc"')
+
+
+def _first(config, *keys):
+    for key in keys:
+        if config.get(key) is not None:
+            return config[key]
+    return None
+
+
+class JobValidator(object):
+    """
+    Checks the jobs for a backend against its configuration (as returned
+    by ``available_backends``), so that invalid jobs are rejected before
+    they are sent.
+
+    The number of qubits of the quantum registers, the indices of the
+    registers used, the number of shots and the gates are checked. In
+    QASM, the gates defined by the program (and by ``qelib1.inc``, if
+    included) are allowed besides the basis gates; fragments without
+    register declarations are not checked. Limits that the backend does not
+    advertise are not checked.
+
+    The result of each distinct QASM program is remembered, so that large
+    batches of similar experiments are checked quickly.
+    """
+    max_memo = 4096
+
+    def __init__(self, backend):
+        """
+        Args:
+            backend (dict): configuration of the backend.
+        """
+        self.name = backend.get('name')
+        self.n_qubits = _first(backend, 'nQubits', 'n_qubits')
+        self.max_shots = _first(backend, 'maxShots', 'max_shots')
+        basis_gates = _first(backend, 'basisGates', 'basis_gates')
+        if basis_gates and not isinstance(basis_gates, (list, tuple)):
+            basis_gates = basis_gates.split(',')
+        self.basis_gates = None
+        if basis_gates:
+            self.basis_gates = frozenset(gate.strip().lower()
+                                         for gate in basis_gates)
+        self._memo = {}
+
+    def validate(self, data):
+        """Check a job.
+
+        Args:
+            data (dict): the job, as sent to the API (with 'qasms' and
+                'shots', or with a 'qObject').
+
+        Returns:
+            tuple: ``(kind, message)`` of the first problem found (the kind
+                being REGISTER_SIZE, SHOTS or BASIS_GATES), or None if the
+                job is valid.
+        """
+        if 'qObject' in data:
+            return self.validate_q_object(data['qObject'])
+        problem = self.validate_shots(data.get('shots'))
+        for qasm in data.get('qasms', []):
+            problem = problem or self.validate_qasm(qasm['qasm'])
+        return problem
+
+    def validate_shots(self, shots):
+        """
+        Check the number of shots of a job
+        """
+        if shots is None:
+            return None
+        if shots < 1:
+            return SHOTS, 'the number of shots must be positive'
+        if self.max_shots and shots > self.max_shots:
+            return SHOTS, '{} shots requested, the backend {} allows ' \
+                '{}'.format(shots, self.name, self.max_shots)
+        return None
+
+    def validate_qasm(self, qasm):
+        """
+        Check a QASM program
+        """
+        if qasm not in self._memo:
+            if len(self._memo) >= self.max_memo:
+                self._memo.clear()
+            self._memo[qasm] = self._validate_qasm(qasm)
+        return self._memo[qasm]
+
+    def _validate_qasm(self, qasm):
+        program = _COMMENT_RE.sub('', qasm)
+        allowed = set(_GATE_DEF_RE.findall(program))
+        if _QELIB1_RE.search(program):
+            allowed.update(QELIB1_GATES)
+        program = _GATE_DEF_RE.sub('', program)
+
+        registers = {}
+        qubits = 0
+        for kind, name, size in _REGISTER_RE.findall(program):
+            registers[name] = int(size)
+            if kind == 'qreg':
+                qubits += int(size)
+        if self.n_qubits and qubits > self.n_qubits:
+            return REGISTER_SIZE, (
+                'the quantum registers use {} qubits, the backend {} has '
+                '{}'.format(qubits, self.name, self.n_qubits))
+        if not registers:
+            # A fragment of a program: its gates cannot be checked.
+            return None
+        program = _REGISTER_RE.sub('', program)
+
+        for statement in program.split(';'):
+            statement = _CONDITION_RE.sub('', statement.strip())
+            word = _WORD_RE.match(statement)
+            if not word:
+                continue
+            gate = word.group(0).lower()
+            if (self.basis_gates is not None and gate not in _NOT_GATES and
+                    gate not in self.basis_gates and gate not in allowed):
+                return BASIS_GATES, (
+                    'the gate {} is not supported by the backend {} (basis '
+                    'gates: {})'.format(gate, self.name,
+                                        ','.join(sorted(self.basis_gates))))
+            for name, index in _ARGUMENT_RE.findall(statement):
+                if name in registers and int(index) >= registers[name]:
+                    return REGISTER_SIZE, (
+                        'index {} out of the register {}[{}]'.format(
+                            index, name, registers[name]))
+        return None
+
+    def validate_q_object(self, q_object):
+        """
+        Check a qObject
+        """
+        problem = self.validate_shots((q_object.get('config') or {}).get(
+            'shots'))
+        for experiment in q_object.get('experiments', []):
+            problem = problem or self._validate_experiment(experiment)
+        return problem
+
+    def _validate_experiment(self, experiment):
+        header = experiment.get('header') or {}
+        qubits = header.get('n_qubits') or (
+            experiment.get('config') or {}).get('n_qubits')
+        if self.n_qubits and qubits and qubits > self.n_qubits:
+            return REGISTER_SIZE, (
+                'the experiment uses {} qubits, the backend {} has '
+                '{}'.format(qubits, self.name, self.n_qubits))
+        problem = self.validate_shots((experiment.get('config') or {}).get(
+            'shots'))
+        for instruction in experiment.get('instructions', []):
+            gate = instruction.get('name', '').lower()
+            if (self.basis_gates is not None and gate not in _NOT_GATES and
+                    gate not in self.basis_gates):
+                return BASIS_GATES, (
+                    'the gate {} is not supported by the backend {} (basis '
+                    'gates: {})'.format(gate, self.name,
+                                        ','.join(sorted(self.basis_gates))))
+            if self.n_qubits and any(qubit >= self.n_qubits for qubit
+                                     in instruction.get('qubits', [])):
+                return REGISTER_SIZE, (
+                    'the gate {} uses the qubits {}, the backend {} has '
+                    '{}'.format(gate, instruction['qubits'], self.name,
+                                self.n_qubits))
+        return problem
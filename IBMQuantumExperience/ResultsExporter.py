@@ -0,0 +1,220 @@
+"""
+    Export of the results of many jobs to memory-mappable columnar files
+"""
+import os
+import struct
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .CountsAggregator import _hex_to_bitstring, parse_creg_labels
+
+# Size of the headers of the .npy files, large enough for any shape, so
+# that they can be rewritten in place once the length of a column is known.
+_HEADER_SIZE = 128
+COUNT_COLUMNS = (('job', 'int32'), ('experiment', 'int32'),
+                 ('bitstring', 'uint64'), ('count', 'int64'))
+MEMORY_COLUMNS = (('memory_job', 'int32'), ('memory_experiment', 'int32'),
+                  ('memory', 'uint64'))
+
+
+class _NpyColumn(object):
+    """
+    One-dimensional .npy file written incrementally
+    """
+    def __init__(self, path, dtype):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.length = 0
+        self._file = open(path, 'wb')
+        self._write_header()
+
+    def _write_header(self):
+        header = ("{{'descr': '{}', 'fortran_order': False, "
+                  "'shape': ({},), }}").format(self.dtype.str, self.length)
+        # Magic string, version 1.0 and the length of the padded header.
+        prefix = b'\x93NUMPY\x01\x00' + struct.pack('<H', _HEADER_SIZE - 10)
+        header = header.ljust(_HEADER_SIZE - 10 - 1) + '\n'
+        self._file.write(prefix + header.encode('latin1'))
+
+    def append(self, values):
+        values = np.asarray(values, dtype=self.dtype)
+        self._file.write(values.tobytes())
+        self.length += values.shape[0]
+
+    def close(self):
+        self._file.seek(0)
+        self._write_header()
+        self._file.close()
+
+
+class ResultsExporter(object):
+    """
+    Writer of the counts (and optionally the memory of every shot) of many
+    jobs to a directory of .npy files, one per column, that can be opened
+    memory-mapped with ``load_results``.
+
+    The count columns have a row per bitstring of each experiment: 'job'
+    (index in the 'job_ids' column), 'experiment' (index of the experiment
+    in its job), 'bitstring' (as an integer, bit 0 being the rightmost bit)
+    and 'count'. The memory columns, if exported, have a row per shot:
+    'memory_job', 'memory_experiment' and 'memory'. Bitstrings can have at
+    most 64 bits.
+
+    The jobs are written as they are added, so that the results do not
+    have to fit in memory. Requires numpy.
+    """
+    def __init__(self, directory, memory=False):
+        """
+        Args:
+            directory (str): directory of the files (created if needed).
+            memory (bool): whether to export the memory of every shot.
+        """
+        if np is None:
+            raise ImportError('numpy is required to export results')
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.memory = memory
+        self.job_ids = []
+        self.registers = None
+        self.width = 0
+        columns = COUNT_COLUMNS + (MEMORY_COLUMNS if memory else ())
+        self._columns = dict(
+            (name, _NpyColumn(os.path.join(directory, name + '.npy'), dtype))
+            for name, dtype in columns)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add_job(self, job):
+        """
+        Write the results of a job (as returned by ``get_job``)
+        """
+        job_index = len(self.job_ids)
+        self.job_ids.append(job.get('id', ''))
+        for experiment, counts, memory, registers, width in \
+                _experiments(job):
+            if self.registers is None and registers:
+                self.registers = registers
+            self.width = max(self.width, width)
+            values = [int(key, 2) for key in counts]
+            self._append('', job_index, experiment, len(values),
+                         bitstring=values, count=list(counts.values()))
+            if self.memory and memory:
+                self._append('memory_', job_index, experiment, len(memory),
+                             memory=[int(shot, 2) for shot in memory])
+
+    def _append(self, prefix, job_index, experiment, length, **columns):
+        self._columns[prefix + 'job'].append(np.full(length, job_index))
+        self._columns[prefix + 'experiment'].append(
+            np.full(length, experiment))
+        for name, values in columns.items():
+            self._columns[name].append(values)
+
+    def close(self):
+        """
+        Write the headers of the columns, the job ids and the metadata
+        """
+        for column in self._columns.values():
+            column.close()
+        np.save(os.path.join(self.directory, 'job_ids.npy'),
+                np.array(self.job_ids, dtype='U'))
+        with open(os.path.join(self.directory, 'metadata.json'), 'w') as meta:
+            json.dump({'width': self.width, 'registers': self.registers or [],
+                       'columns': sorted(self._columns)}, meta)
+
+
+def _experiments(job):
+    """
+    Get the index, counts, memory (as bitstrings), registers and width of
+    every experiment of a job with counts
+    """
+    for experiment, qasm in enumerate(job.get('qasms', [])):
+        data = qasm.get('data') or {}
+        if 'counts' in data:
+            registers = parse_creg_labels(data.get('creg_labels') or
+                                          data.get('cregLabels'))
+            counts = dict((key.replace(' ', ''), value)
+                          for key, value in data['counts'].items())
+            memory = [shot.replace(' ', '')
+                      for shot in data.get('memory') or []]
+            yield experiment, counts, memory, registers, max(
+                [len(key) for key in counts] or [0])
+    for experiment, result in enumerate(
+            (job.get('qObjectResult') or {}).get('results', [])):
+        data = result.get('data') or {}
+        if 'counts' not in data:
+            continue
+        header = result.get('header') or {}
+        registers = parse_creg_labels(header.get('creg_sizes'))
+        width = (header.get('memory_slots') or
+                 sum(size for _, size in registers))
+        counts = dict((_hex_to_bitstring(key, width), value)
+                      for key, value in data['counts'].items())
+        memory = [_hex_to_bitstring(shot, width)
+                  for shot in data.get('memory') or []]
+        yield experiment, counts, memory, registers, width
+
+
+def export_jobs(api, ids, directory, memory=False, batch_size=100, **kwargs):
+    """Fetch the results of some jobs and export them with a
+    ResultsExporter, a batch of jobs at a time.
+
+    Args:
+        api (IBMQuantumExperience): connection used to fetch the jobs.
+        ids (list): ids of the jobs.
+        directory (str): directory of the files.
+        memory (bool): whether to export the memory of every shot.
+        batch_size (int): number of jobs fetched (and kept in memory) at a
+            time.
+        **kwargs: other arguments of ``get_jobs_by_id`` (hub, group...).
+
+    Returns:
+        int: the number of jobs exported.
+    """
+    ids = list(ids)
+    with ResultsExporter(directory, memory) as exporter:
+        for start in range(0, len(ids), batch_size):
+            for job in api.get_jobs_by_id(ids[start:start + batch_size],
+                                          **kwargs):
+                exporter.add_job(job)
+    return len(ids)
+
+
+def load_results(directory, mmap_mode='r'):
+    """Open the columns exported to a directory, memory-mapped.
+
+    Args:
+        directory (str): directory of the files.
+        mmap_mode (str): memory-map mode of ``numpy.load`` (None to read
+            the columns in memory).
+
+    Returns:
+        dict: the arrays of each column, 'job_ids', and the 'width' and
+            'registers' of the bitstrings.
+    """
+    if np is None:
+        raise ImportError('numpy is required to load results')
+    with open(os.path.join(directory, 'metadata.json')) as meta:
+        metadata = json.load(meta)
+    results = {}
+    for name in metadata['columns']:
+        path = os.path.join(directory, name + '.npy')
+        # Empty files cannot be memory-mapped.
+        empty = os.path.getsize(path) <= _HEADER_SIZE
+        results[name] = np.load(path, mmap_mode=None if empty else mmap_mode)
+    results['job_ids'] = np.load(os.path.join(directory, 'job_ids.npy'))
+    results['width'] = metadata['width']
+    results['registers'] = [tuple(register)
+                            for register in metadata['registers']]
+    return results
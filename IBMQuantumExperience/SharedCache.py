@@ -0,0 +1,176 @@
+"""
+    Cache shared by the processes of a host
+"""
+import contextlib
+import errno
+import hashlib
+import os
+import stat
+import tempfile
+import threading
+import time
+try:
+    import simplejson as json
+except ImportError:
+    import json
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def replace_file(source, target):
+    """
+    Rename a file over another one, atomically where the system allows it
+    (on Python 2 under Windows, the other one is removed first)
+    """
+    replace = getattr(os, 'replace', None)
+    if replace is not None:
+        replace(source, target)
+        return
+    try:
+        os.rename(source, target)
+    except OSError:
+        if not os.path.exists(target):
+            raise
+        os.remove(target)
+        os.rename(source, target)
+
+
+def _check_private(path):
+    """
+    Check that a directory belongs to the user and is not accessible by
+    the others (on the systems with user ids)
+    """
+    if not hasattr(os, 'getuid'):
+        return
+    status = os.lstat(path)
+    if (not stat.S_ISDIR(status.st_mode) or
+            status.st_uid != os.getuid() or status.st_mode & 0o077):
+        raise OSError(errno.EACCES, 'The cache directory must belong to '
+                      'the user, with no access for the others', path)
+
+
+class SharedCache(object):
+    """
+    Cache of JSON values shared by the processes of a host.
+
+    Each key is stored in its own file of a local directory, together with
+    its expiration time. The files are guarded by file locks, so that when
+    a value is missing or expired only one process (or thread) fetches it,
+    while the others wait and then read the value fetched.
+
+    The directory is created readable by its owner only, as it may hold
+    access tokens, and an existing directory that is not (or that belongs
+    to another user) is refused. File locks need a POSIX system; elsewhere
+    the cache is only shared by the threads of a process.
+    """
+    def __init__(self, path=None):
+        """
+        Args:
+            path (str): directory of the cache. By default, a directory of
+                the user in the temporary directory of the system.
+
+        Raises:
+            OSError: if the directory is not private to the user.
+        """
+        if path is None:
+            name = 'qiskit-api-py-cache'
+            if hasattr(os, 'getuid'):
+                name += '-{}'.format(os.getuid())
+            path = os.path.join(tempfile.gettempdir(), name)
+        self.path = path
+        try:
+            os.makedirs(path, 0o700)
+        except OSError as ex:
+            if ex.errno != errno.EEXIST:
+                raise
+        _check_private(path)
+        self._thread_lock = threading.RLock()
+
+    def _file(self, key, extension='.json'):
+        name = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, name + extension)
+
+    @contextlib.contextmanager
+    def _locked(self, key):
+        """
+        Hold the exclusive lock of a key
+        """
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self._file(key, '.lock'), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get(self, key):
+        """
+        Get the value of a key, or None if it is missing or expired
+        """
+        try:
+            with open(self._file(key)) as entry_file:
+                entry = json.load(entry_file)
+        except (IOError, OSError, ValueError):
+            return None
+        if entry.get('expires', 0) <= time.time():
+            return None
+        return entry.get('value')
+
+    def set(self, key, value, ttl):
+        """
+        Set the value of a key, expiring after ttl seconds
+        """
+        entry = {'key': key, 'value': value, 'expires': time.time() + ttl}
+        handle, temp_name = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'w') as entry_file:
+                json.dump(entry, entry_file)
+            # Renaming is atomic, so readers never see a partial file.
+            replace_file(temp_name, self._file(key))
+        except Exception:
+            os.remove(temp_name)
+            raise
+
+    def delete(self, key):
+        """
+        Remove the value of a key
+        """
+        try:
+            os.remove(self._file(key))
+        except OSError as ex:
+            if ex.errno != errno.ENOENT:
+                raise
+
+    def get_or_refresh(self, key, fetch, ttl, is_stale=None):
+        """Get the value of a key, fetching it if it is missing or expired.
+
+        Only one process fetches a missing value at a time: the others wait
+        for it and use the value it fetched.
+
+        Args:
+            key (str): the key.
+            fetch (callable): function that fetches the value.
+            ttl (float or callable): seconds before the value expires, or a
+                function that takes the value and returns them.
+            is_stale (callable): function that takes the cached value and
+                returns whether it has to be fetched again anyway.
+
+        Returns:
+            object: the value.
+        """
+        value = self.get(key)
+        if value is not None and not (is_stale and is_stale(value)):
+            return value
+        with self._locked(key):
+            # Another process may have fetched it while waiting for the lock.
+            value = self.get(key)
+            if value is not None and not (is_stale and is_stale(value)):
+                return value
+            value = fetch()
+            self.set(key, value, ttl(value) if callable(ttl) else ttl)
+            return value
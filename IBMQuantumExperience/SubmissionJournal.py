@@ -0,0 +1,224 @@
+"""
+    Journal of the submissions, used to avoid submitting a job twice
+"""
+import contextlib
+import errno
+import os
+import tempfile
+import threading
+import time
+try:
+    import simplejson as json
+except ImportError:
+    import json
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from .SharedCache import replace_file
+
+PENDING = 'PENDING'
+SUBMITTED = 'SUBMITTED'
+
+
+class SubmissionJournal(object):
+    """
+    Journal of the idempotency keys of the submissions and of the ids of the
+    jobs (or executions) they created.
+
+    A key is recorded as pending before its submission is sent and as
+    submitted once its id is known. When a pending key is submitted again
+    (after a lost response or a crash), the client first looks for the job
+    created by the previous attempt.
+
+    Without a path, the journal only lives in memory. With a path, every
+    change is appended to that file, one JSON line each, so that it
+    survives the process. The file is locked while it is read or written
+    (on POSIX systems), so that the processes sharing it see the changes of
+    each other, and it is compacted once most of its lines are outdated.
+    """
+    def __init__(self, path=None, max_age=7 * 24 * 3600.0,
+                 max_entries=10000):
+        """
+        Args:
+            path (str): file of the journal, or None.
+            max_age (float): seconds after which the entries are forgotten.
+            max_entries (int): number of entries kept, the oldest ones are
+                forgotten first.
+        """
+        self.path = path
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        # Inode and offset of the file read so far, and number of lines.
+        self._position = None
+        self._lines = 0
+        self._torn = False
+        if path is not None:
+            with self._locked():
+                pass
+
+    def get(self, key):
+        """
+        Get the entry of a key (a dict with its 'state', 'id' and 'time'),
+        or None if the key is unknown
+        """
+        with self._locked():
+            entry = self._entries.get(key)
+            return dict(entry) if entry else None
+
+    def pending(self, key):
+        """
+        Record that a submission is about to be sent
+        """
+        self._update(key, {'state': PENDING, 'id': None})
+
+    def submitted(self, key, id_submission):
+        """
+        Record the id of the job (or execution) created by a submission
+        """
+        self._update(key, {'state': SUBMITTED, 'id': id_submission})
+
+    def forget(self, key):
+        """
+        Remove the entry of a key, after a submission rejected by the server
+        """
+        with self._locked():
+            if self._entries.pop(key, None) is not None:
+                self._append({'key': key})
+
+    def _update(self, key, entry):
+        entry['time'] = time.time()
+        with self._locked():
+            self._entries[key] = entry
+            self._prune(entry['time'])
+            self._append(dict(entry, key=key))
+
+    def _prune(self, now):
+        oldest = now - self.max_age
+        for key in [key for key, entry in self._entries.items()
+                    if entry['time'] < oldest]:
+            del self._entries[key]
+        excess = len(self._entries) - self.max_entries
+        if excess > 0:
+            by_age = sorted(self._entries,
+                            key=lambda key: self._entries[key]['time'])
+            for key in by_age[:excess]:
+                del self._entries[key]
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """
+        Hold the lock of the journal, with the changes of the other
+        processes read
+        """
+        with self._lock:
+            if self.path is None:
+                yield
+                return
+            if fcntl is None:
+                self._read()
+                yield
+                return
+            with open(self.path + '.lock', 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._read()
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self):
+        """
+        Read the lines appended to the file since the last read
+        """
+        try:
+            journal_file = open(self.path, 'rb')
+        except (IOError, OSError) as ex:
+            if ex.errno != errno.ENOENT:
+                raise
+            self._entries = {}
+            self._position = None
+            self._lines = 0
+            return
+        with journal_file:
+            inode = os.fstat(journal_file.fileno()).st_ino
+            offset = 0
+            if self._position is not None and self._position[0] == inode:
+                offset = self._position[1]
+            else:
+                # A new file (or compacted by another process).
+                self._entries = {}
+                self._lines = 0
+                self._torn = False
+            journal_file.seek(offset)
+            data = journal_file.read()
+        if offset == 0 and data.startswith(b'{') and b'\n' not in data:
+            try:
+                # The journals of the previous versions: a JSON object.
+                self._entries = json.loads(data.decode('utf-8'))
+            except ValueError:
+                pass
+            else:
+                self._compact()
+                return
+        # The writes hold the lock: a line without its end was cut by a
+        # crash, and the next line starts after it.
+        if data:
+            self._torn = not data.endswith(b'\n')
+        for line in data.splitlines():
+            try:
+                record = json.loads(line.decode('utf-8'))
+            except ValueError:
+                continue
+            key = record.pop('key')
+            if 'state' in record:
+                self._entries[key] = record
+            else:
+                self._entries.pop(key, None)
+            self._lines += 1
+        self._position = (inode, offset + len(data))
+
+    def _append(self, record):
+        """
+        Append a change to the file, compacting it if mostly outdated
+        """
+        if self.path is None:
+            return
+        if self._lines > 2 * len(self._entries) + 100:
+            self._compact()
+            return
+        line = (json.dumps(record) + '\n').encode('utf-8')
+        if self._torn:
+            # Start a new line after the cut one.
+            line = b'\n' + line
+            self._torn = False
+        with open(self.path, 'ab') as journal_file:
+            journal_file.write(line)
+            inode = os.fstat(journal_file.fileno()).st_ino
+        offset = self._position[1] if self._position is not None else 0
+        self._position = (inode, offset + len(line))
+        self._lines += 1
+
+    def _compact(self):
+        """
+        Rewrite the file with the current entries only
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        handle, temp_name = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as journal_file:
+                for key, entry in self._entries.items():
+                    journal_file.write((json.dumps(dict(entry, key=key)) +
+                                        '\n').encode('utf-8'))
+                size = journal_file.tell()
+            # Renaming is atomic, so a crash never leaves a partial journal.
+            replace_file(temp_name, self.path)
+        except Exception:
+            os.remove(temp_name)
+            raise
+        self._position = (os.stat(self.path).st_ino, size)
+        self._lines = len(self._entries)
+        self._torn = False
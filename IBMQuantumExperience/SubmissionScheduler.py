@@ -0,0 +1,362 @@
+"""
+    Client-side scheduling of the submissions of jobs
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from .IBMQuantumExperience import ApiError, BadBackendError, CredentialsError
+from .IBMQuantumExperience import JobValidationError, PayloadTooLargeError
+from .IBMQuantumExperience import RegisterSizeError, JOB_FINAL_STATES
+
+log = logging.getLogger(__name__)
+_clock = getattr(time, 'monotonic', time.time)
+
+_SCOPE = ('hub', 'group', 'project')
+# Errors for which submitting the job again would not help.
+_REJECTED = (BadBackendError, CredentialsError, JobValidationError,
+             PayloadTooLargeError, RegisterSizeError)
+
+
+class ScheduledJob(Future):
+    """
+    Future of a job queued in a SubmissionScheduler, resolved with the final
+    information of the job once it has been submitted and has finished (as
+    the JobFuture of ``submit_job``).
+
+    Cancelling it removes the job from the queue or, once submitted,
+    cancels the job on the platform.
+    """
+    def __init__(self, backend, scope, priority, arguments):
+        """
+        Args:
+            backend (str): name of the backend of the job.
+            scope (tuple): hub, group and project of the job.
+            priority (int): priority of the job (higher first).
+            arguments (dict): arguments of ``submit_job``.
+        """
+        super(ScheduledJob, self).__init__()
+        self.backend = backend
+        self.scope = scope
+        self.priority = priority
+        self.attempts = 0
+        self.sequence = None
+        self.job_future = None
+        self._arguments = arguments
+
+    def cancel(self):
+        """Cancel the job, queued or submitted.
+
+        Returns:
+            bool: whether the job was cancelled.
+        """
+        job_future = self.job_future
+        if job_future is None:
+            return super(ScheduledJob, self).cancel()
+        # The callback of the job future cancels this one.
+        return job_future.cancel() and self.cancelled()
+
+    def _chain(self, job_future):
+        """
+        Resolve this future as the future of the submitted job
+        """
+        if job_future.cancelled():
+            super(ScheduledJob, self).cancel()
+        elif self.set_running_or_notify_cancel():
+            error = job_future.exception()
+            if error is None:
+                self.set_result(job_future.result())
+            else:
+                self.set_exception(error)
+
+    def _fail(self, error):
+        if self.set_running_or_notify_cancel():
+            self.set_exception(error)
+
+
+class SubmissionScheduler(object):
+    """
+    Queue of jobs in front of ``submit_job``, that keeps the number of
+    unfinished jobs of each backend within a window, so that the limits of
+    the server on the jobs queued per backend are not exceeded.
+
+    The queued jobs are submitted by priority; between jobs of the same
+    priority, the hub/group/project with fewer jobs in flight on the
+    backend goes first, and then the oldest job. A slot of the window frees
+    up when a job submitted finishes. The unfinished jobs already on the
+    server (submitted by other clients, for example) are counted too, with
+    ``get_status_jobs`` every ``refresh_interval`` seconds.
+
+    ``submit`` blocks while ``max_queued`` jobs are waiting, so that
+    producers cannot get ahead of the backends indefinitely.
+    """
+    def __init__(self, api, windows=None, default_window=5, max_queued=1000,
+                 refresh_interval=30.0, retry_delay=10.0, max_attempts=3):
+        """
+        Args:
+            api (IBMQuantumExperience): connection used to submit the jobs.
+            windows (dict): maximum unfinished jobs of each backend, by name.
+            default_window (int): maximum unfinished jobs of the other
+                backends.
+            max_queued (int): maximum jobs waiting to be submitted.
+            refresh_interval (float): seconds between the counts of the
+                unfinished jobs of a backend on the server.
+            retry_delay (float): seconds during which a backend gets no jobs
+                after a submission failed.
+            max_attempts (int): attempts to submit a job (the jobs rejected
+                as invalid are not submitted again).
+        """
+        self.api = api
+        self.windows = dict(windows or {})
+        self.default_window = default_window
+        self.max_queued = max_queued
+        self.refresh_interval = refresh_interval
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self._queues = {}
+        self._queued = 0
+        self._counter = itertools.count()
+        self._in_flight = {}
+        self._reserved = {}
+        self._server_ids = {}
+        self._refreshed = {}
+        self._blocked = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._stopped = False
+        self._thread = None
+
+    def window(self, backend):
+        """
+        Get the maximum number of unfinished jobs of a backend
+        """
+        return self.windows.get(backend, self.default_window)
+
+    def in_flight(self, backend):
+        """
+        Get the number of unfinished jobs of a backend (on the server, or
+        being submitted)
+        """
+        with self._lock:
+            return self._occupied(backend)
+
+    def __len__(self):
+        with self._lock:
+            return self._queued
+
+    def submit(self, job, backend='simulator', shots=1, priority=0,
+               hub=None, group=None, project=None, block=True, timeout=None,
+               **kwargs):
+        """Queue a job, to be submitted when its backend has room for it.
+
+        Args:
+            job (list or dict): the job, as in ``run_job``.
+            backend (str): name of the backend.
+            shots (int): number of shots.
+            priority (int): priority of the job (higher first).
+            hub (str): hub of the job.
+            group (str): group of the job.
+            project (str): project of the job.
+            block (bool): whether to wait while the queue is full.
+            timeout (float): maximum seconds to wait.
+            **kwargs: other arguments of ``run_job``.
+
+        Returns:
+            ScheduledJob: the future of the job.
+
+        Raises:
+            queue.Full: if the queue is still full after the timeout (or
+                right away, if block is False).
+        """
+        scope = (hub, group, project)
+        arguments = dict(kwargs, job=job, backend=backend, shots=shots,
+                         **dict(zip(_SCOPE, scope)))
+        scheduled = ScheduledJob(backend, scope, priority, arguments)
+        with self._lock:
+            end = None if timeout is None else _clock() + timeout
+            while self._queued >= self.max_queued:
+                remaining = None if end is None else end - _clock()
+                if not block or (remaining is not None and remaining <= 0):
+                    raise queue.Full('{} jobs are waiting to be '
+                                     'submitted'.format(self._queued))
+                self._changed.wait(remaining)
+            self._push(scheduled)
+            self._stopped = False
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                                                name='SubmissionScheduler')
+                self._thread.daemon = True
+                self._thread.start()
+            self._changed.notify_all()
+        return scheduled
+
+    def stop(self, timeout=None):
+        """
+        Stop submitting the queued jobs (until the next submit)
+        """
+        with self._lock:
+            self._stopped = True
+            self._changed.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _push(self, scheduled):
+        if scheduled.sequence is None:
+            scheduled.sequence = next(self._counter)
+        # A job submitted again keeps its place in the queue.
+        scopes = self._queues.setdefault(scheduled.backend, {})
+        heapq.heappush(scopes.setdefault(scheduled.scope, []),
+                       (-scheduled.priority, scheduled.sequence, scheduled))
+        self._queued += 1
+
+    def _occupied(self, backend):
+        ids = self._server_ids.get(backend, set()).union(*(
+            ids for (name, _), ids in self._in_flight.items()
+            if name == backend))
+        return len(ids) + self._reserved.get(backend, 0)
+
+    def _pick(self):
+        """
+        Take the queued jobs that fit in the windows of their backends
+        """
+        now = _clock()
+        picked = []
+        for backend, scopes in self._queues.items():
+            if self._blocked.get(backend, 0) > now:
+                continue
+            free = self.window(backend) - self._occupied(backend)
+            while free > 0 and any(scopes.values()):
+                scope = min(
+                    (scope for scope in scopes if scopes[scope]),
+                    key=lambda scope: (
+                        scopes[scope][0][0],
+                        len(self._in_flight.get((backend, scope), ())) +
+                        sum(1 for job in picked if job.scope == scope and
+                            job.backend == backend),
+                        scopes[scope][0][1]))
+                scheduled = heapq.heappop(scopes[scope])[2]
+                self._queued -= 1
+                if scheduled.cancelled():
+                    continue
+                scheduled.attempts += 1
+                self._reserved[backend] = self._reserved.get(backend, 0) + 1
+                picked.append(scheduled)
+                free -= 1
+        if picked:
+            # Room for the producers waiting.
+            self._changed.notify_all()
+        return picked
+
+    def _refresh(self, backend):
+        """
+        Count the unfinished jobs of a backend on the server
+        """
+        with self._lock:
+            self._refreshed[backend] = _clock()
+            scopes = set(scope for scope, jobs in
+                         self._queues.get(backend, {}).items() if jobs)
+            scopes.update(scope for name, scope in self._in_flight
+                          if name == backend)
+            limit = self.window(backend) + self._occupied(backend)
+        server_ids = set()
+        for scope in scopes:
+            try:
+                jobs = self.api.get_status_jobs(
+                    limit=limit, filter={
+                        'backend.name': backend,
+                        'status': {'nin': sorted(JOB_FINAL_STATES)}},
+                    fields=['id'], **dict(zip(_SCOPE, scope)))
+            except ApiError as ex:
+                jobs = str(ex)
+            if not isinstance(jobs, list):
+                log.warning('Could not count the jobs of %s: %s', backend,
+                            jobs)
+                return
+            server_ids.update(job['id'] for job in jobs)
+        with self._lock:
+            self._server_ids[backend] = server_ids
+
+    def _dispatch(self, scheduled):
+        """
+        Submit a job taken from the queue
+        """
+        try:
+            job_future = self.api.submit_job(**scheduled._arguments)
+        except Exception as ex:  # pylint: disable=broad-except
+            self._failed(scheduled, ex)
+            return
+        key = (scheduled.backend, scheduled.scope)
+        with self._lock:
+            self._reserved[scheduled.backend] -= 1
+            self._in_flight.setdefault(key, set()).update(job_future.ids)
+        scheduled.job_future = job_future
+        if scheduled.cancelled():
+            job_future.cancel()
+        job_future.add_done_callback(
+            lambda future: self._finished(scheduled, future))
+
+    def _failed(self, scheduled, error):
+        retry = (isinstance(error, ApiError) and
+                 not isinstance(error, _REJECTED) and
+                 scheduled.attempts < self.max_attempts)
+        with self._lock:
+            self._reserved[scheduled.backend] -= 1
+            if retry:
+                # The server may be over its limit: count its jobs again.
+                log.warning('Could not submit a job to %s, retrying: %s',
+                            scheduled.backend, error)
+                self._push(scheduled)
+                self._blocked[scheduled.backend] = \
+                    _clock() + self.retry_delay
+                self._refreshed.pop(scheduled.backend, None)
+            self._changed.notify_all()
+        if not retry:
+            scheduled._fail(error)
+
+    def _finished(self, scheduled, job_future):
+        key = (scheduled.backend, scheduled.scope)
+        with self._lock:
+            ids = self._in_flight.get(key, set())
+            ids.difference_update(job_future.ids)
+            if not ids:
+                self._in_flight.pop(key, None)
+            self._server_ids.get(scheduled.backend, set()).difference_update(
+                job_future.ids)
+            self._changed.notify_all()
+        scheduled._chain(job_future)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._stopped or not self._queued:
+                    self._thread = None
+                    return
+                now = _clock()
+                stale = [backend for backend, scopes in self._queues.items()
+                         if any(scopes.values()) and
+                         now - self._refreshed.get(
+                             backend, -self.refresh_interval) >=
+                         self.refresh_interval]
+            for backend in stale:
+                self._refresh(backend)
+            with self._lock:
+                picked = self._pick()
+                if not picked:
+                    # Woken up by finished jobs, new jobs and stop().
+                    self._changed.wait(self._next_wakeup())
+                    continue
+            self.api._map(self._dispatch, picked)
+
+    def _next_wakeup(self):
+        now = _clock()
+        times = [self.refresh_interval]
+        times.extend(end - now for end in self._blocked.values() if end > now)
+        return max(0, min(times))
@@ -0,0 +1,437 @@
+"""
+    HTTP transports used to send the requests to the QX Platform
+"""
+import re
+import threading
+try:
+    import simplejson as json
+except ImportError:
+    import json
+try:
+    from urllib.parse import parse_qs, urlencode, urlparse
+except ImportError:
+    from urllib import urlencode
+    from urlparse import parse_qs, urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+class TransportResponse(object):
+    """
+    Response of a transport, with the interface of ``requests.Response``
+    used by the client
+    """
+    def __init__(self, status_code, content=b'', headers=None, url='',
+                 reason='', chunks=None, close=None):
+        """
+        Args:
+            status_code (int): HTTP status code.
+            content (bytes): body of the response, if already read.
+            headers (dict): headers of the response.
+            url (str): url of the request.
+            reason (str): reason phrase of the status.
+            chunks (iterable): chunks of the body, if not read yet.
+            close (callable): function that releases the connection.
+        """
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.url = url
+        self.reason = reason
+        self._content = None if chunks is not None else content
+        self._chunks = chunks
+        self._close = close
+
+    @property
+    def content(self):
+        """
+        Body of the response, as bytes
+        """
+        if self._content is None:
+            self._content = b''.join(self._chunks)
+            self.close()
+        return self._content
+
+    @property
+    def text(self):
+        """
+        Body of the response, as text
+        """
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        """
+        Body of the response, parsed as JSON
+        """
+        return json.loads(self.text)
+
+    def iter_content(self, chunk_size=1):
+        """
+        Iterate over the body of the response, without reading it all if it
+        was not read yet
+        """
+        if self._content is not None:
+            for start in range(0, len(self._content), chunk_size):
+                yield self._content[start:start + chunk_size]
+            return
+        try:
+            for chunk in self._chunks:
+                yield chunk
+        finally:
+            self.close()
+
+    def raise_for_status(self):
+        """
+        Raise ``requests.HTTPError`` if the status is an error
+        """
+        if self.status_code >= 400:
+            raise requests.HTTPError('{} Error: {} for url: {}'.format(
+                self.status_code, self.reason, self.url), response=self)
+
+    def close(self):
+        """
+        Release the connection of the response
+        """
+        if self._close is not None:
+            self._close()
+            self._close = None
+
+
+class Transport(object):
+    """
+    Interface of the HTTP transports.
+
+    A transport sends a request and returns a response with the interface
+    of ``requests.Response`` (status_code, headers, url, reason, content,
+    text, json(), iter_content() and raise_for_status()). Network errors are
+    raised as ``requests.RequestException`` (``requests.Timeout`` for
+    timeouts).
+    """
+    def request(self, method, url, data=None, headers=None, timeout=None,
+                verify=True, proxies=None, auth=None, stream=False):
+        """Send a request.
+
+        Args:
+            method (str): HTTP method.
+            url (str): url of the request.
+            data (str or dict): body of the request; dicts are sent as a
+                form.
+            headers (dict): headers of the request.
+            timeout (tuple): connect and read timeouts, in seconds.
+            verify (bool): whether to verify the SSL certificates.
+            proxies (dict): proxy url for each scheme.
+            auth (requests.auth.AuthBase): authentication of the request.
+            stream (bool): whether to defer reading the body of the response.
+
+        Returns:
+            Response: the response.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Release the resources of the transport
+        """
+        pass
+
+
+def _encode_body(data, headers):
+    headers = dict(headers or {})
+    if isinstance(data, dict):
+        headers.setdefault('Content-Type',
+                           'application/x-www-form-urlencoded')
+        data = urlencode(data)
+    if data is not None and not isinstance(data, bytes):
+        data = data.encode('utf-8')
+    return data, headers
+
+
+class RequestsTransport(Transport):
+    """
+    Transport based on ``requests``, reusing the connections with a session
+    per thread
+    """
+    def __init__(self):
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        """
+        Session of the current thread
+        """
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+        return session
+
+    def request(self, method, url, data=None, headers=None, timeout=None,
+                verify=True, proxies=None, auth=None, stream=False):
+        return self.session.request(method, url, data=data, headers=headers,
+                                    timeout=timeout, verify=verify,
+                                    proxies=proxies, auth=auth, stream=stream)
+
+    def close(self):
+        session = getattr(self._local, 'session', None)
+        if session is not None:
+            session.close()
+            self._local.session = None
+
+
+class Urllib3Transport(Transport):
+    """
+    Transport based on the connection pools of ``urllib3``.
+
+    Proxies are supported, with basic authentication given in their url.
+    Other authentications (NTLM) need the ``RequestsTransport``.
+    """
+    def __init__(self, num_pools=10, maxsize=10):
+        import urllib3
+        self._urllib3 = urllib3
+        self.num_pools = num_pools
+        self.maxsize = maxsize
+        self._managers = {}
+        self._lock = threading.Lock()
+
+    def _manager(self, url, verify, proxies):
+        scheme = urlparse(url).scheme
+        proxy = (proxies or {}).get(scheme)
+        key = (bool(verify), proxy)
+        with self._lock:
+            manager = self._managers.get(key)
+            if manager is None:
+                options = {'num_pools': self.num_pools,
+                           'maxsize': self.maxsize,
+                           'cert_reqs': 'CERT_REQUIRED' if verify
+                                        else 'CERT_NONE'}
+                if proxy:
+                    parsed = urlparse(proxy)
+                    if parsed.username:
+                        options['proxy_headers'] = self._urllib3.make_headers(
+                            proxy_basic_auth='{}:{}'.format(
+                                parsed.username, parsed.password or ''))
+                    manager = self._urllib3.ProxyManager(proxy, **options)
+                else:
+                    manager = self._urllib3.PoolManager(**options)
+                self._managers[key] = manager
+            return manager
+
+    def request(self, method, url, data=None, headers=None, timeout=None,
+                verify=True, proxies=None, auth=None, stream=False):
+        if auth is not None:
+            raise ValueError('authentication objects need the '
+                             'RequestsTransport')
+        body, headers = _encode_body(data, headers)
+        if timeout is not None:
+            timeout = self._urllib3.Timeout(connect=timeout[0],
+                                            read=timeout[1])
+        manager = self._manager(url, verify, proxies)
+        exceptions = self._urllib3.exceptions
+        try:
+            response = manager.request(method.upper(), url, body=body,
+                                       headers=headers, timeout=timeout,
+                                       retries=False, preload_content=False)
+        except (exceptions.TimeoutError, exceptions.ProtocolError) as ex:
+            if isinstance(ex, exceptions.TimeoutError):
+                raise requests.Timeout(ex)
+            raise requests.ConnectionError(ex)
+        except exceptions.HTTPError as ex:
+            raise requests.ConnectionError(ex)
+
+        def close():
+            response.release_conn()
+
+        def chunks():
+            # Errors reading the body are network errors too.
+            try:
+                for chunk in response.stream(65536):
+                    yield chunk
+            except exceptions.TimeoutError as ex:
+                raise requests.Timeout(ex)
+            except exceptions.HTTPError as ex:
+                raise requests.ConnectionError(ex)
+
+        result = TransportResponse(
+            response.status, headers=dict(response.headers.items()), url=url,
+            reason=response.reason, chunks=chunks(), close=close)
+        if not stream:
+            result.content
+        return result
+
+    def close(self):
+        with self._lock:
+            for manager in self._managers.values():
+                manager.clear()
+            self._managers.clear()
+
+
+class HTTP2Transport(Transport):
+    """
+    Transport based on ``httpx``, able to use HTTP/2 (requires
+    ``httpx[http2]``).
+
+    Proxies are supported, with basic authentication given in their url.
+    Other authentications (NTLM) need the ``RequestsTransport``.
+    """
+    def __init__(self, http2=True):
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError('httpx is required by the HTTP2Transport: '
+                              'pip install httpx[http2]')
+        self._httpx = httpx
+        self.http2 = http2
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def _client(self, url, verify, proxies):
+        proxy = (proxies or {}).get(urlparse(url).scheme)
+        key = (bool(verify), proxy)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._httpx.Client(http2=self.http2, verify=verify,
+                                            proxy=proxy)
+                self._clients[key] = client
+            return client
+
+    def request(self, method, url, data=None, headers=None, timeout=None,
+                verify=True, proxies=None, auth=None, stream=False):
+        if auth is not None:
+            raise ValueError('authentication objects need the '
+                             'RequestsTransport')
+        body, headers = _encode_body(data, headers)
+        if timeout is not None:
+            timeout = self._httpx.Timeout(timeout[1], connect=timeout[0])
+        client = self._client(url, verify, proxies)
+        try:
+            request = client.build_request(method.upper(), url, content=body,
+                                           headers=headers, timeout=timeout)
+            response = client.send(request, stream=True)
+        except self._httpx.TimeoutException as ex:
+            raise requests.Timeout(ex)
+        except self._httpx.HTTPError as ex:
+            raise requests.ConnectionError(ex)
+
+        def chunks():
+            # Errors reading the body are network errors too.
+            try:
+                for chunk in response.iter_bytes(65536):
+                    yield chunk
+            except self._httpx.TimeoutException as ex:
+                raise requests.Timeout(ex)
+            except self._httpx.HTTPError as ex:
+                raise requests.ConnectionError(ex)
+
+        result = TransportResponse(
+            response.status_code, headers=dict(response.headers.items()),
+            url=url, reason=response.reason_phrase, chunks=chunks(),
+            close=response.close)
+        if not stream:
+            result.content
+        return result
+
+    def close(self):
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+
+
+class FakeRequest(object):
+    """
+    Request received by the handlers of a ``FakeTransport``
+    """
+    def __init__(self, method, url, data=None, headers=None):
+        parsed = urlparse(url)
+        self.method = method.upper()
+        self.url = url
+        self.path = parsed.path
+        self.query = dict((key, values[0]) for key, values
+                          in parse_qs(parsed.query).items())
+        self.data = data
+        self.headers = CaseInsensitiveDict(headers or {})
+
+    def json(self):
+        """
+        Body of the request, parsed as JSON
+        """
+        return json.loads(self.data)
+
+
+class FakeTransport(Transport):
+    """
+    Transport that routes the requests to Python handlers in the same
+    process, without sockets. Useful for tests and load tests.
+
+    A handler takes a ``FakeRequest`` and returns either a
+    ``TransportResponse``, a tuple ``(status_code, body)`` or a body (sent
+    with a 200 code). Bodies that are not strings are sent as JSON.
+    Requests without a handler get a 404 code.
+    """
+    def __init__(self, routes=None):
+        """
+        Args:
+            routes (list): tuples ``(method, path, handler)``, as in
+                ``route()``.
+        """
+        self.routes = []
+        self.requests = []
+        for method, path, handler in routes or []:
+            self.route(method, path, handler)
+
+    def route(self, method, path, handler):
+        """Route some requests to a handler.
+
+        Args:
+            method (str): HTTP method of the requests.
+            path (str): regular expression that the end of the path of the
+                requests must match (eg. ``'/Jobs/[^/]+/status'``).
+            handler (callable): function that handles the requests.
+        """
+        self.routes.append((method.upper(), re.compile(path + '$'),
+                            handler))
+
+    def request(self, method, url, data=None, headers=None, timeout=None,
+                verify=True, proxies=None, auth=None, stream=False):
+        request = FakeRequest(method, url, data, headers)
+        self.requests.append(request)
+        for route_method, path, handler in self.routes:
+            if route_method == request.method and path.search(request.path):
+                return self._response(handler(request), url)
+        return self._response((404, {'error': {'status': 404}}), url)
+
+    @staticmethod
+    def _response(result, url):
+        if isinstance(result, TransportResponse):
+            return result
+        status_code, body = result if isinstance(result, tuple) \
+            else (200, result)
+        if isinstance(body, bytes):
+            content_type, content = 'application/octet-stream', body
+        elif isinstance(body, str):
+            content_type, content = 'text/html; charset=utf-8', body.encode(
+                'utf-8')
+        else:
+            content_type = 'application/json; charset=utf-8'
+            content = json.dumps(body).encode('utf-8')
+        return TransportResponse(status_code, content,
+                                 headers={'Content-Type': content_type},
+                                 url=url, reason='FAKE')
+
+
+TRANSPORTS = {'requests': RequestsTransport,
+              'urllib3': Urllib3Transport,
+              'http2': HTTP2Transport}
+
+
+def get_transport(transport=None):
+    """
+    Get a transport from a Transport, the name of a transport ('requests',
+    'urllib3' or 'http2') or None (the default 'requests' transport)
+    """
+    if transport is None:
+        return RequestsTransport()
+    if isinstance(transport, Transport):
+        return transport
+    return TRANSPORTS[transport]()
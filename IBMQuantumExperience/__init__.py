@@ -1,9 +1,30 @@
 import warnings
 
 from .IBMQuantumExperience import IBMQuantumExperience  # noqa
+from .IBMQuantumExperience import JOB_FINAL_STATES
+from .BackendRefresher import BackendRefresher
+from .CalibrationStore import CalibrationStore, CalibrationRecorder
+from .CompositeJob import CompositeJob
+from .CountsAggregator import CountsAggregator
+from .CreditManager import CreditManager
+from .HTTPProxyDigestAuth import HTTPProxyDigestAuth
+from .JobFuture import JobFuture, JobPoller
+from .JobIndex import JobIndex
+from .ResultsExporter import ResultsExporter
+from .SharedCache import SharedCache
+from .SubmissionJournal import SubmissionJournal
+from .SubmissionScheduler import SubmissionScheduler
+from .Transport import Transport, RequestsTransport, Urllib3Transport
+from .Transport import HTTP2Transport, FakeTransport
 from .IBMQuantumExperience import ApiError
+from .IBMQuantumExperience import ApiTimeoutError
 from .IBMQuantumExperience import BadBackendError
+from .IBMQuantumExperience import ChecksumError
+from .IBMQuantumExperience import CircuitOpenError
 from .IBMQuantumExperience import CredentialsError
+from .IBMQuantumExperience import InsufficientCreditsError
+from .IBMQuantumExperience import JobValidationError
+from .IBMQuantumExperience import PayloadTooLargeError
 from .IBMQuantumExperience import RegisterSizeError
 
 __version__ = '2.0.4'  # this should match setup.py:version parameter
@@ -11,8 +11,12 @@ setup(name='IBMQuantumExperience',
       license='Apache-2.0',
       install_requires=[
           'requests',
-          'requests_ntlm'
+          'requests_ntlm',
+          'futures; python_version < "3"'
       ],
+      extras_require={
+          'aggregation': ['numpy']
+      },
       classifiers=(
           'Development Status :: 5 - Production/Stable',
           'Intended Audience :: Developers',
@@ -0,0 +1,191 @@
+'''
+Fake QX Platform, served in process through a FakeTransport
+'''
+
+import json
+import re
+import time
+
+import requests
+
+from IBMQuantumExperience import FakeTransport  # noqa
+
+URL = 'https://quantumexperience.ng.bluemix.net/api'
+FINAL_STATUSES = ('COMPLETED', 'CANCELLED', 'ERROR_RUNNING_JOB')
+
+
+def _get(document, key):
+    for part in key.split('.'):
+        if not isinstance(document, dict):
+            return None
+        document = document.get(part)
+    return document
+
+
+def matches(document, where):
+    '''
+    Check if a document matches a LoopBack-style where filter
+    '''
+    for key, condition in (where or {}).items():
+        value = _get(document, key)
+        if isinstance(condition, dict):
+            for operator, operand in condition.items():
+                if operator == 'inq' and value not in operand:
+                    return False
+                if operator == 'nin' and value in operand:
+                    return False
+                if operator == 'neq' and value == operand:
+                    return False
+                if operator == 'gt' and not (value is not None and
+                                             value > operand):
+                    return False
+                if operator == 'gte' and not (value is not None and
+                                              value >= operand):
+                    return False
+                if operator == 'lt' and not (value is not None and
+                                             value < operand):
+                    return False
+                if operator == 'lte' and not (value is not None and
+                                              value <= operand):
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeQX(object):
+    '''
+    The QX Platform API, with jobs kept in memory
+    '''
+    def __init__(self, backends=None):
+        self.backends = backends or [
+            {'name': 'ibmq_qasm_simulator', 'status': 'on',
+             'simulator': True, 'nQubits': 32},
+            {'name': 'ibmqx4', 'status': 'on', 'simulator': False,
+             'nQubits': 5, 'basisGates': 'u1,u2,u3,cx,id'},
+            {'name': 'ibmqx5', 'status': 'on', 'simulator': False,
+             'nQubits': 16, 'basisGates': 'u1,u2,u3,cx,id'}]
+        self.queues = {'ibmq_qasm_simulator': 0, 'ibmqx4': 3, 'ibmqx5': 1}
+        self.unavailable = set()
+        # Seconds taken to answer the status of a queue.
+        self.queue_delay = 0
+        self.jobs = []
+        self.logins = 0
+        self.credits = 15
+        # Number of the next jobs created whose response is then lost, with
+        # a 500 code or a timeout.
+        self.lost_responses = 0
+        self.lost_timeouts = 0
+        self.transport = FakeTransport()
+        route = self.transport.route
+        route('post', '/users/loginWithToken', self.login)
+        route('get', '/users/[^/]+', lambda request: {
+            'id': 'user', 'credit': {'remaining': self.credits}})
+        route('get', '/Backends', lambda request: self.backends)
+        route('get', '/Backends/(?P<name>[^/]+)/queue/status',
+              self.queue_status)
+        route('get', '/Jobs', self.list_jobs)
+        route('get', '/Jobs/status', self.list_jobs)
+        route('post', '/Jobs', self.create_job)
+        route('get', '/Jobs/[^/]+', self.get_job)
+        route('get', '/Jobs/[^/]+/status', self.get_job)
+        route('post', '/Jobs/[^/]+/cancel', self.cancel_job)
+
+    def config(self, **options):
+        '''
+        Configuration of an IBMQuantumExperience using the fake platform
+        '''
+        config = {'url': URL, 'transport': self.transport}
+        config.update(options)
+        return config
+
+    def login(self, request):
+        self.logins += 1
+        return {'id': 'access-{}'.format(self.logins), 'userId': 'user',
+                'ttl': 1209600}
+
+    def queue_status(self, request):
+        name = request.path.split('/')[-3]
+        time.sleep(self.queue_delay)
+        return {'state': name not in self.unavailable, 'busy': False,
+                'lengthQueue': self.queues.get(name, 0)}
+
+    def create_job(self, request):
+        data = request.json()
+        job = {'id': '{:024x}'.format(len(self.jobs) + 1),
+               'status': 'RUNNING',
+               'creationDate': '2026-10-18T00:00:{:02d}.000Z'.format(
+                   len(self.jobs) % 60),
+               'backend': data['backend']}
+        if 'name' in data:
+            job['name'] = data['name']
+        if 'qasms' in data:
+            job['shots'] = data['shots']
+            job['qasms'] = [{'qasm': qasm['qasm'], 'status': 'RUNNING'}
+                            for qasm in data['qasms']]
+        else:
+            job['qObject'] = data['qObject']
+        self.jobs.append(job)
+        if self.lost_timeouts:
+            self.lost_timeouts -= 1
+            raise requests.Timeout('read timed out')
+        if self.lost_responses:
+            self.lost_responses -= 1
+            return 500, {'error': {'status': 500, 'message': 'lost'}}
+        return job
+
+    def complete(self, job, counts=None):
+        '''
+        Complete a job, with the given counts in every experiment
+        '''
+        job['status'] = 'COMPLETED'
+        for qasm in job.get('qasms', []):
+            qasm['status'] = 'DONE'
+            counts = counts or {'00000': job['shots']}
+            qasm['result'] = {'date': '2026-10-18',
+                              'data': {'counts': counts,
+                                       'creg_labels': 'c[5]'}}
+
+    def find(self, id_job):
+        for job in self.jobs:
+            if job['id'] == id_job:
+                return job
+        return None
+
+    def get_job(self, request):
+        job = self.find(request.path.split('/Jobs/')[1].split('/')[0])
+        if job is None:
+            return 404, {'error': {'status': 404, 'message': 'not found'}}
+        if request.path.endswith('/status'):
+            return {'id': job['id'], 'status': job['status']}
+        fields = json.loads(request.query.get('filter', '{}')).get('fields')
+        if fields:
+            job = dict((key, value) for key, value in job.items()
+                       if fields.get(key))
+        return json.loads(json.dumps(job))
+
+    def list_jobs(self, request):
+        query = json.loads(request.query.get('filter', '{}'))
+        jobs = [job for job in self.jobs if matches(job, query.get('where'))]
+        order = query.get('order', 'creationDate DESC').split()
+        jobs.sort(key=lambda job: _get(job, order[0]) or '',
+                  reverse=len(order) > 1 and order[1] == 'DESC')
+        skip = query.get('skip', 0)
+        jobs = jobs[skip:skip + query.get('limit', len(jobs))]
+        fields = query.get('fields')
+        if request.path.endswith('/status'):
+            fields = fields or {'id': True, 'status': True,
+                                'creationDate': True}
+        if fields:
+            jobs = [dict((key, value) for key, value in job.items()
+                         if fields.get(key)) for job in jobs]
+        return json.loads(json.dumps(jobs))
+
+    def cancel_job(self, request):
+        job = self.find(re.search('/Jobs/([^/]+)/cancel',
+                                  request.path).group(1))
+        if job is None:
+            return 404, {'error': {'status': 404, 'message': 'not found'}}
+        if job['status'] not in FINAL_STATUSES:
+            job['status'] = 'CANCELLED'
+        return {'id': job['id'], 'status': job['status']}
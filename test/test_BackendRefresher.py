@@ -0,0 +1,96 @@
+# pylint: disable=C0103
+'''
+Unit Test of the background refresh of backends
+'''
+
+import unittest
+
+from fake_qx import FakeQX  # noqa
+from IBMQuantumExperience import BackendRefresher  # noqa
+from IBMQuantumExperience import IBMQuantumExperience  # noqa
+
+
+class FakeApi(object):
+    '''
+    Replaces the connection to the QX Platform, counting the fetches
+    '''
+    def __init__(self):
+        self.calibrations = 0
+
+    def backend_status(self, backend, refresh=False):
+        return {'backend': backend, 'available': True, 'pending_jobs': 0}
+
+    def backend_calibration(self, backend, refresh=False):
+        self.calibrations += 1
+        return {'backend': backend, 'lastUpdateDate': self.calibrations}
+
+    def backend_parameters(self, backend, refresh=False):
+        return {'backend': backend}
+
+    def _map(self, func, items):
+        return [func(item) for item in items]
+
+
+class TestBackendRefresher(unittest.TestCase):
+    '''
+    Class with the unit tests. They do not need access to the QX Platform.
+    '''
+
+    def test_refresh(self):
+        changes = []
+        refresher = BackendRefresher(
+            FakeApi(), ['ibmqx4'],
+            on_calibration_change=lambda *args: changes.append(args))
+        self.assertIsNone(refresher.snapshot('ibmqx4', 'calibration'))
+        refresher.refresh('ibmqx4', 'calibration')
+        refresher.refresh('ibmqx4', 'calibration')
+        snapshot = refresher.snapshot('ibmqx4', 'calibration')
+        self.assertEqual(snapshot.value['lastUpdateDate'], 2)
+        self.assertGreaterEqual(snapshot.age, 0)
+        self.assertEqual([(old and old['lastUpdateDate'],
+                           new['lastUpdateDate'])
+                          for _, old, new in changes], [(None, 1), (1, 2)])
+
+    def test_thread(self):
+        api = FakeApi()
+        refresher = BackendRefresher(api, ['ibmqx4', 'ibmqx5'],
+                                     intervals={'parameters': None})
+        refresher.start()
+        try:
+            self.assertTrue(refresher.running)
+            for _ in range(100):
+                if api.calibrations == 2 and \
+                        refresher.snapshot('ibmqx5', 'status'):
+                    break
+                refresher._stop.wait(0.01)
+        finally:
+            refresher.stop()
+        self.assertFalse(refresher.running)
+        self.assertIsNotNone(refresher.snapshot('ibmqx5', 'status'))
+        self.assertIsNone(refresher.snapshot('ibmqx5', 'parameters'))
+
+    def test_backend_status(self):
+        qx = FakeQX()
+        api = IBMQuantumExperience('token', config=qx.config())
+        refresher = api.start_refresher(
+            ['ibmqx4'], intervals={'calibration': None, 'parameters': None})
+        try:
+            for _ in range(100):
+                if refresher.snapshot('ibmqx4', 'status'):
+                    break
+                refresher._stop.wait(0.01)
+            fetches = len(qx.transport.requests)
+            status = api.backend_status('ibmqx4')
+            self.assertEqual(len(qx.transport.requests), fetches)
+            self.assertGreaterEqual(status['snapshot_age'], 0)
+            # A call with its own token is not served from the snapshot.
+            status = api.backend_status('ibmqx4', access_token='other')
+            self.assertNotIn('snapshot_age', status)
+            self.assertEqual(len(qx.transport.requests), fetches + 1)
+            self.assertEqual(api.req.credential.get_token(), 'other')
+        finally:
+            api.stop_refresher()
+
+
+if __name__ == '__main__':
+    unittest.main()
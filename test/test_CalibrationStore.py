@@ -0,0 +1,112 @@
+# pylint: disable=C0103
+'''
+Unit Test of the history of the calibrations
+'''
+
+import shutil
+import tempfile
+import unittest
+
+from IBMQuantumExperience import CalibrationRecorder  # noqa
+from IBMQuantumExperience import CalibrationStore  # noqa
+
+DAY = 24 * 3600.0
+
+
+def parameters(day, t1s):
+    return {'backend': 'ibmqx4',
+            'lastUpdateDate': '2026-10-{:02d}T10:00:00.000Z'.format(day),
+            'qubits': [{'name': 'Q{}'.format(qubit),
+                        'T1': {'value': t1, 'unit': 'us'},
+                        'T2': {'value': t1 / 2.0, 'unit': 'us'}}
+                       for qubit, t1 in enumerate(t1s)]}
+
+
+def calibration(day, cx_errors):
+    return {'backend': 'ibmqx4',
+            'lastUpdateDate': '2026-10-{:02d}T10:00:00.000Z'.format(day),
+            'qubits': [{'name': 'Q{}'.format(qubit),
+                        'readoutError': {'value': 0.01 * qubit}}
+                       for qubit in range(5)],
+            'multiQubitGates': [{'qubits': list(pair),
+                                 'gateError': {'value': error}}
+                                for pair, error in cx_errors.items()]}
+
+
+class TestCalibrationStore(unittest.TestCase):
+    '''
+    Class with the unit tests. They do not need access to the QX Platform.
+    '''
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_series_and_dedup(self):
+        store = CalibrationStore(self.path)
+        for day in range(1, 11):
+            self.assertTrue(store.record(parameters(day, [50.0 + day] * 5)))
+        self.assertFalse(store.record(parameters(10, [60.0] * 5)))
+        self.assertEqual(len(store), 10 * 5 * 2)
+
+        until = store.series('ibmqx4', 'T1', 3)[0][-1]
+        times, values = store.series('ibmqx4', 'T1', 3,
+                                     since=until - 3 * DAY)
+        self.assertEqual(values.tolist(), [57.0, 58.0, 59.0, 60.0])
+        self.assertEqual(times[-1] - times[0], 3 * DAY)
+
+        # The history is reloaded from the directory.
+        store = CalibrationStore(self.path)
+        self.assertEqual(len(store), 100)
+        self.assertEqual(store.latest('ibmqx4', 'T2')[0], 30.0)
+        self.assertFalse(store.record(parameters(10, [60.0] * 5)))
+
+    def test_best_subset(self):
+        store = CalibrationStore()
+        store.record(calibration(1, {(0, 1): 0.01, (1, 2): 0.01,
+                                     (2, 3): 0.05, (3, 4): 0.02}))
+        store.record(calibration(2, {(0, 1): 0.03, (1, 2): 0.03,
+                                     (2, 3): 0.01, (3, 4): 0.02}))
+        self.assertEqual(store.latest('ibmqx4', 'gateError')[(0, 1)], 0.03)
+        self.assertEqual(store.latest('ibmqx4', 'readoutError')[4], 0.04)
+        self.assertEqual(store.best_subset('ibmqx4', 3)[0], (2, 3, 4))
+        first_day = store.series('ibmqx4', 'gateError', 0, 1)[0][0]
+        best = store.best_subset('ibmqx4', 3, at=first_day)
+        self.assertEqual(best[0], (0, 1, 2))
+        self.assertAlmostEqual(best[1], 0.01)
+        self.assertIsNone(store.best_subset('ibmqx4', 6))
+        self.assertRaises(ValueError, store.best_subset, 'ibmqx4', 1)
+
+    def test_best_subset_beam(self):
+        # A line of 40 qubits, with a run of good gates in the middle.
+        store = CalibrationStore()
+        gates = dict(((qubit, qubit + 1), 0.05) for qubit in range(39))
+        gates.update(((qubit, qubit + 1), 0.01) for qubit in range(20, 25))
+        store.record(calibration(1, gates))
+        best = store.best_subset('ibmqx4', 6, beam_width=3)
+        self.assertEqual(best[0], (20, 21, 22, 23, 24, 25))
+        self.assertAlmostEqual(best[1], 0.01)
+
+    def test_recorder(self):
+        store = CalibrationStore()
+
+        class FakeApi(object):
+            def backend_calibration(self, backend, refresh=False):
+                return calibration(1, {(0, 1): 0.01})
+
+            def backend_parameters(self, backend, refresh=False):
+                return parameters(1, [50.0] * 5)
+
+        recorder = CalibrationRecorder(FakeApi(), store, ['ibmqx4'])
+        for kind in ('calibration', 'parameters'):
+            recorder.refresher.refresh('ibmqx4', kind)
+            recorder.refresher.refresh('ibmqx4', kind)
+        self.assertEqual(sorted(store.metrics),
+                         ['T1', 'T2', 'gateError', 'readoutError'])
+        self.assertEqual(len(store), 5 + 1 + 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
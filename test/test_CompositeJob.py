@@ -0,0 +1,123 @@
+# pylint: disable=C0103
+'''
+Unit Test of the jobs submitted as several jobs
+'''
+
+import json
+import unittest
+
+from IBMQuantumExperience import CompositeJob  # noqa
+from IBMQuantumExperience.CompositeJob import split_job_data  # noqa
+from IBMQuantumExperience.CompositeJob import split_job_shots  # noqa
+
+
+class TestCompositeJob(unittest.TestCase):
+    '''
+    Class with the unit tests. They do not need access to the QX Platform.
+    '''
+
+    def setUp(self):
+        self.data = {'qasms': [{'qasm': 'x q[{}];'.format(i)}
+                               for i in range(5)],
+                     'shots': 1024,
+                     'backend': {'name': 'ibmq_qasm_simulator'}}
+
+    def test_split_max_experiments(self):
+        chunks = split_job_data(self.data, max_experiments=2)
+        self.assertEqual([indices for _, indices in chunks],
+                         [[0, 1], [2, 3], [4]])
+        self.assertEqual(chunks[1][0]['qasms'], self.data['qasms'][2:4])
+        self.assertEqual(chunks[1][0]['shots'], 1024)
+        self.assertEqual(len(self.data['qasms']), 5)
+
+    def test_split_max_payload_size(self):
+        chunks = split_job_data(self.data, max_payload_size=120)
+        self.assertGreater(len(chunks), 1)
+        for data, _ in chunks:
+            self.assertLessEqual(len(json.dumps(data)), 120)
+
+    def test_split_q_object(self):
+        data = {'qObject': {'experiments': [{'id': i} for i in range(3)],
+                            'config': {'shots': 1024}},
+                'backend': {'name': 'ibmq_qasm_simulator'}}
+        chunks = split_job_data(data, max_experiments=2)
+        self.assertEqual(chunks[1][0]['qObject']['experiments'], [{'id': 2}])
+        self.assertEqual(chunks[1][0]['qObject']['config'], {'shots': 1024})
+
+    def test_merge(self):
+        job = CompositeJob(None, [{'id': 'a'}, {'id': 'b'}], [[0, 2], [1]])
+        merged = job.merge([
+            {'id': 'a', 'status': 'COMPLETED',
+             'qasms': [{'data': {'counts': {'0': 1}}},
+                       {'data': {'counts': {'2': 1}}}]},
+            {'id': 'b', 'status': 'RUNNING',
+             'qasms': [{'data': {'counts': {'1': 1}}}]}])
+        self.assertEqual(merged['status'], 'RUNNING')
+        self.assertEqual(merged['id'], 'a')
+        self.assertEqual(merged['ids'], ['a', 'b'])
+        self.assertEqual([qasm['data']['counts'] for qasm in merged['qasms']],
+                         [{'0': 1}, {'1': 1}, {'2': 1}])
+
+    def test_split_shots(self):
+        jobs = split_job_shots(self.data, shots_per_job=300,
+                               backends=['ibmqx4', 'ibmqx5'], seed=7)
+        self.assertEqual([job['shots'] for job in jobs], [256, 256, 256, 256])
+        self.assertEqual([job['backend']['name'] for job in jobs],
+                         ['ibmqx4', 'ibmqx5', 'ibmqx4', 'ibmqx5'])
+        self.assertEqual([job['seed'] for job in jobs], [7, 8, 9, 10])
+        self.assertEqual(self.data['backend']['name'], 'ibmq_qasm_simulator')
+
+    def test_split_shots_q_object(self):
+        data = {'qObject': {'experiments': [{'id': 0}],
+                            'config': {'shots': 1000}},
+                'backend': {'name': 'ibmq_qasm_simulator'}}
+        jobs = split_job_shots(data, backends=['ibmqx4', 'ibmqx5', 'ibmqx2'])
+        self.assertEqual([job['qObject']['config']['shots'] for job in jobs],
+                         [334, 333, 333])
+
+    def test_merge_shots(self):
+        job = CompositeJob(None, [{'id': 'a'}, {'id': 'b'}], [[0], [0]])
+        merged = job.merge([
+            {'id': 'a', 'status': 'COMPLETED',
+             'qObjectResult': {'results': [
+                 {'shots': 2, 'data': {'counts': {'0x0': 1, '0x1': 1},
+                                       'memory': ['0x0', '0x1']}}]}},
+            {'id': 'b', 'status': 'COMPLETED',
+             'qObjectResult': {'results': [
+                 {'shots': 1, 'data': {'counts': {'0x1': 1},
+                                       'memory': ['0x1']}}]}}])
+        result = merged['qObjectResult']['results'][0]
+        self.assertEqual(result['shots'], 3)
+        self.assertEqual(result['data']['counts'], {'0x0': 1, '0x1': 2})
+        self.assertEqual(result['data']['memory'], ['0x0', '0x1', '0x1'])
+
+
+    def test_merge_shots_done(self):
+        job = CompositeJob(None, [{'id': 'a'}, {'id': 'b'}], [[0], [0]])
+        merged = job.merge([
+            {'id': 'a', 'status': 'COMPLETED', 'shots': 512,
+             'backend': {'name': 'ibmqx4'},
+             'qasms': [{'status': 'DONE', 'data': {'counts': {'0': 512}}}]},
+            {'id': 'b', 'status': 'COMPLETED', 'shots': 512,
+             'backend': {'name': 'ibmqx4'},
+             'qasms': [{'status': 'DONE', 'data': {'counts': {'1': 512}}}]}])
+        self.assertEqual(merged['status'], 'COMPLETED')
+        self.assertEqual(merged['id'], 'a')
+        self.assertEqual(merged['shots'], 1024)
+        self.assertEqual(merged['backend'], {'name': 'ibmqx4'})
+        self.assertEqual(merged['qasms'], [
+            {'status': 'DONE', 'data': {'counts': {'0': 512, '1': 512}}}])
+
+    def test_merge_missing_experiments(self):
+        job = CompositeJob(None, [{'id': 'a'}, {'id': 'b'}], [[0], [1]])
+        merged = job.merge([
+            {'id': 'a', 'status': 'COMPLETED',
+             'qasms': [{'status': 'DONE', 'data': {'counts': {'0': 1}}}]},
+            {'id': 'b', 'status': 'ERROR_RUNNING_JOB', 'qasms': []}])
+        self.assertEqual(merged['status'], 'ERROR_RUNNING_JOB')
+        self.assertEqual(merged['qasms'], [
+            {'status': 'DONE', 'data': {'counts': {'0': 1}}}])
+
+
+if __name__ == '__main__':
+    unittest.main()
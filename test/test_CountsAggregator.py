@@ -0,0 +1,63 @@
+# pylint: disable=C0103
+'''
+Unit Test of the aggregation of counts
+'''
+
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from IBMQuantumExperience.CountsAggregator import CountsAggregator  # noqa
+from IBMQuantumExperience.CountsAggregator import parse_creg_labels  # noqa
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class TestCountsAggregator(unittest.TestCase):
+    '''
+    Class with the unit tests. They do not need access to the QX Platform.
+    '''
+
+    def setUp(self):
+        self.jobs = [
+            {'qasms': [{'data': {'counts': {'00 101': 3, '11 000': 1},
+                                 'creg_labels': 'c[3] f[2]'}}]},
+            {'qObjectResult': {'results': [
+                {'data': {'counts': {'0x5': 1, '0x1': 3}},
+                 'header': {'creg_sizes': [['c', 3], ['f', 2]],
+                            'memory_slots': 5}}]}}]
+
+    def test_parse_creg_labels(self):
+        self.assertEqual(parse_creg_labels('c[3] f[2]'),
+                         [('c', 3), ('f', 2)])
+        self.assertEqual(parse_creg_labels([['c', 3]]), [('c', 3)])
+
+    def test_total(self):
+        aggregator = CountsAggregator.from_jobs(self.jobs)
+        self.assertEqual(len(aggregator), 2)
+        self.assertEqual(aggregator.total(),
+                         {'00101': 4, '11000': 1, '00001': 3})
+
+    def test_marginal_register(self):
+        aggregator = CountsAggregator.from_jobs(self.jobs)
+        marginal = aggregator.marginal(registers=['f'])
+        self.assertEqual(marginal.to_dicts(), [{'00': 3, '11': 1}, {'00': 4}])
+        self.assertEqual(marginal.registers, [('f', 2)])
+
+    def test_marginal_bits(self):
+        aggregator = CountsAggregator([{'101': 2, '100': 1, '001': 1}])
+        self.assertEqual(aggregator.marginal(bits=[2]).total(),
+                         {'1': 3, '0': 1})
+
+    def test_weighted_average(self):
+        aggregator = CountsAggregator([{'0': 1, '1': 1}, {'0': 2}])
+        self.assertEqual(aggregator.weighted_average([1, 1]),
+                         {'0': 0.75, '1': 0.25})
+        stats = aggregator.statistics()
+        self.assertEqual(stats['1']['max'], 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
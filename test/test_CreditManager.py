@@ -0,0 +1,94 @@
+# pylint: disable=C0103
+'''
+Unit Test of the admission of the jobs by their credits
+'''
+
+import time
+import unittest
+
+from fake_qx import FakeQX  # noqa
+from IBMQuantumExperience import CreditManager  # noqa
+from IBMQuantumExperience import ApiTimeoutError  # noqa
+from IBMQuantumExperience import IBMQuantumExperience  # noqa
+from IBMQuantumExperience import InsufficientCreditsError  # noqa
+
+QASM = 'OPENQASM 2.0;\ninclude "qelib1.inc";\nqreg q[5];\ncreg c[5];\n' \
+    'x q[0];\nmeasure q[0] -> c[0];\n'
+
+
+class TestCreditManager(unittest.TestCase):
+    '''
+    Class with the unit tests. They do not need access to the QX Platform.
+    '''
+
+    def setUp(self):
+        self.qx = FakeQX()
+        self.api = IBMQuantumExperience('token', config=self.qx.config(
+            credits={'refresh_interval': 3600, 'rates': {'ibmqx5': 2.0}}))
+
+    def requests(self, path):
+        return len([request for request in self.qx.transport.requests
+                    if request.path.endswith(path)])
+
+    def test_estimate(self):
+        credits = self.api.credits
+        data = {'qasms': [{'qasm': QASM}] * 3, 'shots': 2048,
+                'backend': {'name': 'ibmqx4'}}
+        self.assertEqual(credits.estimate(data), 6)
+        self.assertEqual(credits.estimate(dict(data, maxCredits=3)), 3)
+        self.assertEqual(credits.estimate(
+            dict(data, backend={'name': 'ibmqx5'})), 12)
+        self.assertEqual(credits.estimate(data, simulator=True), 0)
+        q_object = {'qObject': {'experiments': [{}, {}],
+                                'config': {'shots': 100}},
+                    'backend': {'name': 'ibmqx4'}}
+        self.assertEqual(credits.estimate(q_object), 1)
+
+    def test_admission(self):
+        jobs = [self.api.run_job([{'qasm': QASM}], 'ibmqx4', 4096)
+                for _ in range(3)]
+        self.assertEqual(self.api.credits.reserved, 12)
+        self.assertEqual(self.api.credits.available(), 3)
+        # Rejected without reaching the server, and free on a simulator.
+        self.assertRaises(InsufficientCreditsError, self.api.run_job,
+                          [{'qasm': QASM}], 'ibmqx4', 4096)
+        self.assertEqual(len(self.qx.jobs), 3)
+        self.api.run_job([{'qasm': QASM}], 'ibmq_qasm_simulator', 4096)
+        self.assertEqual(self.requests('/users/user'), 1)
+
+        # The reservations of the jobs finished are released when the
+        # balance is fetched again.
+        self.qx.complete(self.qx.find(jobs[0]['id']))
+        self.qx.credits = 11
+        self.api.credits.refresh()
+        self.assertEqual(self.api.credits.reserved, 8)
+        self.api.run_job([{'qasm': QASM}], 'ibmqx4', 2048)
+        self.assertEqual(self.api.credits.available(), 1)
+
+    def test_wait(self):
+        credits = CreditManager(self.api, refresh_interval=0.01, wait=5)
+        self.qx.credits = 4
+        credits.acquire('a', 4)
+        credits.assign('a', ['job'])
+        self.assertRaises(InsufficientCreditsError, credits.acquire, 'b', 1,
+                          timeout=0.05)
+        credits.release_jobs(['job'])
+        self.qx.credits = 0
+        self.assertRaises(InsufficientCreditsError, credits.acquire, 'b', 1,
+                          timeout=0.05)
+        self.qx.credits = 3
+        credits.acquire('b', 1)
+        self.assertEqual(credits.reserved, 1)
+
+    def test_wait_deadline(self):
+        self.api.credits.wait = 10
+        self.qx.credits = 0
+        start = time.time()
+        self.assertRaises(ApiTimeoutError, self.api.run_job,
+                          [{'qasm': QASM}], 'ibmqx4', 4096, deadline=0.2)
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual(self.qx.jobs, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
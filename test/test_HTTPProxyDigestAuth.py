@@ -0,0 +1,266 @@
+# pylint: disable=C0103
+'''
+Unit Test of the digest and NTLM authentication with a proxy
+'''
+
+import base64
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+try:
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from SocketServer import ThreadingMixIn
+
+import requests
+from requests.utils import parse_dict_header
+try:
+    import spnego
+except ImportError:
+    spnego = None
+
+from IBMQuantumExperience import IBMQuantumExperience  # noqa
+from IBMQuantumExperience import ApiError  # noqa
+
+
+def _md5(text):
+    return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    '''
+    Forward proxy answering the requests for the QX Platform itself
+    '''
+    def _answer(self, code, body, headers=None):
+        body = json.dumps(body).encode('utf-8')
+        self.send_response(code)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class DigestProxyHandler(ProxyHandler):
+    '''
+    Forward proxy asking for digest authentication, answering the requests
+    for the QX Platform itself
+    '''
+    nonce = 'a1b2c3'
+
+    def _authorized(self):
+        header = self.headers.get('Proxy-Authorization', '')
+        if not header.startswith('Digest '):
+            return False
+        fields = parse_dict_header(header[len('Digest '):])
+        if fields.get('nonce') != self.nonce:
+            return False
+        ha1 = _md5('user:{}:pass'.format(fields.get('realm')))
+        ha2 = _md5('{}:{}'.format(self.command, fields.get('uri')))
+        expected = _md5(':'.join([ha1, fields['nonce'], fields['nc'],
+                                  fields['cnonce'], fields['qop'], ha2]))
+        if expected != fields.get('response'):
+            return False
+        self.server.nonce_counts.append(int(fields['nc'], 16))
+        return True
+
+    def _proxy(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        if not self._authorized():
+            self.server.challenges += 1
+            challenge = ('Digest realm="proxy", nonce="{}", '
+                         'qop="auth"'.format(self.nonce))
+            self._answer(407, {}, {'Proxy-Authenticate': challenge})
+        elif '/users/loginWithToken' in self.path:
+            self._answer(200, {'id': 'token', 'userId': 'user'})
+        else:
+            self._answer(200, {'new': '1.0'})
+
+    do_GET = do_POST = _proxy
+
+
+class NTLMProxyHandler(ProxyHandler):
+    '''
+    Forward proxy asking for NTLM authentication once per connection,
+    answering the requests for the QX Platform itself
+    '''
+    # Keep the connections open, as NTLM authenticates them.
+    protocol_version = 'HTTP/1.1'
+    context = None
+    authenticated = False
+
+    def _authenticate(self):
+        '''
+        Take a step of the NTLM handshake of the connection, and return the
+        challenge to send (None once the connection is authenticated)
+        '''
+        header = self.headers.get('Proxy-Authorization', '')
+        if not header.startswith('NTLM '):
+            return 'NTLM'
+        token = base64.b64decode(header[len('NTLM '):])
+        if token[8:9] == b'\x01':
+            # A negotiate message starts a new handshake.
+            self.server.challenges += 1
+            self.context = spnego.server(
+                protocol='ntlm', options=spnego.NegotiateOptions.use_ntlm)
+            challenge = self.context.step(token)
+            return 'NTLM ' + base64.b64encode(challenge).decode('ascii')
+        try:
+            self.context.step(token)
+        except (AttributeError, spnego.exceptions.SpnegoError):
+            self.context = None
+            return 'NTLM'
+        self.authenticated = True
+        return None
+
+    def _proxy(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        challenge = None if self.authenticated else self._authenticate()
+        if challenge is not None:
+            self._answer(407, {}, {'Proxy-Authenticate': challenge})
+            return
+        self.server.connections.append(self.client_address)
+        if '/users/loginWithToken' in self.path:
+            self._answer(200, {'id': 'token', 'userId': 'user'})
+        else:
+            self._answer(200, {'new': '1.0'})
+
+    do_GET = do_POST = _proxy
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    '''
+    HTTP server answering each connection in its own thread
+    '''
+    daemon_threads = True
+
+
+class TestHTTPProxyDigestAuth(unittest.TestCase):
+    '''
+    Tests for the digest authentication with a proxy
+    '''
+
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), DigestProxyHandler)
+        self.server.challenges = 0
+        self.server.nonce_counts = []
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        proxy_url = 'http://127.0.0.1:{}'.format(self.server.server_port)
+        self.config = {'url': 'http://qx.test/api',
+                       'proxies': {'urls': {'http': proxy_url},
+                                   'username_digest': 'user',
+                                   'password_digest': 'pass'}}
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_preemptive_auth(self):
+        api = IBMQuantumExperience('token', config=self.config)
+        for _ in range(3):
+            self.assertEqual(api.api_version(), {'new': '1.0'})
+        # Only the first request (the login) was challenged.
+        self.assertEqual(self.server.challenges, 1)
+        self.assertEqual(self.server.nonce_counts, [1, 2, 3, 4])
+
+    def test_wrong_password(self):
+        self.config['proxies']['password_digest'] = 'wrong'
+        with self.assertRaises(ApiError):
+            IBMQuantumExperience('token', config=self.config)
+        self.assertEqual(self.server.challenges, 2)
+
+    def test_https_refused(self):
+        self.config['url'] = 'https://qx.test/api'
+        self.config['proxies']['urls']['https'] = \
+            self.config['proxies']['urls']['http']
+        with self.assertRaises(ApiError):
+            IBMQuantumExperience('token', config=self.config)
+        # Nothing was sent through the proxy.
+        self.assertEqual(self.server.challenges, 0)
+
+    def test_https_header_not_sent(self):
+        api = IBMQuantumExperience('token', config=self.config)
+        auth = api.req.proxy_auth
+        request = requests.Request('GET', 'https://qx.test/api/x').prepare()
+        auth(request)
+        # The header would be sent inside the tunnel, to the server.
+        self.assertNotIn('Proxy-Authorization', request.headers)
+        self.assertEqual(request.hooks['response'], [])
+        request = requests.Request('GET', 'http://qx.test/api/x').prepare()
+        auth(request)
+        self.assertIn('Proxy-Authorization', request.headers)
+
+
+@unittest.skipIf(spnego is None, 'needs pyspnego')
+class TestHTTPProxyNTLMAuth(unittest.TestCase):
+    '''
+    Tests for the NTLM authentication with a proxy
+    '''
+
+    def setUp(self):
+        # The accounts known by the NTLM server of pyspnego.
+        self.directory = tempfile.mkdtemp()
+        users = os.path.join(self.directory, 'users')
+        with open(users, 'w') as users_file:
+            users_file.write('DOMAIN:user:pass\n')
+        self.user_file = os.environ.get('NTLM_USER_FILE')
+        os.environ['NTLM_USER_FILE'] = users
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), NTLMProxyHandler)
+        self.server.challenges = 0
+        self.server.connections = []
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        proxy_url = 'http://127.0.0.1:{}'.format(self.server.server_port)
+        self.config = {'url': 'http://qx.test/api',
+                       'proxies': {'urls': {'http': proxy_url},
+                                   'username_ntlm': 'DOMAIN\\user',
+                                   'password_ntlm': 'pass'}}
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.user_file is None:
+            del os.environ['NTLM_USER_FILE']
+        else:
+            os.environ['NTLM_USER_FILE'] = self.user_file
+        shutil.rmtree(self.directory)
+
+    def test_connection_reused(self):
+        api = IBMQuantumExperience('token', config=self.config)
+        challenges = self.server.challenges
+        self.assertGreaterEqual(challenges, 1)
+        for _ in range(3):
+            self.assertEqual(api.api_version(), {'new': '1.0'})
+        # The later requests of the thread reuse an authenticated
+        # connection, without a new handshake.
+        self.assertEqual(self.server.challenges, challenges)
+        self.assertEqual(len(set(self.server.connections[-3:])), 1)
+        self.assertEqual(len(set(self.server.connections)), challenges)
+
+    def test_wrong_password(self):
+        self.config['proxies']['password_ntlm'] = 'wrong'
+        with self.assertRaises(ApiError):
+            IBMQuantumExperience('token', config=self.config)
+        self.assertEqual(self.server.connections, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,19 +3,37 @@
 Unit Test
 '''
 
+import logging
 import sys
+import threading
+import time
 import unittest
 import json
 import os
+import requests
 # pylint: disable=W0403
 from config import API_TOKEN
 sys.path.append('IBMQuantumExperience')
 sys.path.append('../IBMQuantumExperience')
 
+from fake_qx import FakeQX  # noqa
 from IBMQuantumExperience import IBMQuantumExperience  # noqa
 from IBMQuantumExperience import ApiError  # noqa
 from IBMQuantumExperience import BadBackendError  # noqa
 from IBMQuantumExperience import RegisterSizeError  # noqa
+from IBMQuantumExperience import ApiTimeoutError  # noqa
+from IBMQuantumExperience import CircuitOpenError  # noqa
+from IBMQuantumExperience.IBMQuantumExperience import _CircuitBreaker  # noqa
+from IBMQuantumExperience.IBMQuantumExperience import _endpoint_key  # noqa
+from IBMQuantumExperience.IBMQuantumExperience import _deadline  # noqa
+from IBMQuantumExperience.IBMQuantumExperience import _remaining_time  # noqa
+from IBMQuantumExperience.IBMQuantumExperience import _sleep  # noqa
+from IBMQuantumExperience.IBMQuantumExperience import _with_deadline  # noqa
+from IBMQuantumExperience.IBMQuantumExperience import _TTLCache  # noqa
+from IBMQuantumExperience.IBMQuantumExperience import _Hedger  # noqa
+from IBMQuantumExperience.IBMQuantumExperience import _WorkerPool  # noqa
+from IBMQuantumExperience.IBMQuantumExperience import _ErrorLog  # noqa
+from IBMQuantumExperience.Transport import TransportResponse  # noqa
 
 dir_path = os.path.dirname(os.path.realpath(__file__))
 
@@ -173,6 +191,14 @@ measure q[2] -> f[0];
         is_available = self.api.backend_status()
         self.assertIsNotNone(is_available['available'])
 
+    def test_api_least_busy_backend(self):
+        '''
+        Check the ranking of the backends by how busy they are
+        '''
+        ranking = self.api.least_busy_backend({'simulator': True})
+        self.assertGreaterEqual(len(ranking), 1)
+        self.assertIn('backend', ranking[0])
+
     def test_api_backend_calibration(self):
         '''
         Check the calibration of a real chip
@@ -250,6 +276,332 @@ class TestAuthentication(unittest.TestCase):
                 API_TOKEN, config={'url': 'INVALID_URL'})
 
 
+class TestCircuitBreaker(unittest.TestCase):
+    """
+    Tests for the circuit breaker of the endpoints. These tests do not need
+    access to the QX Platform.
+    """
+    def test_endpoint_key(self):
+        self.assertEqual(_endpoint_key('/Jobs/9de64f58316db3eb6db6da53bf9135ff'
+                                       '/status'), '/Jobs/{id}/status')
+        self.assertEqual(_endpoint_key('/Backends/ibmqx4/queue/status'),
+                         '/Backends/ibmqx4/queue/status')
+
+    def test_open_on_consecutive_failures(self):
+        breaker = _CircuitBreaker('/Jobs', failure_threshold=3)
+        for _ in range(3):
+            breaker.after_request(False, breaker.before_request())
+        self.assertEqual(breaker.state, _CircuitBreaker.OPEN)
+        self.assertRaises(CircuitOpenError, breaker.before_request)
+
+    def test_open_on_error_rate(self):
+        breaker = _CircuitBreaker('/Jobs', failure_threshold=10,
+                                  error_rate_threshold=0.5, min_calls=4)
+        for success in [True, False, True, False]:
+            breaker.after_request(success, breaker.before_request())
+        self.assertEqual(breaker.state, _CircuitBreaker.OPEN)
+
+    def test_half_open_probe(self):
+        breaker = _CircuitBreaker('/Jobs', failure_threshold=1,
+                                  recovery_timeout=0)
+        breaker.after_request(False, breaker.before_request())
+        self.assertEqual(breaker.state, _CircuitBreaker.OPEN)
+        probe = breaker.before_request()
+        self.assertTrue(probe)
+        self.assertEqual(breaker.state, _CircuitBreaker.HALF_OPEN)
+        # Only one probe is let through at a time.
+        self.assertRaises(CircuitOpenError, breaker.before_request)
+        breaker.after_request(False, probe)
+        self.assertEqual(breaker.state, _CircuitBreaker.OPEN)
+        breaker.after_request(True, breaker.before_request())
+        self.assertEqual(breaker.state, _CircuitBreaker.CLOSED)
+
+
+class TestDeadline(unittest.TestCase):
+    """
+    Tests for the deadline of the API calls. These tests do not need access
+    to the QX Platform.
+    """
+    def test_no_deadline(self):
+        self.assertIsNone(_remaining_time())
+
+    def test_nested_deadline_does_not_extend(self):
+        with _deadline(1):
+            with _deadline(100):
+                self.assertLessEqual(_remaining_time(), 1)
+            with _deadline(0.5):
+                self.assertLessEqual(_remaining_time(), 0.5)
+            self.assertGreater(_remaining_time(), 0.5)
+        self.assertIsNone(_remaining_time())
+
+    def test_sleep_past_deadline(self):
+        with _deadline(0.1):
+            self.assertRaises(ApiTimeoutError, _sleep, 1)
+
+    def test_decorator(self):
+        @_with_deadline
+        def call():
+            return _remaining_time()
+        self.assertIsNone(call())
+        self.assertLessEqual(call(deadline=5), 5)
+
+
+class TestDeadlineRequests(unittest.TestCase):
+    """
+    Tests for the deadline of the API calls, through the fake transport.
+    These tests do not need access to the QX Platform.
+    """
+    def setUp(self):
+        self.qx = FakeQX()
+        self.timeouts = []
+        self.timed_out = 0
+        self.login_delay = 0
+        request = self.qx.transport.request
+
+        def record(method, url, timeout=None, **kwargs):
+            if '/version' in url:
+                self.timeouts.append(timeout)
+                if self.timed_out:
+                    self.timed_out -= 1
+                    raise requests.Timeout('timed out')
+            elif '/users/login' in url:
+                time.sleep(self.login_delay)
+            return request(method, url, timeout=timeout, **kwargs)
+        self.qx.transport.request = record
+        self.api = IBMQuantumExperience('token', config=self.qx.config())
+        self.api.req.timeout_interval = 0.1
+
+    def test_deadline_across_retries(self):
+        self.qx.transport.route('get', '/version', lambda request: '1.0')
+        self.timed_out = 100
+        start = time.time()
+        with self.assertRaises(ApiTimeoutError):
+            self.api.api_version(deadline=0.25)
+        self.assertLess(time.time() - start, 0.25 + 0.1)
+        self.assertGreaterEqual(len(self.timeouts), 2)
+        self.assertLess(len(self.timeouts), self.api.req.retries)
+
+    def test_shrinking_timeout(self):
+        self.qx.transport.route('get', '/version', lambda request: '1.0')
+        self.timed_out = 100
+        with self.assertRaises(ApiTimeoutError):
+            self.api.api_version(deadline=2)
+        self.assertEqual(len(self.timeouts), self.api.req.retries)
+        for connect, read in self.timeouts:
+            self.assertEqual(connect, read)
+        reads = [read for _, read in self.timeouts]
+        self.assertLessEqual(reads[0], 2)
+        self.assertEqual(reads, sorted(reads, reverse=True))
+        self.assertLessEqual(reads[-1], 2 - 0.1 * (len(reads) - 1))
+
+    def test_deadline_across_token_refresh(self):
+        self.qx.transport.route('get', '/version',
+                                lambda request: (401, {'error': {}}))
+        self.login_delay = 0.3
+        with self.assertRaises(ApiTimeoutError):
+            self.api.api_version(deadline=0.2)
+        # The token was refreshed, but the request was not sent again.
+        self.assertEqual(self.qx.logins, 2)
+        self.assertEqual(len(self.timeouts), 1)
+
+    def test_timeout_retried_within_deadline(self):
+        self.qx.transport.route('get', '/version', lambda request: '1.0')
+        self.timed_out = 1
+        self.assertEqual(self.api.api_version(deadline=5), '1.0')
+        self.assertEqual(len(self.timeouts), 2)
+
+    def test_timeout_without_deadline(self):
+        self.qx.transport.route('get', '/version', lambda request: '1.0')
+        self.timed_out = 1
+        self.assertRaises(ApiTimeoutError, self.api.api_version)
+        self.assertEqual(len(self.timeouts), 1)
+
+
+class TestTTLCache(unittest.TestCase):
+    """
+    Tests for the cache of backends and statuses. These tests do not need
+    access to the QX Platform.
+    """
+    def test_get_set(self):
+        cache = _TTLCache(60)
+        self.assertIsNone(cache.get('ibmqx4'))
+        cache.set('ibmqx4', {'pending_jobs': 1})
+        self.assertEqual(cache.get('ibmqx4'), {'pending_jobs': 1})
+        cache.clear()
+        self.assertIsNone(cache.get('ibmqx4'))
+
+    def test_expired(self):
+        cache = _TTLCache(0)
+        cache.set('ibmqx4', {'pending_jobs': 1})
+        self.assertIsNone(cache.get('ibmqx4'))
+
+
+class TestHedger(unittest.TestCase):
+    """
+    Tests for the hedged requests. These tests do not need access to the QX
+    Platform.
+    """
+    def setUp(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def call(self):
+        with self.lock:
+            self.calls.append(None)
+            first = len(self.calls) == 1
+        if first:
+            time.sleep(0.5)
+            return 'slow'
+        return 'fast'
+
+    def test_hedge_slow_request(self):
+        hedger = _Hedger(delay=0.05)
+        self.assertEqual(hedger.send('/Jobs/{id}/status', self.call), 'fast')
+        self.assertEqual(hedger.hedged, 1)
+
+    def test_hedge_rate_limit(self):
+        hedger = _Hedger(delay=0.05, burst=0)
+        self.assertEqual(hedger.send('/Jobs/{id}/status', self.call), 'slow')
+        self.assertEqual(hedger.hedged, 0)
+
+    def test_concurrent_requests(self):
+        hedger = _Hedger(delay=10)
+
+        def send():
+            hedger.send('/Jobs', lambda: time.sleep(0.2))
+
+        threads = [threading.Thread(target=send) for _ in range(64)]
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # No request waits for another one to be sent.
+        self.assertLess(time.time() - start, 0.6)
+        self.assertLess(max(hedger._latencies['/Jobs']), 0.4)
+
+    def test_delay_percentile(self):
+        hedger = _Hedger(percentile=50, min_samples=3)
+        self.assertEqual(hedger._delay('/Jobs'), hedger.initial_delay)
+        for latency in [0.3, 0.1, 0.2]:
+            hedger._record('/Jobs', latency)
+        self.assertEqual(hedger._delay('/Jobs'), 0.2)
+
+
+class TestWorkerPool(unittest.TestCase):
+    """
+    Tests for the pool of threads of the client. These tests do not need
+    access to the QX Platform.
+    """
+    def test_reuse_threads(self):
+        pool = _WorkerPool()
+        threads = set(pool.submit(threading.current_thread).result()
+                      for _ in range(10))
+        self.assertEqual(len(threads), 1)
+        pool.shutdown()
+
+    def test_max_workers(self):
+        pool = _WorkerPool(max_workers=2)
+        event = threading.Event()
+        futures = [pool.submit(event.wait, 5) for _ in range(3)]
+        time.sleep(0.1)
+        self.assertFalse(futures[2].running())
+        event.set()
+        self.assertTrue(all(future.result() for future in futures))
+        self.assertEqual(pool._workers, 2)
+        pool.shutdown()
+
+    def test_idle_timeout(self):
+        pool = _WorkerPool(idle_timeout=0.05)
+        pool.submit(lambda: None).result()
+        time.sleep(0.2)
+        self.assertEqual(pool._workers, 0)
+        self.assertIsNone(pool.submit(lambda: None).result())
+        pool.shutdown()
+
+    def test_nested_map(self):
+        api = IBMQuantumExperience('token', config=FakeQX().config())
+        api.req.workers.max_workers = 2
+        results = api._map(lambda i: sum(api._map(lambda j: i * j,
+                                                  range(3))), range(4))
+        self.assertEqual(results, [0, 3, 6, 9])
+        api.close()
+
+    def test_map_error(self):
+        api = IBMQuantumExperience('token', config=FakeQX().config())
+
+        def fail(item):
+            if item % 2:
+                raise ValueError(item)
+            return item
+
+        with self.assertRaises(ValueError):
+            api._map(fail, range(10))
+        api.close()
+
+
+class Records(logging.Handler):
+    """
+    Handler that keeps the records
+    """
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestErrorLog(unittest.TestCase):
+    """
+    Tests for the logging of the error responses. These tests do not need
+    access to the QX Platform.
+    """
+    url = 'https://qx/api/Jobs/0123456789abcdef0123?access_token=secret&a=1'
+
+    def setUp(self):
+        self.logger = logging.getLogger('IBMQuantumExperience')
+        self.handler = Records()
+        self.logger.addHandler(self.handler)
+        self.level = self.logger.level
+        self.logger.setLevel(logging.WARNING)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.logger.setLevel(self.level)
+
+    def response(self, body=b'{"error": "down"}'):
+        return TransportResponse(503, body, url=self.url)
+
+    def test_record(self):
+        _ErrorLog(max_body=8).response(self.response(b'x' * 100),
+                                       'Got a %s code response to %s: %s')
+        record, = self.handler.records
+        self.assertEqual(record.status_code, 503)
+        self.assertEqual(record.endpoint, '/api/Jobs/{id}')
+        self.assertNotIn('secret', record.getMessage())
+        self.assertIn('access_token=***&a=1', record.url)
+        self.assertTrue(record.getMessage().endswith(
+            ': xxxxxxxx... (100 bytes)'))
+
+    def test_deduplicate(self):
+        error_log = _ErrorLog(dedup_interval=60.0)
+        for _ in range(3):
+            error_log.response(self.response(), '%s %s %s')
+        error_log.response(self.response(b'other'), '%s %s %s')
+        self.assertEqual(len(self.handler.records), 2)
+        error_log.dedup_interval = 0
+        error_log.response(self.response(), '%s %s %s')
+        self.assertEqual(self.handler.records[-1].repeated, 2)
+        self.assertIn('(repeated 2 times)',
+                      self.handler.records[-1].getMessage())
+
+    def test_sample_and_level(self):
+        _ErrorLog(sample_rate=0).response(self.response(), '%s %s %s')
+        self.logger.setLevel(logging.ERROR)
+        _ErrorLog().response(self.response(), '%s %s %s')
+        self.assertEqual(self.handler.records, [])
+
 
 if __name__ == '__main__':
     suite = unittest.TestLoader().loadTestsFromTestCase(TestQX)
@@ -0,0 +1,83 @@
+# pylint: disable=C0103
+'''
+Unit Test of the futures of the jobs, through the fake transport
+'''
+
+import unittest
+from concurrent.futures import CancelledError, TimeoutError, wait
+
+from fake_qx import FakeQX  # noqa
+from IBMQuantumExperience import ApiError  # noqa
+from IBMQuantumExperience import IBMQuantumExperience  # noqa
+
+
+class TestJobFuture(unittest.TestCase):
+    '''
+    Class with the unit tests. They do not need access to the QX Platform.
+    '''
+
+    def setUp(self):
+        self.qx = FakeQX()
+        self.api = IBMQuantumExperience('token', config=self.qx.config())
+        self.api.poll_interval = 0.01
+        self.api.max_poll_interval = 0.05
+
+    def tearDown(self):
+        self.api.poller.stop()
+
+    def submit(self, count):
+        return [self.api.submit_job([{'qasm': 'x q[{}];'.format(i)}],
+                                    'ibmqx4', 10)
+                for i in range(count)]
+
+    def test_result(self):
+        futures = self.submit(20)
+        done = []
+        futures[0].add_done_callback(done.append)
+        self.assertEqual(futures[0].job_id, self.qx.jobs[0]['id'])
+        self.assertRaises(TimeoutError, futures[0].result, timeout=0.1)
+        self.assertEqual(futures[0].status, 'RUNNING')
+
+        requests = len(self.qx.transport.requests)
+        for job in self.qx.jobs:
+            self.qx.complete(job)
+        self.qx.jobs[-1]['status'] = 'ERROR_RUNNING_JOB'
+        wait(futures, timeout=5)
+        self.assertEqual(futures[0].result()['qasms'][0]['data']['counts'],
+                         {'00000': 10})
+        self.assertEqual(futures[-1].result()['status'], 'ERROR_RUNNING_JOB')
+        self.assertEqual(done, [futures[0]])
+        # The jobs are polled together, not one request per job.
+        self.assertLess(len(self.qx.transport.requests) - requests, 20)
+        self.assertEqual(len(self.api.poller), 0)
+
+    def test_cancel(self):
+        futures = self.submit(2)
+        self.assertTrue(futures[0].cancel())
+        self.assertEqual(self.qx.jobs[0]['status'], 'CANCELLED')
+        self.assertRaises(CancelledError, futures[0].result)
+        self.qx.complete(self.qx.jobs[1])
+        self.assertEqual(futures[1].result(timeout=5)['status'], 'COMPLETED')
+        self.assertFalse(futures[1].cancel())
+
+    def test_composite(self):
+        future = self.api.submit_job(
+            [{'qasm': 'x q[0];'}, {'qasm': 'x q[1];'}], 'ibmqx4', 10,
+            max_experiments=1)
+        self.assertIsNone(future.job_id)
+        self.assertEqual(len(future.ids), 2)
+        for job in self.qx.jobs:
+            self.qx.complete(job)
+        job = future.result(timeout=5)
+        self.assertEqual(job['ids'], future.ids)
+        self.assertEqual(len(job['qasms']), 2)
+
+    def test_lost_job(self):
+        future = self.submit(1)[0]
+        self.api.poller.max_errors = 2
+        del self.qx.jobs[0]
+        self.assertRaises(ApiError, future.result, timeout=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+# pylint: disable=C0103
+'''
+Unit Test of the local index of the job history
+'''
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from fake_qx import FakeQX  # noqa
+from IBMQuantumExperience import IBMQuantumExperience  # noqa
+from IBMQuantumExperience import JobIndex  # noqa
+
+
+class TestJobIndex(unittest.TestCase):
+    '''
+    Class with the unit tests. They do not need access to the QX Platform.
+    '''
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.qx = FakeQX()
+        self.api = IBMQuantumExperience('token', config=self.qx.config())
+        self.index = JobIndex(self.api, os.path.join(self.path, 'jobs.db'))
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.path)
+
+    def submit(self, backend, count):
+        for i in range(count):
+            self.api.run_job([{'qasm': 'x q[{}];'.format(i)}], backend, 10)
+
+    def job_requests(self):
+        return [request for request in self.qx.transport.requests
+                if request.method == 'GET' and '/Jobs' in request.path]
+
+    def test_incremental_sync(self):
+        self.submit('ibmqx4', 5)
+        self.assertEqual(self.index.sync(page_size=2),
+                         {'added': 5, 'updated': 0})
+        self.assertEqual(len(self.index), 5)
+
+        self.qx.complete(self.qx.jobs[0])
+        self.submit('ibmqx5', 2)
+        count = len(self.job_requests())
+        self.assertEqual(self.index.sync(), {'added': 2, 'updated': 4})
+        requests = self.job_requests()[count:]
+        query = json.loads(requests[0].query['filter'])
+        self.assertEqual(query['where'], {'creationDate': {
+            'gte': self.qx.jobs[4]['creationDate']}})
+        self.assertEqual(query['order'], 'creationDate ASC')
+
+        completed = self.index.get_jobs(only_completed=True)
+        self.assertEqual([job['id'] for job in completed],
+                         [self.qx.jobs[0]['id']])
+        self.assertEqual(completed[0]['qasms'][0]['data']['counts'],
+                         {'00000': 10})
+
+    def test_queries(self):
+        self.submit('ibmqx4', 3)
+        self.submit('ibmqx5', 2)
+        self.index.sync()
+        self.assertEqual(len(self.index.get_jobs(backend='ibmqx5')), 2)
+        jobs = self.index.get_jobs(limit=2, skip=1, order='creationDate ASC',
+                                   fields=['id'])
+        self.assertEqual(jobs, [{'id': self.qx.jobs[1]['id']},
+                                {'id': self.qx.jobs[2]['id']}])
+        dates = [job['creationDate'] for job in self.qx.jobs]
+        jobs = self.index.get_jobs(limit=None, filter={
+            'creationDate': {'between': [dates[1], dates[3]]},
+            'or': [{'backend.name': 'ibmqx5'}, {'status': 'COMPLETED'}]})
+        self.assertEqual([job['id'] for job in jobs],
+                         [self.qx.jobs[3]['id']])
+        self.assertRaises(ValueError, self.index.get_jobs,
+                          filter={'qasms': []})
+
+
+if __name__ == '__main__':
+    unittest.main()
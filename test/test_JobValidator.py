@@ -0,0 +1,82 @@
+# pylint: disable=C0103
+'''
+Unit Test of the local validation of jobs
+'''
+
+import unittest
+
+from fake_qx import FakeQX  # noqa
+from IBMQuantumExperience import IBMQuantumExperience  # noqa
+from IBMQuantumExperience import JobValidationError  # noqa
+from IBMQuantumExperience import RegisterSizeError  # noqa
+from IBMQuantumExperience.JobValidator import JobValidator  # noqa
+
+BACKEND = {'name': 'ibmqx4', 'nQubits': 5, 'maxShots': 8192,
+           'basisGates': 'u1,u2,u3,cx,id'}
+QASM = ('include "qelib1.inc";\nqreg q[5];\ncreg c[5];\n'
+        'h q[0];\ncx q[0],q[1];\nmeasure q[0] -> c[0];\n')
+
+
+class TestJobValidator(unittest.TestCase):
+    '''
+    Class with the unit tests. They do not need access to the QX Platform.
+    '''
+
+    def setUp(self):
+        self.validator = JobValidator(BACKEND)
+
+    def check(self, qasm, shots=1024):
+        return self.validator.validate({'qasms': [{'qasm': qasm}],
+                                        'shots': shots})
+
+    def test_valid(self):
+        self.assertIsNone(self.check(QASM))
+
+    def test_too_many_qubits(self):
+        problem = self.check(QASM.replace('qreg q[5]', 'qreg q[6]'))
+        self.assertEqual(problem[0], 'register_size')
+
+    def test_index_out_of_register(self):
+        problem = self.check(QASM + 'x q[5];\n')
+        self.assertEqual(problem[0], 'register_size')
+
+    def test_shots(self):
+        self.assertEqual(self.check(QASM, shots=10000)[0], 'shots')
+        self.assertEqual(self.check(QASM, shots=0)[0], 'shots')
+
+    def test_basis_gates(self):
+        qasm = QASM.replace('include "qelib1.inc";', '')
+        self.assertEqual(self.check(qasm)[0], 'basis_gates')
+        defined = 'gate h a { u2(0,pi) a; }\n' + qasm
+        self.assertIsNone(self.check(defined))
+        self.assertIsNone(self.check('qreg q[1];\n// h q[0];\nif(c==1) '
+                                     'u1(pi) q[0];\nbarrier q[0];\n'))
+
+    def test_q_object(self):
+        experiment = {'header': {'n_qubits': 2},
+                      'instructions': [{'name': 'u2', 'qubits': [0]},
+                                       {'name': 'cx', 'qubits': [0, 1]},
+                                       {'name': 'measure', 'qubits': [0],
+                                        'memory': [0]}]}
+        q_object = {'config': {'shots': 1024}, 'experiments': [experiment]}
+        self.assertIsNone(self.validator.validate({'qObject': q_object}))
+        experiment['instructions'].append({'name': 'h', 'qubits': [7]})
+        self.assertEqual(self.validator.validate({'qObject': q_object})[0],
+                         'basis_gates')
+
+    def test_run_job_not_sent(self):
+        qx = FakeQX()
+        api = IBMQuantumExperience('token', config=qx.config())
+        with self.assertRaises(RegisterSizeError):
+            api.run_job([{'qasm': QASM.replace('qreg q[5]', 'qreg q[9]')}],
+                        backend='ibmqx4', shots=1024)
+        with self.assertRaises(JobValidationError):
+            api.run_job([{'qasm': QASM + 'ccz q[0],q[1],q[2];\n'}],
+                        backend='ibmqx4', shots=1024)
+        self.assertEqual(qx.jobs, [])
+        api.run_job([{'qasm': QASM}], backend='ibmqx4', shots=1024)
+        self.assertEqual(len(qx.jobs), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+# pylint: disable=C0103
+'''
+Unit Test of the export of job results to columnar files
+'''
+
+import shutil
+import tempfile
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from fake_qx import FakeQX  # noqa
+from IBMQuantumExperience import IBMQuantumExperience  # noqa
+from IBMQuantumExperience import ResultsExporter  # noqa
+from IBMQuantumExperience.ResultsExporter import export_jobs  # noqa
+from IBMQuantumExperience.ResultsExporter import load_results  # noqa
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class TestResultsExporter(unittest.TestCase):
+    '''
+    Class with the unit tests. They do not need access to the QX Platform.
+    '''
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_export(self):
+        jobs = [
+            {'id': 'a', 'qasms': [
+                {'data': {'counts': {'00 01': 3, '10 00': 1},
+                          'memory': ['00 01', '00 01', '10 00', '00 01'],
+                          'creg_labels': 'c[2] d[2]'}},
+                {'data': {'counts': {'1111': 2}}}]},
+            {'id': 'b', 'qObjectResult': {'results': [
+                {'header': {'memory_slots': 4},
+                 'data': {'counts': {'0x3': 5}, 'memory': ['0x3'] * 5}}]}}]
+        with ResultsExporter(self.path, memory=True) as exporter:
+            for job in jobs:
+                exporter.add_job(job)
+
+        results = load_results(self.path)
+        self.assertIsInstance(results['count'], numpy.memmap)
+        self.assertEqual(list(results['job_ids']), ['a', 'b'])
+        rows = sorted(zip(results['job'].tolist(),
+                          results['experiment'].tolist(),
+                          results['bitstring'].tolist(),
+                          results['count'].tolist()))
+        self.assertEqual(rows, [(0, 0, 1, 3), (0, 0, 8, 1), (0, 1, 15, 2),
+                                (1, 0, 3, 5)])
+        self.assertEqual(results['memory'].tolist(), [1, 1, 8, 1, 3, 3, 3, 3,
+                                                      3])
+        self.assertEqual(results['memory_job'].tolist(), [0] * 4 + [1] * 5)
+        self.assertEqual(results['width'], 4)
+        self.assertEqual(results['registers'], [('c', 2), ('d', 2)])
+
+    def test_missing_experiment(self):
+        jobs = [
+            {'id': 'a', 'qasms': [
+                {'status': 'ERROR'},
+                {'data': {'counts': {'01': 4}, 'memory': ['01'] * 4}}]},
+            {'id': 'b', 'qObjectResult': {'results': [
+                {'header': {'memory_slots': 2}, 'data': {}},
+                {'header': {'memory_slots': 2},
+                 'data': {'counts': {'0x2': 1}, 'memory': ['0x2']}}]}}]
+        with ResultsExporter(self.path, memory=True) as exporter:
+            for job in jobs:
+                exporter.add_job(job)
+
+        results = load_results(self.path)
+        self.assertEqual(results['experiment'].tolist(), [1, 1])
+        self.assertEqual(results['bitstring'].tolist(), [1, 2])
+        self.assertEqual(results['memory_experiment'].tolist(), [1] * 5)
+
+    def test_export_jobs(self):
+        qx = FakeQX()
+        api = IBMQuantumExperience('token', config=qx.config())
+        for i in range(5):
+            api.run_job([{'qasm': 'x q[0];'}], 'ibmqx4', 10 + i)
+            qx.complete(qx.jobs[-1])
+        ids = [job['id'] for job in qx.jobs]
+        self.assertEqual(export_jobs(api, ids, self.path, batch_size=2), 5)
+        results = load_results(self.path, mmap_mode=None)
+        self.assertEqual(results['count'].tolist(), [10, 11, 12, 13, 14])
+        self.assertEqual(results['job_ids'].tolist(), ids)
+        self.assertNotIn('memory', results)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+# pylint: disable=C0103
+'''
+Unit Test of the cache shared by the processes of a host
+'''
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from IBMQuantumExperience import SharedCache  # noqa
+from IBMQuantumExperience.SharedCache import replace_file  # noqa
+
+
+def slow_fetch(path):
+    '''
+    Fetch a value slowly, recording each fetch in a file
+    '''
+    def fetch():
+        with open(os.path.join(path, 'fetches'), 'a') as fetches:
+            fetches.write('x')
+        time.sleep(0.2)
+        return {'id': 'token'}
+    return SharedCache(path).get_or_refresh('login', fetch, 60)
+
+
+class TestSharedCache(unittest.TestCase):
+    '''
+    Class with the unit tests. They do not need access to the QX Platform.
+    '''
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.cache = SharedCache(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_get_set(self):
+        self.assertIsNone(self.cache.get('backends'))
+        self.cache.set('backends', [{'name': 'ibmqx4'}], 60)
+        self.assertEqual(self.cache.get('backends'), [{'name': 'ibmqx4'}])
+        self.cache.set('backends', [], -1)
+        self.assertIsNone(self.cache.get('backends'))
+        self.cache.delete('backends')
+        self.cache.delete('backends')
+
+    @unittest.skipUnless(hasattr(os, 'getuid'), 'needs user ids')
+    def test_refuse_shared_directory(self):
+        path = os.path.join(self.path, 'shared')
+        os.mkdir(path)
+        os.chmod(path, 0o777)
+        self.assertRaises(OSError, SharedCache, path)
+        os.chmod(path, 0o700)
+        SharedCache(path)
+
+    def test_replace_file(self):
+        source = os.path.join(self.path, 'source')
+        target = os.path.join(self.path, 'target')
+        replace = getattr(os, 'replace', None)
+        try:
+            # Without os.replace, as in Python 2.
+            if replace is not None:
+                del os.replace
+            for content in ('old', 'new'):
+                with open(source, 'w') as source_file:
+                    source_file.write(content)
+                replace_file(source, target)
+        finally:
+            if replace is not None:
+                os.replace = replace
+        with open(target) as target_file:
+            self.assertEqual(target_file.read(), 'new')
+        self.assertFalse(os.path.exists(source))
+
+    def test_refresh_stale(self):
+        self.cache.set('login', {'id': 'old'}, 60)
+        value = self.cache.get_or_refresh(
+            'login', lambda: {'id': 'new'}, 60,
+            is_stale=lambda data: data['id'] == 'old')
+        self.assertEqual(value, {'id': 'new'})
+        self.assertEqual(self.cache.get('login'), {'id': 'new'})
+
+    def test_single_fetch_threads(self):
+        threads = [threading.Thread(target=slow_fetch, args=(self.path,))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with open(os.path.join(self.path, 'fetches')) as fetches:
+            self.assertEqual(fetches.read(), 'x')
+
+    @unittest.skipIf(os.name != 'posix', 'file locks need POSIX')
+    def test_single_fetch_processes(self):
+        processes = [multiprocessing.Process(target=slow_fetch,
+                                             args=(self.path,))
+                     for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        with open(os.path.join(self.path, 'fetches')) as fetches:
+            self.assertEqual(fetches.read(), 'x')
+        self.assertEqual(self.cache.get('login'), {'id': 'token'})
+
+
+if __name__ == '__main__':
+    unittest.main()
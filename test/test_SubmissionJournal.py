@@ -0,0 +1,143 @@
+# pylint: disable=C0103
+'''
+Unit Test of the idempotent submission of jobs
+'''
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from fake_qx import FakeQX  # noqa
+from IBMQuantumExperience import IBMQuantumExperience  # noqa
+from IBMQuantumExperience import ApiTimeoutError  # noqa
+from IBMQuantumExperience import SubmissionJournal  # noqa
+
+QASMS = [{'qasm': 'OPENQASM 2.0; x q[0];'}]
+
+
+class TestSubmissionJournal(unittest.TestCase):
+    '''
+    Class with the unit tests. They do not need access to the QX Platform.
+    '''
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.qx = FakeQX()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def api(self, **options):
+        api = IBMQuantumExperience('token', config=self.qx.config(**options))
+        api.req.timeout_interval = 0
+        return api
+
+    def test_journal_file(self):
+        path = os.path.join(self.path, 'journal.json')
+        journal = SubmissionJournal(path)
+        journal.pending('a')
+        journal.submitted('b', 'id-b')
+        journal.pending('c')
+        journal.forget('c')
+        journal = SubmissionJournal(path)
+        self.assertEqual(journal.get('a')['state'], 'PENDING')
+        self.assertEqual(journal.get('b')['id'], 'id-b')
+        self.assertIsNone(journal.get('c'))
+
+    def test_journal_file_shared(self):
+        path = os.path.join(self.path, 'journal.json')
+        first = SubmissionJournal(path)
+        second = SubmissionJournal(path)
+        first.pending('a')
+        second.submitted('b', 'id-b')
+        first.submitted('a', 'id-a')
+        # Each process sees the changes of the other one.
+        self.assertEqual(second.get('a')['id'], 'id-a')
+        self.assertEqual(first.get('b')['id'], 'id-b')
+        with open(path) as journal_file:
+            self.assertEqual(len(journal_file.readlines()), 3)
+
+    def test_journal_file_compacted(self):
+        path = os.path.join(self.path, 'journal.json')
+        journal = SubmissionJournal(path)
+        for number in range(300):
+            journal.submitted('a', 'id-{}'.format(number))
+        with open(path) as journal_file:
+            self.assertLess(len(journal_file.readlines()), 150)
+        self.assertEqual(SubmissionJournal(path).get('a')['id'], 'id-299')
+
+    def test_journal_file_torn(self):
+        path = os.path.join(self.path, 'journal.json')
+        SubmissionJournal(path).submitted('a', 'id-a')
+        with open(path, 'a') as journal_file:
+            journal_file.write('{"key": "b", "sta')
+        journal = SubmissionJournal(path)
+        journal.submitted('c', 'id-c')
+        journal = SubmissionJournal(path)
+        self.assertEqual(journal.get('a')['id'], 'id-a')
+        self.assertIsNone(journal.get('b'))
+        self.assertEqual(journal.get('c')['id'], 'id-c')
+
+    def test_journal_capped(self):
+        journal = SubmissionJournal(max_entries=2)
+        for key in 'abc':
+            journal.pending(key)
+        self.assertIsNone(journal.get('a'))
+        self.assertIsNotNone(journal.get('c'))
+
+    def test_retry_after_lost_response(self):
+        self.qx.lost_responses = 1
+        job = self.api().run_job([dict(qasm) for qasm in QASMS],
+                                 backend='ibmq_qasm_simulator', shots=10,
+                                 idempotency_key='k0')
+        self.assertEqual(len(self.qx.jobs), 1)
+        self.assertEqual(job['id'], self.qx.jobs[0]['id'])
+        self.assertEqual(job['name'], '[k0]')
+
+    def test_without_key(self):
+        api = self.api()
+        api.run_job([dict(qasm) for qasm in QASMS],
+                    backend='ibmq_qasm_simulator', shots=10)
+        self.assertNotIn('name', self.qx.jobs[0])
+        self.assertEqual(api.journal._entries, {})
+
+    def test_resubmit_same_key(self):
+        api = self.api()
+        self.qx.lost_timeouts = 1
+        with self.assertRaises(ApiTimeoutError):
+            api.run_job([dict(qasm) for qasm in QASMS],
+                        backend='ibmq_qasm_simulator', idempotency_key='k1')
+        job = api.run_job([dict(qasm) for qasm in QASMS],
+                          backend='ibmq_qasm_simulator', idempotency_key='k1')
+        again = api.run_job([dict(qasm) for qasm in QASMS],
+                            backend='ibmq_qasm_simulator',
+                            idempotency_key='k1')
+        self.assertEqual(len(self.qx.jobs), 1)
+        self.assertEqual(job['id'], again['id'])
+        self.assertEqual(api.journal.get('k1')['id'], job['id'])
+
+    def test_key_known_by_server_only(self):
+        self.api().run_job([dict(qasm) for qasm in QASMS],
+                           backend='ibmq_qasm_simulator',
+                           idempotency_key='k2')
+        # Another process, without the journal, submits the same key.
+        job = self.api().run_job([dict(qasm) for qasm in QASMS],
+                                 backend='ibmq_qasm_simulator',
+                                 idempotency_key='k2')
+        self.assertEqual(len(self.qx.jobs), 1)
+        self.assertEqual(job['id'], self.qx.jobs[0]['id'])
+
+    def test_chunks_not_duplicated(self):
+        api = self.api()
+        qasms = [{'qasm': 'x q[{}];'.format(i)} for i in range(4)]
+        self.qx.lost_responses = 2
+        job = api.run_job(qasms, backend='ibmq_qasm_simulator',
+                          max_experiments=2, idempotency_key='k3')
+        self.assertEqual(len(self.qx.jobs), 2)
+        self.assertEqual(sorted(job.ids),
+                         sorted(job['id'] for job in self.qx.jobs))
+
+
+if __name__ == '__main__':
+    unittest.main()
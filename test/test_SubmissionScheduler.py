@@ -0,0 +1,145 @@
+# pylint: disable=C0103
+'''
+Unit Test of the scheduling of the submissions
+'''
+
+import threading
+import time
+import unittest
+from concurrent.futures import CancelledError, Future
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from fake_qx import FakeQX  # noqa
+from IBMQuantumExperience import ApiError  # noqa
+from IBMQuantumExperience import IBMQuantumExperience  # noqa
+from IBMQuantumExperience import SubmissionScheduler  # noqa
+
+
+def wait_for(condition, timeout=5):
+    end = time.time() + timeout
+    while not condition() and time.time() < end:
+        time.sleep(0.01)
+    return condition()
+
+
+class FakeJobFuture(Future):
+    def __init__(self, id_job):
+        super(FakeJobFuture, self).__init__()
+        self.ids = [id_job]
+
+
+class FakeApi(object):
+    '''
+    Records the submissions, whose jobs finish when told to
+    '''
+    def __init__(self):
+        self.submitted = []
+        self.failures = 0
+        self.lock = threading.Lock()
+        # Set when the jobs can be counted, and then submitted.
+        self.ready = threading.Event()
+        self.ready.set()
+
+    def submit_job(self, job, backend, shots, hub, group, project):
+        with self.lock:
+            if self.failures:
+                self.failures -= 1
+                raise ApiError('too many jobs queued')
+            future = FakeJobFuture(str(len(self.submitted)))
+            self.submitted.append((job, project, future))
+        return future
+
+    def get_status_jobs(self, **kwargs):
+        self.ready.wait(5)
+        return []
+
+    def _map(self, func, items):
+        return [func(item) for item in items]
+
+
+class TestSubmissionScheduler(unittest.TestCase):
+    '''
+    Class with the unit tests. They do not need access to the QX Platform.
+    '''
+
+    def test_window_and_priority(self):
+        qx = FakeQX()
+        api = IBMQuantumExperience('token', config=qx.config())
+        api.poll_interval = 0.01
+        # The jobs of another client fill the window.
+        for _ in range(2):
+            api.run_job([{'qasm': 'x q[0];'}], 'ibmqx4', 10)
+        scheduler = SubmissionScheduler(api, windows={'ibmqx4': 2},
+                                        refresh_interval=0.02)
+        futures = [scheduler.submit([{'qasm': 'x q[{}];'.format(i)}],
+                                    'ibmqx4', 10, priority=i % 3)
+                   for i in range(5)]
+        time.sleep(0.05)
+        self.assertEqual(len(qx.jobs), 2)
+        self.assertEqual(scheduler.in_flight('ibmqx4'), 2)
+
+        for job in qx.jobs:
+            qx.complete(job)
+        self.assertTrue(wait_for(lambda: len(qx.jobs) == 4))
+        time.sleep(0.05)
+        self.assertEqual(len(qx.jobs), 4)
+        self.assertEqual(sorted(job['qasms'][0]['qasm']
+                                for job in qx.jobs[2:]),
+                         ['x q[1];', 'x q[2];'])
+
+        self.assertTrue(futures[0].cancel())
+        qx.complete([job for job in qx.jobs
+                     if job['qasms'][0]['qasm'] == 'x q[2];'][0])
+        self.assertEqual(futures[2].result(timeout=5)['status'], 'COMPLETED')
+        self.assertTrue(wait_for(lambda: len(qx.jobs) == 5))
+        self.assertEqual(qx.jobs[4]['qasms'][0]['qasm'], 'x q[4];')
+        for job in qx.jobs:
+            qx.complete(job)
+        self.assertTrue(wait_for(lambda: len(qx.jobs) == 6))
+        qx.complete(qx.jobs[5])
+        for future in futures[1:]:
+            self.assertEqual(future.result(timeout=5)['status'], 'COMPLETED')
+        self.assertRaises(CancelledError, futures[0].result)
+        self.assertEqual(futures[3].result()['qasms'][0]['qasm'], 'x q[3];')
+        api.poller.stop()
+
+    def test_fair_share(self):
+        api = FakeApi()
+        api.ready.clear()
+        scheduler = SubmissionScheduler(api, default_window=4)
+        for i in range(4):
+            scheduler.submit('a{}'.format(i), 'ibmqx4', project='a')
+        for i in range(2):
+            scheduler.submit('b{}'.format(i), 'ibmqx4', project='b')
+        api.ready.set()
+        self.assertTrue(wait_for(lambda: len(api.submitted) == 4))
+        self.assertEqual(sorted(job for job, _, _ in api.submitted),
+                         ['a0', 'a1', 'b0', 'b1'])
+        api.submitted[0][2].set_result({'status': 'COMPLETED'})
+        self.assertTrue(wait_for(lambda: len(api.submitted) == 5))
+        scheduler.stop()
+
+    def test_backpressure_and_retry(self):
+        api = FakeApi()
+        api.failures = 1
+        scheduler = SubmissionScheduler(api, default_window=1, max_queued=2,
+                                        retry_delay=0.05)
+        futures = [scheduler.submit(i, 'ibmqx4') for i in range(2)]
+        self.assertTrue(wait_for(lambda: len(api.submitted) == 1))
+        self.assertEqual(api.submitted[0][0], 0)
+        scheduler.submit(2, 'ibmqx4')
+        self.assertRaises(queue.Full, scheduler.submit, 3, 'ibmqx4',
+                          block=False)
+        self.assertRaises(queue.Full, scheduler.submit, 3, 'ibmqx4',
+                          timeout=0.01)
+        api.submitted[0][2].set_result({'status': 'COMPLETED'})
+        self.assertEqual(futures[0].result(timeout=5)['status'], 'COMPLETED')
+        self.assertTrue(wait_for(lambda: len(api.submitted) == 2))
+        scheduler.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
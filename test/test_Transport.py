@@ -0,0 +1,484 @@
+# pylint: disable=C0103
+'''
+Unit Test of the transports, and of the client through the fake transport
+'''
+
+import base64
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import requests
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+try:
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from SocketServer import ThreadingMixIn
+
+from fake_qx import FakeQX  # noqa
+from IBMQuantumExperience import IBMQuantumExperience  # noqa
+from IBMQuantumExperience import ApiError  # noqa
+from IBMQuantumExperience import ChecksumError  # noqa
+from IBMQuantumExperience import CircuitOpenError  # noqa
+from IBMQuantumExperience import FakeTransport  # noqa
+from IBMQuantumExperience import RequestsTransport  # noqa
+from IBMQuantumExperience.Transport import TransportResponse  # noqa
+from IBMQuantumExperience import Urllib3Transport  # noqa
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    '''
+    Answers every request with its method, path and body, as JSON
+    '''
+    def _echo(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.dumps({'method': self.command, 'path': self.path,
+                           'data': self.rfile.read(length).decode('utf-8')})
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+    do_GET = do_POST = _echo
+
+    def log_message(self, *args):
+        pass
+
+
+class TestTransports(unittest.TestCase):
+    '''
+    Tests for the transports, against a local HTTP server
+    '''
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), EchoHandler)
+        cls.url = 'http://127.0.0.1:{}'.format(cls.server.server_port)
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def check_transport(self, transport):
+        response = transport.request('post', self.url + '/Jobs?a=1',
+                                     data={'apiToken': 'token'},
+                                     timeout=(5, 5))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'method': 'POST',
+                                           'path': '/Jobs?a=1',
+                                           'data': 'apiToken=token'})
+        self.assertTrue(response.headers['content-type'].startswith(
+            'application/json'))
+        transport.close()
+
+    def test_requests_transport(self):
+        self.check_transport(RequestsTransport())
+
+    def test_urllib3_transport(self):
+        self.check_transport(Urllib3Transport())
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    '''
+    Answers as the QX Platform, keeping the connections open and recording
+    the connection of each request
+    '''
+    protocol_version = 'HTTP/1.1'
+
+    def _answer(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        self.server.connections.append((self.command, self.client_address))
+        if self.path.endswith('/users/loginWithToken'):
+            body = {'id': 'token', 'userId': 'user'}
+        else:
+            body = {'new': '1.0'}
+        body = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _answer
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    '''
+    HTTP server answering each connection in its own thread
+    '''
+    daemon_threads = True
+
+
+class TestConnectionReuse(unittest.TestCase):
+    '''
+    Tests that the threads of the client keep their connections
+    '''
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        self.server.connections = []
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.url = 'http://127.0.0.1:{}/api'.format(self.server.server_port)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get_connections(self):
+        return set(connection for method, connection
+                   in self.server.connections if method == 'GET')
+
+    def test_hedging(self):
+        api = IBMQuantumExperience('token', config={
+            'url': self.url, 'hedging': {'delay': 10}})
+        for _ in range(21):
+            self.assertEqual(api.api_version(), {'new': '1.0'})
+        self.assertEqual(len(self.get_connections()), 1)
+        api.close()
+
+    def test_map(self):
+        api = IBMQuantumExperience('token', config={'url': self.url})
+        for _ in range(5):
+            api._map(lambda _: api.api_version(), range(4))
+        # A connection per thread working on the calls, at most.
+        self.assertLessEqual(len(self.get_connections()), 4)
+        api.close()
+
+
+class TestFakeTransport(unittest.TestCase):
+    '''
+    Tests for the client, through the fake transport. These tests do not
+    need access to the QX Platform.
+    '''
+
+    def setUp(self):
+        self.qx = FakeQX()
+        self.api = IBMQuantumExperience('token', config=self.qx.config())
+
+    def test_not_found(self):
+        response = FakeTransport().request('get', 'http://localhost/api/x')
+        self.assertEqual(response.status_code, 404)
+
+    def test_login(self):
+        self.assertTrue(self.api.check_credentials())
+        self.assertEqual(self.qx.logins, 1)
+
+    def test_run_job(self):
+        job = self.api.run_job([{'qasm': 'OPENQASM 2.0;\nx q[0];'}],
+                               'ibmqx4', 1024)
+        self.assertEqual(job['status'], 'RUNNING')
+        self.qx.complete(self.qx.jobs[0])
+        job = self.api.get_job(job['id'])
+        self.assertEqual(job['qasms'][0]['data']['counts'], {'00000': 1024})
+        self.assertEqual(self.qx.transport.requests[-1].method, 'GET')
+
+    def test_least_busy_backend(self):
+        self.qx.unavailable.add('ibmq_qasm_simulator')
+        self.qx.queue_delay = 0.2
+        start = time.time()
+        ranking = self.api.least_busy_backend(deadline=5)
+        # The backends are probed concurrently.
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual([status['backend'] for status in ranking],
+                         ['ibmqx5', 'ibmqx4', 'ibmq_qasm_simulator'])
+        self.assertEqual(ranking[0]['pending_jobs'], 1)
+        self.assertFalse(ranking[-1]['available'])
+
+        count = len(self.qx.transport.requests)
+        ranking = self.api.least_busy_backend({'simulator': False})
+        self.assertEqual([status['backend'] for status in ranking],
+                         ['ibmqx5', 'ibmqx4'])
+        # The statuses probed, and the backends, are reused while they are
+        # fresh.
+        self.assertEqual(self.qx.transport.requests[count:], [])
+
+    def submit(self, count):
+        for i in range(count):
+            self.api.run_job([{'qasm': 'x q[{}];'.format(i)}], 'ibmqx4', 10)
+            self.qx.complete(self.qx.jobs[-1])
+        return [job['id'] for job in self.qx.jobs]
+
+    def test_get_jobs_by_id(self):
+        ids = self.submit(7)
+        ids = [ids[3], ids[0], ids[6], ids[2], ids[5], ids[1], ids[4], ids[0]]
+        self.api.max_url_length = 400
+        count = len(self.qx.transport.requests)
+        jobs = self.api.get_jobs_by_id(ids)
+        self.assertEqual([job['id'] for job in jobs], ids)
+        self.assertEqual(jobs[0]['qasms'][0]['data']['counts'],
+                         {'00000': 10})
+        requests = self.qx.transport.requests[count:]
+        self.assertGreater(len(requests), 1)
+        self.assertLess(len(requests), 7)
+        for request in requests:
+            self.assertTrue(request.path.endswith('/Jobs'))
+            self.assertLessEqual(len(request.url), 400)
+
+    def test_get_jobs_by_id_fallback(self):
+        ids = self.submit(3)
+        # A platform that ignores the filter, returning only the first job.
+        self.qx.transport.routes = [
+            route for route in self.qx.transport.routes
+            if route[1].pattern != '/Jobs$' or route[0] != 'GET']
+        self.qx.transport.route('get', '/Jobs', lambda request: [
+            json.loads(json.dumps(self.qx.jobs[0]))])
+        jobs = self.api.get_jobs_by_id(ids + ['missing'])
+        self.assertEqual([job['id'] for job in jobs], ids + ['missing'])
+        self.assertEqual(jobs[-1]['status'], 'Error')
+        self.assertEqual(jobs[1]['qasms'][0]['data']['counts'],
+                         {'00000': 10})
+
+    def test_fields(self):
+        ids = self.submit(2)
+        jobs = self.api.get_jobs(fields=['id', 'status'])
+        self.assertEqual([sorted(job) for job in jobs],
+                         [['id', 'status'], ['id', 'status']])
+        query = json.loads(self.qx.transport.requests[-1].query['filter'])
+        self.assertEqual(query['fields'], {'id': True, 'status': True})
+        job = self.api.get_job(ids[0], fields=['status', 'creationDate'])
+        self.assertEqual(sorted(job), ['creationDate', 'status'])
+        jobs = self.api.get_jobs_by_id(ids, fields=['status'])
+        self.assertEqual(jobs, [{'id': ids[0], 'status': 'COMPLETED'},
+                                {'id': ids[1], 'status': 'COMPLETED'}])
+
+    def test_get_execution(self):
+        transport = FakeTransport()
+        code_fetched = threading.Event()
+        executions_fetched = threading.Event()
+
+        def code(request):
+            code_fetched.set()
+            # Answers only if the executions are fetched at the same time.
+            executions_fetched.wait(5)
+            return {'id': 'c1', 'name': 'bell'}
+
+        def executions(request):
+            executions_fetched.set()
+            code_fetched.wait(5)
+            return [{'id': 'e1'}]
+
+        transport.route('post', '/users/loginWithToken',
+                        lambda request: {'id': 'access', 'userId': 'user'})
+        transport.route('get', '/Executions/e1',
+                        lambda request: {'id': 'e1', 'codeId': 'c1'})
+        transport.route('get', '/Codes/c1', code)
+        transport.route('get', '/Codes/c1/executions', executions)
+        api = IBMQuantumExperience('token', config={'transport': transport})
+        execution = api.get_execution('e1')
+        self.assertTrue(code_fetched.is_set() and executions_fetched.is_set())
+        self.assertEqual(execution['code'], {'id': 'c1', 'name': 'bell',
+                                             'executions': [{'id': 'e1'}]})
+        # The code document is not fetched again.
+        paths = [request.path for request in transport.requests]
+        api.get_execution('e1')
+        self.assertEqual(api.get_execution('e1', include_executions=False)[
+            'code'], {'id': 'c1', 'name': 'bell'})
+        self.assertEqual(api.get_execution('e1', include_code=False),
+                         {'id': 'e1', 'codeId': 'c1'})
+        paths = [request.path for request in transport.requests][len(paths):]
+        self.assertEqual(len([path for path in paths
+                              if path.endswith('/Codes/c1')]), 0)
+        self.assertEqual(len([path for path in paths
+                              if path.endswith('/Codes/c1/executions')]), 1)
+
+    def test_cancel_jobs(self):
+        ids = self.submit(2)
+        for i in range(5):
+            self.api.run_job([{'qasm': 'x q[{}];'.format(i)}], 'ibmqx4', 10)
+        self.api.run_job([{'qasm': 'x q[0];'}], 'ibmqx5', 10)
+        outcomes = self.api.cancel_jobs(
+            where={'status': 'RUNNING', 'backend.name': 'ibmqx4'},
+            page_size=2)
+        self.assertEqual(len(outcomes), 5)
+        self.assertEqual(set(outcome['status'] for outcome
+                             in outcomes.values()), set(['CANCELLED']))
+        self.assertEqual([job['status'] for job in self.qx.jobs],
+                         ['COMPLETED'] * 2 + ['CANCELLED'] * 5 + ['RUNNING'])
+        outcomes = self.api.cancel_jobs(ids=[ids[1], self.qx.jobs[-1]['id']])
+        self.assertEqual([outcome['status'] for outcome in outcomes.values()],
+                         ['COMPLETED', 'CANCELLED'])
+
+    def test_circuit_breaker(self):
+        transport = FakeTransport()
+        transport.route('post', '/users/loginWithToken',
+                        lambda request: {'id': 'access', 'userId': 'user'})
+        transport.route('get', '/version', lambda request: (503, 'down'))
+        api = IBMQuantumExperience('token', config={
+            'transport': transport,
+            'circuit_breaker': {'failure_threshold': 2}})
+        api.req.timeout_interval = 0
+        self.assertRaises(CircuitOpenError, api.api_version)
+        self.assertEqual(len(transport.requests), 3)
+        self.assertRaises(CircuitOpenError, api.api_version)
+        self.assertEqual(len(transport.requests), 3)
+
+
+class TestDownload(unittest.TestCase):
+    '''
+    Tests for the streaming downloads, through the fake transport
+    '''
+    body = os.urandom(300000)
+    etag = '"v1"'
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'job.json')
+        self.failures = []
+        self.range_shift = 0
+        self.encoding = None
+        self.transport = FakeTransport()
+        self.transport.route('post', '/users/loginWithToken',
+                             lambda request: {'id': 'access',
+                                              'userId': 'user'})
+        self.transport.route('get', '/Jobs/job', self.send_body)
+        self.api = IBMQuantumExperience('token', config={
+            'transport': self.transport})
+        self.api.req.timeout_interval = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def send_body(self, request):
+        '''
+        Send the body from the range requested (if the body did not change),
+        failing after the number of bytes of the next failure
+        '''
+        start = int((request.headers.get('Range') or 'bytes=0-')[6:-1])
+        if request.headers.get('If-Range') != self.etag:
+            start = 0
+        elif start:
+            start += self.range_shift
+        end = len(self.body)
+        if self.failures:
+            end = start + self.failures.pop(0)
+        digest = base64.b64encode(hashlib.sha256(self.body).digest())
+        headers = {'Content-Length': str(len(self.body) - start),
+                   'Digest': 'sha-256=' + digest.decode('ascii')}
+        if self.etag:
+            headers['ETag'] = self.etag
+        if self.encoding:
+            headers['Content-Encoding'] = self.encoding
+        if start:
+            headers['Content-Range'] = 'bytes {}-{}/{}'.format(
+                start, len(self.body) - 1, len(self.body))
+
+        def chunks():
+            for position in range(start, end, 65536):
+                yield self.body[position:min(position + 65536, end)]
+            if end < len(self.body):
+                raise requests.ConnectionError('Connection reset')
+
+        return TransportResponse(206 if start else 200, headers=headers,
+                                 chunks=chunks())
+
+    def ranges(self):
+        return [request.headers.get('Range') for request in
+                self.transport.requests if request.path.endswith('/job')]
+
+    def read(self):
+        with open(self.path, 'rb') as downloaded:
+            return downloaded.read()
+
+    def test_download(self):
+        result = self.api.download_job('job', self.path)
+        self.assertEqual(self.read(), self.body)
+        self.assertEqual(result['size'], len(self.body))
+        self.assertEqual(result['sha256'],
+                         hashlib.sha256(self.body).hexdigest())
+        self.assertFalse(os.path.exists(self.path + '.part'))
+
+    def test_overwrite(self):
+        with open(self.path, 'wb') as existing:
+            existing.write(b'old')
+        self.api.download_job('job', self.path)
+        self.assertEqual(self.read(), self.body)
+
+    def test_resume(self):
+        self.failures = [100000, 70000]
+        self.api.download_job('job', self.path)
+        self.assertEqual(self.read(), self.body)
+        self.assertEqual(self.ranges(), [None, 'bytes=100000-',
+                                         'bytes=170000-'])
+
+    def test_resume_part_file(self):
+        self.failures = [200000] + [0] * (self.api.req.retries - 1)
+        self.assertRaises(ApiError, self.api.download_job, 'job', self.path)
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(os.path.getsize(self.path + '.part'), 200000)
+        count = len(self.ranges())
+        self.api.download_job('job', self.path)
+        self.assertEqual(self.read(), self.body)
+        self.assertEqual(self.ranges()[count:], ['bytes=200000-'])
+
+    def test_identity_encoding(self):
+        self.api.download_job('job', self.path)
+        request = self.transport.requests[-1]
+        self.assertEqual(request.headers['Accept-Encoding'], 'identity')
+
+    def test_resume_changed(self):
+        self.failures = [200000] + [0] * (self.api.req.retries - 1)
+        self.assertRaises(ApiError, self.api.download_job, 'job', self.path)
+        self.body = os.urandom(250000)
+        self.etag = '"v2"'
+        self.api.download_job('job', self.path)
+        self.assertEqual(self.read(), self.body)
+        self.assertFalse(os.path.exists(self.path + '.part.json'))
+
+    def test_resume_without_validator(self):
+        self.etag = None
+        self.failures = [100000]
+        self.api.download_job('job', self.path)
+        self.assertEqual(self.read(), self.body)
+        # Started again, as the body may have changed.
+        self.assertEqual(self.ranges(), [None, None])
+
+    def test_resume_encoded(self):
+        self.encoding = 'gzip'
+        self.failures = [100000]
+        self.api.download_job('job', self.path)
+        self.assertEqual(self.read(), self.body)
+        self.assertEqual(self.ranges(), [None, None])
+
+    def test_wrong_range(self):
+        self.failures = [100000]
+        self.range_shift = 10
+        self.api.download_job('job', self.path)
+        self.assertEqual(self.read(), self.body)
+        self.assertEqual(self.ranges(), [None, 'bytes=100000-', None])
+
+    def test_checksum(self):
+        self.assertRaises(ChecksumError, self.api.download_job, 'job',
+                          self.path, checksum='0' * 64)
+        self.assertFalse(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(self.path + '.part'))
+
+    def test_file_object(self):
+        self.failures = [100000]
+        output = io.BytesIO(b'head')
+        output.seek(4)
+        self.api.download_job('job', output)
+        self.assertEqual(output.getvalue(), b'head' + self.body)
+
+
+if __name__ == '__main__':
+    unittest.main()